@@ -61,9 +61,10 @@ class dirs(object):
 
 class files(object):
 
-    __slots__ = {'useragents'}
+    __slots__ = {'useragents', 'manifest'}
 
     useragents = join(dirs.data, 'user-agents.lst')
+    manifest = join(dirs.data, 'manifest.json')
 
 
 class docs(object):
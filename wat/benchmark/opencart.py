@@ -0,0 +1,548 @@
+# WAT Framework, make simple to do the complex
+# Copyright 2014 Francesco Marano and individual contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A local stand-in for an OpenCart 1.5.x/2.0 website, to benchmark full scans without a real target.
+
+It serves only what the OpenCart components look at: the product controller, the admin directory
+login page with the version in its footer, the admin login (a 302 with the PHPSESSID cookie and the token),
+the store settings page and form, and the error log page showing the configured error log file.
+Every response could be delayed, and requests could be randomly answered by a 503 or dropped,
+so that the framework behaviour under slow or unreliable targets could be measured too::
+
+    python -m wat.benchmark.opencart --port 8080 --version 2.0.0.0 --latency 0.1 --failure-rate 0.05
+"""
+
+__all__ = ['OpenCart']
+
+import re
+import sys
+import time
+import random
+import string
+import hashlib
+import argparse
+import threading
+from cgi import escape
+from urllib import urlencode
+from urlparse import urlsplit, parse_qs
+from SocketServer import ThreadingMixIn
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+
+
+_page = '''<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Strict//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-strict.dtd">
+<html xmlns="http://www.w3.org/1999/xhtml" dir="ltr" lang="en" xml:lang="en">
+<head>
+<title>%(title)s</title>
+<base href="%(base)s" />
+<link rel="stylesheet" type="text/css" href="view/stylesheet/stylesheet.css" />
+<script type="text/javascript" src="view/javascript/jquery/jquery-1.7.1.min.js"></script>
+<script type="text/javascript" src="view/javascript/jquery/ui/jquery-ui-1.8.16.custom.min.js"></script>
+<script type="text/javascript" src="view/javascript/jquery/tabs.js"></script>
+<script type="text/javascript" src="view/javascript/jquery/superfish/js/superfish.js"></script>
+<script type="text/javascript" src="view/javascript/common.js"></script>
+</head>
+<body>
+<div id="container">
+<div id="header">
+  <div class="div1">
+    <div class="div2"><img src="view/image/logo.png" title="%(title)s" /></div>
+  </div>
+</div>
+<div id="content">
+  <div class="box">
+    <div class="heading"><h1>%(title)s</h1></div>
+    <div class="content">
+%(content)s
+    </div>
+  </div>
+</div>
+</div>
+%(footer)s
+</body>
+</html>
+'''
+
+_footers = {
+    '1.5': '<div id="footer"><a href="http://www.opencart.com">OpenCart</a> &copy; 2009-2015 All Rights Reserved.'
+           '<br />Version %s</div>',
+    '2.0': '<footer id="footer"><a href="http://www.opencart.com">OpenCart</a> &copy; 2009-2015 All Rights Reserved.'
+           '<br />Version %s</footer>',
+}
+
+_login = '''      <form action="%(action)s" method="post" enctype="multipart/form-data" id="form">
+        <table style="width: 100%%;">
+          <tr>
+            <td style="text-align: center;" rowspan="4"><img src="view/image/login.png" alt="Please enter your login details." /></td>
+          </tr>
+          <tr>
+            <td>Username:<br /><input type="text" name="username" value="" style="margin-top: 4px;" /></td>
+          </tr>
+          <tr>
+            <td>Password:<br /><input type="password" name="password" value="" style="margin-top: 4px;" /></td>
+          </tr>
+          <tr>
+            <td style="text-align: right;"><a onclick="$('#form').submit();" class="button">Login</a></td>
+          </tr>
+        </table>
+      </form>'''
+
+# the settings of a fresh installation, as shown by the store settings form
+_settings = [
+    ('config_name', 'text', 'Your Store'),
+    ('config_owner', 'text', 'Your Name'),
+    ('config_address', 'textarea', 'Address 1'),
+    ('config_email', 'text', 'admin@example.com'),
+    ('config_telephone', 'text', '123456789'),
+    ('config_title', 'text', 'Your Store'),
+    ('config_meta_description', 'textarea', 'My Store'),
+    ('config_template', 'select', 'default'),
+    ('config_country_id', 'select', '222'),
+    ('config_language', 'select', 'en'),
+    ('config_currency', 'select', 'USD'),
+    ('config_catalog_limit', 'text', '15'),
+    ('config_admin_limit', 'text', '10'),
+    ('config_tax', 'radio', '1'),
+    ('config_customer_online', 'radio', '0'),
+    ('config_stock_display', 'radio', '0'),
+    ('config_ftp_host', 'text', 'ftp.example.com'),
+    ('config_ftp_port', 'text', '21'),
+    ('config_ftp_username', 'text', 'opencart'),
+    ('config_ftp_password', 'text', 'ftp-s3cr3t'),
+    ('config_ftp_root', 'text', '/var/www/html/'),
+    ('config_ftp_status', 'radio', '1'),
+    ('config_mail_protocol', 'select', 'mail'),
+    ('config_smtp_host', 'text', ''),
+    ('config_smtp_port', 'text', '25'),
+    ('config_maintenance', 'radio', '0'),
+    ('config_seo_url', 'radio', '0'),
+    ('config_compression', 'text', '0'),
+    ('config_error_display', 'radio', '1'),
+    ('config_error_log', 'radio', '1'),
+    ('config_error_filename', 'text', 'error.txt'),
+    ('config_google_analytics', 'textarea', ''),
+]
+
+_configuration = '''<?php
+// HTTP
+define('HTTP_SERVER', '%(url)s');
+
+// HTTPS
+define('HTTPS_SERVER', '%(url)s');
+
+// DIR
+define('DIR_APPLICATION', '/var/www/html/catalog/');
+define('DIR_SYSTEM', '/var/www/html/system/');
+define('DIR_DATABASE', '/var/www/html/system/database/');
+define('DIR_LANGUAGE', '/var/www/html/catalog/language/');
+define('DIR_TEMPLATE', '/var/www/html/catalog/view/theme/');
+define('DIR_CONFIG', '/var/www/html/system/config/');
+define('DIR_IMAGE', '/var/www/html/image/');
+define('DIR_CACHE', '/var/www/html/system/cache/');
+define('DIR_DOWNLOAD', '/var/www/html/download/');
+define('DIR_LOGS', '/var/www/html/system/logs/');
+
+// DB
+define('DB_DRIVER', 'mysql');
+define('DB_HOSTNAME', 'localhost');
+define('DB_USERNAME', 'opencart');
+define('DB_PASSWORD', 'db-s3cr3t');
+define('DB_DATABASE', 'opencart');
+define('DB_PREFIX', 'oc_');
+?>'''
+
+_error_log = '''2015-01-03 10:21:43 - PHP Notice:  Undefined index: route in /var/www/html/index.php on line 182
+2015-01-03 10:24:07 - PHP Notice:  Undefined variable: product_id in %(file)s on line 41
+'''
+
+
+class _Meter(object):
+    """A file-like wrapper counting the bytes read from or written to the wrapped file"""
+
+    def __init__(self, wrapped, count):
+        """
+        :param wrapped: the file to wrap
+        :param count: the function to call with the number of bytes of every read or write
+        :type count: callable
+        """
+        self.wrapped = wrapped
+        self.count = count
+
+    def read(self, *args):
+        data = self.wrapped.read(*args)
+        self.count(len(data))
+        return data
+
+    def readline(self, *args):
+        line = self.wrapped.readline(*args)
+        self.count(len(line))
+        return line
+
+    def write(self, data):
+        self.count(len(data))
+        self.wrapped.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.wrapped, name)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def version_string(self):
+        return 'Apache/2.2.22 (Debian)'
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        self.rfile = _Meter(self.rfile, lambda size: self.server.count(received=size))
+        self.wfile = _Meter(self.wfile, lambda size: self.server.count(sent=size))
+
+    def do_HEAD(self):
+        self.handle_request()
+
+    def do_GET(self):
+        self.handle_request()
+
+    def do_POST(self):
+        self.handle_request()
+
+    def handle_request(self):
+        server = self.server
+        url = urlsplit(self.path)
+        query = dict((key, values[-1]) for key, values in parse_qs(url.query).iteritems())
+        length = int(self.headers.getheader('Content-Length') or 0)
+        form = self.form(self.rfile.read(length)) if length else dict()
+        route = query.get('route')
+        server.count(requests=1, route=url.path + ('?route=%s' % route if route is not None else ''))
+        if server.latency:
+            time.sleep(server.latency)
+        failure = server.inject()
+        if failure == 'drop':
+            self.close_connection = 1
+            return
+        if failure == 'fail':
+            return self.respond(503, 'Service Unavailable', headers=[('Retry-After', '1')])
+
+        if url.path == '/':
+            return self.respond(200, server.page('Your Store', '<p>Welcome to Your Store</p>', footer=False))
+        if url.path == '/catalog/controller/product/product.php':
+            # the controller is not meant to be requested directly, it defines a class and outputs nothing
+            return self.respond(200, '')
+        if not url.path.startswith('/' + server.admin):
+            return self.respond(404, server.page('404 Not Found', '<p>Not Found</p>', footer=False))
+        if url.path[len(server.admin) + 1:] not in ('', 'index.php'):
+            return self.respond(404, server.page('404 Not Found', '<p>Not Found</p>', footer=False))
+        if route in (None, 'common/login'):
+            return self.login(form)
+        if not server.authorized(self.cookie('PHPSESSID'), query.get('token')):
+            # OpenCart forwards the unauthenticated requests to the login page, without redirecting them
+            return self.login(dict())
+        if route == 'common/home':
+            return self.respond(200, server.page('Dashboard', '<p>Overview</p>'))
+        if route == 'setting/setting':
+            if self.command == 'POST':
+                server.configure(form)
+                return self.redirect(server.admin + 'index.php?route=setting/store&token=%s' % query['token'])
+            return self.respond(200, server.page('Settings', server.settings_form(query['token'])))
+        if route == 'tool/error_log':
+            return self.respond(200, server.page('Error Log', server.error_log()))
+        return self.respond(200, server.page('Permission Denied!', '<p>You do not have permission</p>'))
+
+    def login(self, form):
+        server = self.server
+        if self.command == 'POST' and (form.get('username'), form.get('password')) == server.credentials:
+            session, token = server.login()
+            return self.redirect(
+                server.admin + 'index.php?route=common/home&token=%s' % token,
+                headers=[('Set-Cookie', 'PHPSESSID=%s; path=/' % session)]
+            )
+        action = server.url + server.admin + 'index.php?route=common/login'
+        return self.respond(200, server.page('Administration', _login % {'action': action}))
+
+    def redirect(self, location, headers=()):
+        self.respond(302, '', headers=[('Location', self.server.url + location)] + list(headers))
+
+    def respond(self, code, body, headers=()):
+        self.send_response(code)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for keyword, value in headers:
+            self.send_header(keyword, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def cookie(self, name):
+        match = re.search(r'(?:^|;\s*)%s=([^;]*)' % name, self.headers.getheader('Cookie') or '')
+        return match.group(1) if match is not None else None
+
+    def form(self, data):
+        """:return: the urlencoded or multipart form data fields
+        :rtype: dict
+        """
+        content_type = self.headers.getheader('Content-Type') or ''
+        if content_type.startswith('multipart/form-data'):
+            boundary = content_type.split('boundary=', 1)[-1].strip('"')
+            fields = dict()
+            for part in data.split('--' + boundary):
+                match = re.match(r'\r\nContent-Disposition: form-data; name="(?P<name>[^"]+)"[^\r]*\r\n'
+                                 r'(?:[^\r]+\r\n)*\r\n(?P<value>.*)\r\n$', part, flags=re.DOTALL)
+                if match is not None:
+                    fields[match.group('name')] = match.group('value')
+            return fields
+        return dict((key, values[-1]) for key, values in parse_qs(data, keep_blank_values=True).iteritems())
+
+
+class OpenCart(ThreadingMixIn, HTTPServer):
+    """A threaded HTTP server imitating an OpenCart website (see the module documentation).
+
+    It counts the requests it receives, by path and route, and the bytes received and sent.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=('127.0.0.1', 0), version='1.5.6', admin='admin/', credentials=('admin', 'admin'),
+                 latency=0.0, failure_rate=0.0, drop_rate=0.0, seed=0):
+        """
+        :param address: the address to listen on (the port 0 means any free port)
+        :type address: tuple
+        :param version: the OpenCart version to imitate, 1.5.x or 2.0.x
+        :type version: str
+        :param admin: the admin directory
+        :type admin: str
+        :param credentials: the admin username and password
+        :type credentials: tuple
+        :param latency: the delay of every response, in seconds
+        :type latency: float
+        :param failure_rate: the probability of answering a request with a 503 response
+        :type failure_rate: float
+        :param drop_rate: the probability of closing the connection without answering a request
+        :type drop_rate: float
+        :param seed: the seed to randomly inject the failures, and to generate the sessions
+        :type seed: int
+        :raise ValueError: if the version is not a 1.5.x or 2.0.x one
+        """
+        if version[:3] not in _footers:
+            raise ValueError("Unsupported OpenCart version '%s', 1.5.x or 2.0.x expected" % version)
+        HTTPServer.__init__(self, address, _Handler)
+        self.version = version
+        self.admin = admin
+        self.credentials = tuple(credentials)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.drop_rate = drop_rate
+        self.seed = seed
+        self.__lock = threading.Lock()
+        self.__thread = None
+        self.reset()
+
+    @property
+    def url(self):
+        """:return: the website URL
+        :rtype: str
+        """
+        return 'http://%s:%d/' % self.server_address[:2]
+
+    def reset(self):
+        """Forget the statistics, the sessions and the settings changes"""
+        with self.__lock:
+            self.__random = random.Random(self.seed)
+            self.__sessions = dict()  # PHPSESSID -> token
+            self.settings = [(name, kind, value) for name, kind, value in _settings]
+            self.requests = 0
+            self.received = 0
+            self.sent = 0
+            self.failures = 0
+            self.drops = 0
+            self.routes = dict()
+
+    def statistics(self):
+        """:return: the requests, bytes and injected failures counted since the last reset
+        :rtype: dict
+        """
+        with self.__lock:
+            return {
+                'requests': self.requests,
+                'received': self.received,
+                'sent': self.sent,
+                'failures': self.failures,
+                'drops': self.drops,
+                'routes': dict(self.routes),
+            }
+
+    def count(self, requests=0, received=0, sent=0, route=None):
+        with self.__lock:
+            self.requests += requests
+            self.received += received
+            self.sent += sent
+            if route is not None:
+                self.routes[route] = self.routes.get(route, 0) + 1
+
+    def inject(self):
+        """:return: the failure to inject into the current response, if any ('fail' or 'drop')
+        :rtype: str|None
+        """
+        with self.__lock:
+            draw = self.__random.random()
+            if draw < self.drop_rate:
+                self.drops += 1
+                return 'drop'
+            if draw < self.drop_rate + self.failure_rate:
+                self.failures += 1
+                return 'fail'
+        return None
+
+    def login(self):
+        """Open a new admin session
+        :return: the session id and the session token
+        :rtype: tuple
+        """
+        with self.__lock:
+            session = ''.join(self.__random.choice(string.ascii_lowercase + string.digits) for _ in range(26))
+            token = hashlib.md5(session).hexdigest()
+            self.__sessions[session] = token
+        return session, token
+
+    def authorized(self, session, token):
+        with self.__lock:
+            return session is not None and token is not None and self.__sessions.get(session) == token
+
+    def configure(self, form):
+        """Store the submitted settings, as the store settings form does"""
+        with self.__lock:
+            self.settings = [(name, kind, form.get(name, value)) for name, kind, value in self.settings]
+
+    def setting(self, name):
+        with self.__lock:
+            for setting, _, value in self.settings:
+                if setting == name:
+                    return value
+        return None
+
+    def page(self, title, content, footer=True):
+        return _page % {
+            'title': title,
+            'base': self.url + self.admin,
+            'content': content,
+            'footer': _footers[self.version[:3]] % self.version if footer else '',
+        }
+
+    def settings_form(self, token):
+        """:return: the store settings form, showing the current settings
+        :rtype: str
+        """
+        fields = list()
+        with self.__lock:
+            settings = list(self.settings)
+        for name, kind, value in settings:
+            if kind == 'text':
+                field = '<input type="text" name="%s" value="%s" />' % (name, escape(value, quote=True))
+            elif kind == 'textarea':
+                field = '<textarea name="%s" cols="40" rows="5">%s</textarea>' % (name, escape(value))
+            elif kind == 'radio':
+                field = ''.join(
+                    '<input type="radio" name="%s" value="%s"%s />%s' % (
+                        name, option, ' checked="checked"' if option == value else '', label)
+                    for option, label in (('1', 'Yes'), ('0', 'No'))
+                )
+            else:
+                field = '<select name="%s"><option value="%s" selected="selected">%s</option></select>' % (
+                    name, escape(value, quote=True), escape(value))
+            fields.append('          <tr><td>%s:</td><td>%s</td></tr>' % (name, field))
+        action = self.url + self.admin + 'index.php?' + urlencode([('route', 'setting/setting'), ('token', token)])
+        return '      <form action="%s" method="post" enctype="multipart/form-data" id="form">\n' \
+               '        <table class="form">\n%s\n        </table>\n      </form>' % (escape(action, quote=True),
+                                                                                  '\n'.join(fields))
+
+    def error_log(self):
+        """:return: the error log page, showing the content of the configured error log file
+        :rtype: str
+        """
+        filename = self.setting('config_error_filename')
+        if filename.endswith('config.php'):
+            content = _configuration % {'url': self.url}
+        else:
+            content = _error_log % {'file': '/var/www/html/system/logs/' + filename}
+        return '      <textarea wrap="off" style="width: 98%%; height: 300px;">%s</textarea>' % escape(content)
+
+    def start(self):
+        """Serve the requests in a background thread"""
+        self.__thread = threading.Thread(target=self.serve_forever, name='opencart')
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def stop(self):
+        """Stop serving the requests and close the listening socket"""
+        if self.__thread is not None:
+            self.shutdown()
+            self.__thread.join()
+            self.__thread = None
+        self.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+
+def parse(arguments=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m wat.benchmark.opencart',
+        description="Serve a local stand-in of an OpenCart website"
+    )
+    parser.add_argument('-a', '--address', default='127.0.0.1', help="(default: %(default)s)")
+    parser.add_argument('-p', '--port', type=int, default=8080, help="(default: %(default)s)")
+    parser.add_argument('-v', '--version', default='1.5.6', help="the OpenCart version (default: %(default)s)")
+    parser.add_argument('--admin', default='admin/', metavar='DIRECTORY',
+                        help="the admin directory (default: %(default)s)")
+    parser.add_argument('-l', '--latency', type=float, default=0.0, metavar='SECONDS',
+                        help="the delay of every response (default: %(default)s)")
+    parser.add_argument('-f', '--failure-rate', type=float, default=0.0, metavar='P',
+                        help="the probability of a 503 response (default: %(default)s)")
+    parser.add_argument('-d', '--drop-rate', type=float, default=0.0, metavar='P',
+                        help="the probability of a dropped connection (default: %(default)s)")
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    return parser.parse_args(arguments)
+
+
+def main(arguments=None):
+    options = parse(arguments)
+    server = OpenCart(
+        address=(options.address, options.port),
+        version=options.version,
+        admin=options.admin,
+        latency=options.latency,
+        failure_rate=options.failure_rate,
+        drop_rate=options.drop_rate,
+        seed=options.seed
+    )
+    sys.stderr.write("Serving OpenCart %s on %s\n" % (server.version, server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+# WAT Framework, make simple to do the complex
+# Copyright 2014 Francesco Marano and individual contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Planner scaling benchmark on synthetic components libraries.
+
+Every library is a grid of `depth` levels of `width` properties each. Every property is provided by
+`alternatives` equivalent components, each one requiring `fan_in` properties of the previous level.
+The library is written as a components package in a temporary directory and indexed by the manifest,
+then the components discovery, the planning graph construction, its solution and the plan pruning are timed.
+
+Run it in its own process, since it takes over the components manifest::
+
+    python -m wat.benchmark.planner --width 10 100 --depth 5 20 --alternatives 1 5 --output planner.json
+"""
+
+__all__ = ['Library', 'benchmark']
+
+import os
+import sys
+import json
+import random
+import shutil
+import argparse
+import itertools
+import tempfile
+from timeit import default_timer as timer
+
+from wat.lib import search
+from wat.lib.graph import RelaxedGraphPlan, LayeredPlan
+from wat.lib.manifest import Manifest
+
+
+_component = '''from datetime import date
+
+from wat.lib.components import *
+from wat.lib.models import Author
+
+
+@info(
+    authors=[
+        Author(email="benchmark@wat.local"),
+    ],
+    released=date(2015, 1, 1),
+    updated=date(2015, 1, 1),
+    version='0.0.1',
+    preconditions=[%(preconditions)s]
+)
+class %(name)s(WatComponent):
+    """Synthetic component %(number)d"""
+    __metaclass__ = MetaComponent
+
+    def run(self):
+        return True
+'''
+
+
+class Library(object):
+    """A synthetic components library"""
+
+    def __init__(self, width, depth, fan_in=2, alternatives=1, seed=0):
+        """
+        :param width: the number of properties of every level
+        :type width: int
+        :param depth: the number of levels
+        :type depth: int
+        :param fan_in: the number of preconditions of every component (except the first level ones)
+        :type fan_in: int
+        :param alternatives: the number of equivalent components providing every property
+        :type alternatives: int
+        :param seed: the seed to randomly choose the components preconditions
+        :type seed: int
+        """
+        self.width = width
+        self.depth = depth
+        self.fan_in = min(fan_in, width)
+        self.alternatives = alternatives
+        self.seed = seed
+
+    def __len__(self):
+        """Return the number of components of the library"""
+        return self.width * self.depth * self.alternatives
+
+    @staticmethod
+    def name(level, index):
+        """:return: the name of the specified property
+        :rtype: str
+        """
+        return 'benchmark.l%d.p%d' % (level, index)
+
+    @property
+    def goal(self):
+        """:return: a narrow goal, i.e. a single property of the last level
+        :rtype: str
+        """
+        return self.name(self.depth - 1, 0)
+
+    def write(self, path):
+        """Write the library as a components package.
+        :param path: the components directory (all its content is replaced)
+        :type path: str
+        """
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.makedirs(path)
+        open(os.path.join(path, '__init__.py'), mode='w').close()
+        choose = random.Random(self.seed).sample
+        number = 0
+        for level in range(self.depth):
+            for index in range(self.width):
+                package = os.path.join(path, *self.name(level, index).split('.'))
+                for directory in (os.path.dirname(os.path.dirname(package)), os.path.dirname(package), package):
+                    if not os.path.exists(directory):
+                        os.mkdir(directory)
+                        open(os.path.join(directory, '__init__.py'), mode='w').close()
+                for alternative in range(self.alternatives):
+                    preconditions = choose(range(self.width), self.fan_in) if level else []
+                    with open(os.path.join(package, 'c%d.py' % alternative), mode='w') as f:
+                        f.write(_component % {
+                            'name': 'Component%d' % alternative,
+                            'number': number,
+                            'preconditions': ', '.join(
+                                'Property("%s")' % self.name(level - 1, precondition)
+                                for precondition in preconditions
+                            ),
+                        })
+                    number += 1
+
+    def to_dict(self):
+        return {
+            'width': self.width,
+            'depth': self.depth,
+            'fan_in': self.fan_in,
+            'alternatives': self.alternatives,
+            'seed': self.seed,
+            'components': len(self),
+        }
+
+
+def _timed(function, repeat, setup=None):
+    """:param setup: the function whose result is passed to the timed one, if any (not timed)
+    :return: the result of the function and the best time of its runs, in seconds
+    :rtype: tuple
+    """
+    best = None
+    for _ in range(repeat):
+        arguments = [setup()] if setup is not None else []
+        start = timer()
+        result = function(*arguments)
+        elapsed = timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def benchmark(library, planners=('forward', 'backward'), repeat=3):
+    """Write the library into the directory indexed by the manifest and time the planner on it.
+
+    :param library: the synthetic library to plan on
+    :type library: Library
+    :param planners: the planners to time with a narrow goal (see `Library.goal`)
+    :type planners: collections.Iterable[str]
+    :param repeat: the number of runs of every timed step, the best one is reported
+    :type repeat: int
+    :return: the benchmark results, one for every goal and planner
+    :rtype: list[dict]
+    """
+    manifest = Manifest.instance()
+    library.write(manifest.path)
+    _, cold = _timed(manifest.refresh, 1)  # every module is new
+    _, warm = _timed(manifest.refresh, repeat)  # every module is unchanged
+    components, discovery = _timed(search.components, repeat)
+    assert len(components) == len(library)
+
+    results = list()
+    for goal, planner in [(None, 'forward')] + [(library.goal, planner) for planner in planners]:
+        goal_state = [goal] if goal is not None else None
+
+        def construction():
+            return RelaxedGraphPlan(goal_state=goal_state, backward=planner == 'backward')
+
+        graph, construction_time = _timed(construction, repeat)
+        plan, solution_time = _timed(lambda graph: graph.solution, repeat, setup=construction)
+        graph.solution  # expand the graph to prune it again
+        _, pruning_time = _timed(lambda: LayeredPlan(graph), repeat)
+        result = library.to_dict()
+        result.update({
+            'goal': goal,
+            'planner': planner,
+            'layers': len(plan.action_layers),
+            'actions': sum(len(layer.actions) for layer in plan.action_layers),
+            'time': {
+                'manifest_cold': cold,
+                'manifest_warm': warm,
+                'discovery': discovery,
+                'construction': construction_time,
+                'solution': solution_time,
+                'pruning': pruning_time,
+            },
+        })
+        results.append(result)
+    return results
+
+
+def parse(arguments=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m wat.benchmark.planner',
+        description="Time the planner on synthetic components libraries (one per combination of the sizes)"
+    )
+    parser.add_argument('-w', '--width', type=int, nargs='+', default=[10, 100], metavar='N',
+                        help="properties per level (default: %(default)s)")
+    parser.add_argument('-d', '--depth', type=int, nargs='+', default=[5, 20], metavar='N',
+                        help="number of levels (default: %(default)s)")
+    parser.add_argument('-f', '--fan-in', type=int, nargs='+', default=[2], metavar='N',
+                        help="preconditions per component (default: %(default)s)")
+    parser.add_argument('-a', '--alternatives', type=int, nargs='+', default=[1, 5], metavar='N',
+                        help="equivalent components per property (default: %(default)s)")
+    parser.add_argument('-m', '--max-components', type=int, default=10000, metavar='N',
+                        help="skip the libraries with more than N components (default: %(default)s)")
+    parser.add_argument('-r', '--repeat', type=int, default=3, metavar='N',
+                        help="runs of every timed step, the best one is reported (default: %(default)s)")
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', type=argparse.FileType('w'), default=sys.stdout,
+                        help="write the JSON results to the specified file (default: stdout)")
+    return parser.parse_args(arguments)
+
+
+def main(arguments=None):
+    options = parse(arguments)
+    if Manifest.is_initialized():
+        raise RuntimeError("The components manifest is already in use, run the benchmark in its own process")
+    directory = tempfile.mkdtemp(prefix='wat-benchmark-')
+    try:
+        Manifest.initialize(
+            filename=os.path.join(directory, 'manifest.json'),
+            path=os.path.join(directory, 'components'),
+            package='benchmark.components'
+        )
+        results = list()
+        for width, depth, fan_in, alternatives in itertools.product(
+                options.width, options.depth, options.fan_in, options.alternatives):
+            library = Library(width, depth, fan_in, alternatives, seed=options.seed)
+            if len(library) > options.max_components:
+                continue
+            sys.stderr.write("Benchmarking %d components (%r)\n" % (len(library), library.to_dict()))
+            results.extend(benchmark(library, repeat=options.repeat))
+        json.dump(results, options.output, indent=2, sort_keys=True)
+        options.output.write('\n')
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
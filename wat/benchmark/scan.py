@@ -0,0 +1,244 @@
+# WAT Framework, make simple to do the complex
+# Copyright 2014 Francesco Marano and individual contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""End-to-end scan benchmark against a local stand-in of an OpenCart website (see `wat.benchmark.opencart`).
+
+Every scan is the one the command line interface `run` command makes: the planning graph is built
+for all the retrievable properties and its solution is executed, one scan for every combination of
+the OpenCart versions, the schedulers and the concurrency levels, so that serial (a concurrency of 1)
+and concurrent scans could be compared. The framework state (the properties registry, the responses cache,
+the handles pool and the governor statistics) is reset before every scan, and so is the server one.
+
+The wall time, the requests and the bytes the server received and sent, and the latency of every component,
+from its first transfer to its result, are reported::
+
+    python -m wat.benchmark.scan --version 1.5.6 2.0.0.0 --concurrency 1 4 --latency 0.05 --output scan.json
+"""
+
+__all__ = ['scan', 'benchmark']
+
+import os
+import sys
+import json
+import argparse
+import itertools
+from contextlib import contextmanager
+from timeit import default_timer as timer
+
+from wat import conf
+from wat.benchmark.opencart import OpenCart
+from wat.lib import clients, graph
+from wat.lib.exceptions import ClientError
+from wat.lib.graph import RelaxedGraphPlan
+from wat.lib.properties import Registry
+
+
+@contextmanager
+def _timing(latencies):
+    """Time every component execution while in the context.
+    A component latency lasts from the beginning of its transfer, if it was performed in advance,
+    or of its execution otherwise, to its result.
+
+    :param latencies: the list to append the component, the property, the latency and the success of every execution
+    :type latencies: list
+    """
+    transferable, execute = graph._transferable, graph._execute
+    started = dict()  # instance id -> beginning of the transfer performed in advance
+
+    def timed_transferable(component, instance):
+        curl = transferable(component, instance)
+        if curl is not None:
+            started[id(instance)] = timer()
+        return curl
+
+    def timed_execute(prop, component, instance, goal_state):
+        start = started.pop(id(instance), None) or timer()
+        succeeded = execute(prop, component, instance, goal_state)
+        latencies.append((str(component), prop, timer() - start, succeeded))
+        return succeeded
+
+    graph._transferable, graph._execute = timed_transferable, timed_execute
+    try:
+        yield latencies
+    finally:
+        graph._transferable, graph._execute = transferable, execute
+
+
+def _reset():
+    """Forget everything the previous scans left in the framework"""
+    Registry.instance().clear()
+    clients.ResponseCache.instance().clear()
+    clients.Pool.instance().clear()
+    clients.Governor.instance().clear()
+    clients.use_archive(None)
+
+
+def scan(server, scheduler='layered', concurrency=1, race=1):
+    """Scan the server for all the retrievable properties, as the command line interface does.
+
+    :param server: the running server to scan
+    :type server: OpenCart
+    :param scheduler: the plan execution scheduler, 'layered' or 'dataflow'
+    :type scheduler: str
+    :param concurrency: the maximum number of concurrent transfers
+    :type concurrency: int
+    :param race: the maximum number of equivalent components whose transfers are performed at the same time
+    :type race: int
+    :return: the scan results
+    :rtype: dict
+    """
+    clients_conf = conf.clients.instance()
+    clients_conf.URL = server.url
+    clients_conf.PORT = server.server_address[1]
+    _reset()
+    server.reset()
+    latencies = list()
+    error = None
+    with _timing(latencies):
+        start = timer()
+        solution = RelaxedGraphPlan().solution
+        planning = timer() - start
+        try:
+            if scheduler == 'dataflow':
+                solution.schedule(concurrency=concurrency, race=race)
+            else:
+                solution.execute(concurrency=concurrency, race=race)
+        except ClientError as e:
+            error = e.messages
+        wall = timer() - start
+
+    components = dict()
+    for component, prop, latency, succeeded in latencies:
+        timing = components.setdefault(component, {
+            'property': prop,
+            'runs': 0,
+            'succeeded': 0,
+            'latency': 0.0,
+        })
+        timing['runs'] += 1
+        timing['succeeded'] += int(succeeded)
+        timing['latency'] += latency
+    registry = Registry.instance()
+    result = server.statistics()
+    result.update({
+        'scheduler': scheduler,
+        'concurrency': concurrency,
+        'race': race,
+        'error': error,
+        'properties': sorted(registry),
+        'time': {
+            'wall': wall,
+            'planning': planning,
+        },
+        'components': components,
+        'cache': {
+            'hits': clients.ResponseCache.instance().hits,
+            'misses': clients.ResponseCache.instance().misses,
+        },
+    })
+    return result
+
+
+def benchmark(server, schedulers=('layered', 'dataflow'), concurrency=(1, 4), race=1, repeat=3):
+    """Scan the server once for every combination of the schedulers and the concurrency levels.
+
+    :param server: the running server to scan
+    :type server: OpenCart
+    :param schedulers: the plan execution schedulers
+    :type schedulers: collections.Iterable[str]
+    :param concurrency: the maximum numbers of concurrent transfers
+    :type concurrency: collections.Iterable[int]
+    :param race: the maximum number of equivalent components whose transfers are performed at the same time
+    :type race: int
+    :param repeat: the number of scans of every combination, the fastest one is reported
+    :type repeat: int
+    :return: the benchmark results, one for every combination
+    :rtype: list[dict]
+    """
+    results = list()
+    for scheduler, level in itertools.product(schedulers, concurrency):
+        best = None
+        for _ in range(repeat):
+            result = scan(server, scheduler=scheduler, concurrency=level, race=race)
+            if best is None or result['time']['wall'] < best['time']['wall']:
+                best = result
+        best.update({
+            'version': server.version,
+            'latency': server.latency,
+            'failure_rate': server.failure_rate,
+            'drop_rate': server.drop_rate,
+        })
+        results.append(best)
+    return results
+
+
+def parse(arguments=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m wat.benchmark.scan',
+        description="Time full scans of a local OpenCart stand-in (one per combination of the options)"
+    )
+    parser.add_argument('-v', '--version', nargs='+', default=['1.5.6', '2.0.0.0'], metavar='VERSION',
+                        help="the OpenCart versions to imitate (default: %(default)s)")
+    parser.add_argument('-s', '--scheduler', nargs='+', choices=['layered', 'dataflow'],
+                        default=['layered', 'dataflow'], help="(default: %(default)s)")
+    parser.add_argument('-c', '--concurrency', type=int, nargs='+', default=[1, 4], metavar='N',
+                        help="maximum concurrent transfers, 1 means a serial scan (default: %(default)s)")
+    parser.add_argument('--race', type=int, default=1, metavar='N', help="(default: %(default)s)")
+    parser.add_argument('-l', '--latency', type=float, default=0.05, metavar='SECONDS',
+                        help="the delay of every response (default: %(default)s)")
+    parser.add_argument('-f', '--failure-rate', type=float, default=0.0, metavar='P',
+                        help="the probability of a 503 response (default: %(default)s)")
+    parser.add_argument('-d', '--drop-rate', type=float, default=0.0, metavar='P',
+                        help="the probability of a dropped connection (default: %(default)s)")
+    parser.add_argument('-r', '--repeat', type=int, default=3, metavar='N',
+                        help="scans of every combination, the fastest one is reported (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-log', '--log-file', default=os.devnull, metavar='FILENAME', dest='logfile',
+                        help="write the framework log to the specified file (default: %(default)s)")
+    parser.add_argument('-o', '--output', type=argparse.FileType('w'), default=sys.stdout,
+                        help="write the JSON results to the specified file (default: stdout)")
+    return parser.parse_args(arguments)
+
+
+def main(arguments=None):
+    from wat.ui.cli.log import config as logging_config
+
+    options = parse(arguments)
+    logging_config(colored=False, level='warning', filename=options.logfile)
+    results = list()
+    for version in options.version:
+        server = OpenCart(
+            version=version,
+            latency=options.latency,
+            failure_rate=options.failure_rate,
+            drop_rate=options.drop_rate,
+            seed=options.seed
+        )
+        with server:
+            sys.stderr.write("Benchmarking scans of OpenCart %s on %s\n" % (version, server.url))
+            results.extend(benchmark(
+                server,
+                schedulers=options.scheduler,
+                concurrency=options.concurrency,
+                race=options.race,
+                repeat=options.repeat
+            ))
+        clients.Pool.instance().clear()
+    json.dump(results, options.output, indent=2, sort_keys=True)
+    options.output.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,12 @@
 from datetime import date
-from pycurl import HEADERFUNCTION, NOBODY
+from pycurl import HEADERFUNCTION, URL
 import re
 
+from wat import conf
 from wat.lib import clients
 from wat.lib.components import *
 from wat.lib.exceptions import ComponentFailure
-from wat.lib.models import Author
+from wat.lib.models import Author, Cost
 
 
 @info(
@@ -15,7 +16,8 @@ from wat.lib.models import Author
     released=date(2014, 12, 06),
     updated=date(2014, 12, 06),
     version='0.0.2',
-    preconditions=None
+    preconditions=None,
+    cost=Cost(requests=1)
 )
 class ServerNameByResponseHeader(WatComponent):
     """Retrieve HTTP server name from response header"""
@@ -26,8 +28,9 @@ class ServerNameByResponseHeader(WatComponent):
 
         self.headers = list()
         self.curl = clients.Curl()
-        self.curl.setopt(NOBODY, True)
+        self.curl.setopt(URL, conf.clients.instance().URL)
         self.curl.setopt(HEADERFUNCTION, self.headers.append)
+        self.curl.fetch(headers=True)
 
     def run(self):
         self.curl.perform()
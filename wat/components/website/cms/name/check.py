@@ -1,11 +1,11 @@
 from datetime import date
-from pycurl import URL, NOBODY, HTTP_CODE
+from pycurl import URL, HTTP_CODE
 
 from wat import conf
 from wat.lib import clients
 from wat.lib.components import *
 from wat.lib.exceptions import ComponentFailure
-from wat.lib.models import Author
+from wat.lib.models import Author, Cost
 
 
 @info(
@@ -15,7 +15,8 @@ from wat.lib.models import Author
     released=date(2014, 12, 01),
     updated=date(2014, 12, 06),
     version='0.0.2',
-    preconditions=None
+    preconditions=None,
+    cost=Cost(requests=1)
 )
 class CheckCmsNameAsOpencart(WatComponent):
     """Check if the target CMS name is OpenCart"""
@@ -26,7 +27,7 @@ class CheckCmsNameAsOpencart(WatComponent):
         from urlparse import urljoin
 
         self.curl = clients.Curl()
-        self.curl.setopt(NOBODY, True)
+        self.curl.fetch(status=True)
         self.curl.setopt(URL, urljoin(conf.clients.instance().URL, 'catalog/controller/product/product.php'))
 
     def run(self):
@@ -5,7 +5,7 @@ from wat.lib import clients
 
 from wat.lib.components import WatComponent, info, MetaComponent
 from wat.lib.exceptions import ComponentFailure
-from wat.lib.models import Author
+from wat.lib.models import Author, Cost
 from wat.lib.properties import Constraint, Property
 
 
@@ -19,7 +19,8 @@ from wat.lib.properties import Constraint, Property
     preconditions=[
         Constraint("website.cms.name", "opencart", 'eq'),
         Property("website.cms.opencart.admin.directory")
-    ]
+    ],
+    cost=Cost(requests=2, size=4096, intrusive=True)
 )
 class CheckAdminAdminPair(WatComponent):
     """Check if OpenCart credentials are admin-admin."""
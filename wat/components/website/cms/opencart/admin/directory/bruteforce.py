@@ -1,12 +1,12 @@
 from datetime import date
 import logging
-from pycurl import URL, NOBODY, HTTP_CODE
+from pycurl import URL, HTTP_CODE
 
 from wat import conf
 from wat.lib import clients
 from wat.lib.components import WatComponent, info, MetaComponent
 from wat.lib.exceptions import ComponentFailure
-from wat.lib.models import Author
+from wat.lib.models import Author, Cost
 from wat.lib.properties import Constraint
 from wat.lib.shortcuts import hierlogger as logger
 
@@ -17,10 +17,11 @@ from wat.lib.shortcuts import hierlogger as logger
     ],
     released=date(2014, 11, 21),
     updated=date(2014, 12, 18),
-    version='0.0.3',
+    version='0.0.4',
     preconditions=[
         Constraint("website.cms.name", "opencart", 'eq'),
-    ]
+    ],
+    cost=Cost(requests=4)
 )
 class GetAdminDirByBruteforce(WatComponent):
     """Provide the OpenCart admin directory trying some common ones."""
@@ -29,24 +30,34 @@ class GetAdminDirByBruteforce(WatComponent):
     def __init__(self):
         super(GetAdminDirByBruteforce, self).__init__()
 
-        self.curl = clients.Curl()
-        self.curl.setopt(NOBODY, True)
         self.admin_dirs = ['admin/', 'administrator/', 'administration/', 'sysadmin/']
 
     def run(self):
         from urlparse import urljoin
         debug_enabled = logger().isEnabledFor(logging.DEBUG)
 
+        # probe all the directories at the same time
+        transfers = clients.Transfers()
+        futures = list()
         for admin_dir in self.admin_dirs:
-            self.curl.setopt(URL, urljoin(conf.clients.instance().URL, 'admin/'))
-            self.curl.perform()
-            http_code = self.curl.getinfo(HTTP_CODE)
-            if http_code in (200, 401):
-                return admin_dir
-            elif debug_enabled:
-                if http_code == 404:
-                    logger().debug("Admin directory name is not '%s'" % admin_dir)
-                else:
-                    logger().debug("Server response HTTP status code was %d, 200 or 404 expected" % http_code)
+            curl = clients.Curl()
+            curl.fetch(status=True)
+            curl.setopt(URL, urljoin(conf.clients.instance().URL, admin_dir))
+            futures.append(transfers.submit(curl))
+
+        try:
+            transfers.run()
+            for admin_dir, future in zip(self.admin_dirs, futures):
+                http_code = future.result().getinfo(HTTP_CODE)
+                if http_code in (200, 401):
+                    return admin_dir
+                elif debug_enabled:
+                    if http_code == 404:
+                        logger().debug("Admin directory name is not '%s'" % admin_dir)
+                    else:
+                        logger().debug("Server response HTTP status code was %d, 200 or 404 expected" % http_code)
+        finally:
+            for future in futures:
+                future.curl.release()
 
         raise ComponentFailure(message="Cannot determine admin directory name")
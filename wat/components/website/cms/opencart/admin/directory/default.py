@@ -1,11 +1,11 @@
 from datetime import date
-from pycurl import URL, NOBODY, HTTP_CODE
+from pycurl import URL, HTTP_CODE
 from wat import conf
 from wat.lib import clients
 
 from wat.lib.components import WatComponent, info, MetaComponent
 from wat.lib.exceptions import ComponentFailure
-from wat.lib.models import Author
+from wat.lib.models import Author, Cost
 from wat.lib.properties import Constraint
 
 
@@ -18,7 +18,8 @@ from wat.lib.properties import Constraint
     version='0.0.3',
     preconditions=[
         Constraint("website.cms.name", "opencart", 'eq'),
-    ]
+    ],
+    cost=Cost(requests=1)
 )
 class GetAdminDirByDefault(WatComponent):
     """Provide the OpenCart default admin directory or fail if it was changed."""
@@ -29,7 +30,7 @@ class GetAdminDirByDefault(WatComponent):
         from urlparse import urljoin
 
         self.curl = clients.Curl()
-        self.curl.setopt(NOBODY, True)
+        self.curl.fetch(status=True)
         self.curl.setopt(URL, urljoin(conf.clients.instance().URL, 'admin/'))
 
     def run(self):
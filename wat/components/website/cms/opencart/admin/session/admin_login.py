@@ -6,7 +6,7 @@ from wat import conf
 from wat.lib import clients
 from wat.lib.components import WatComponent, info, MetaComponent
 from wat.lib.exceptions import ComponentFailure
-from wat.lib.models import Author
+from wat.lib.models import Author, Cost
 from wat.lib.properties import Constraint, Property
 
 
@@ -21,7 +21,8 @@ from wat.lib.properties import Constraint, Property
         Constraint("website.cms.name", "opencart", 'eq'),
         Property("website.cms.opencart.admin.directory"),
         Property("website.cms.opencart.admin.credentials"),
-    ]
+    ],
+    cost=Cost(requests=1, intrusive=True)
 )
 class GetAdminSessionByLogin(WatComponent):
     """Get the OpenCart admin session id and session token to make authenticated requests."""
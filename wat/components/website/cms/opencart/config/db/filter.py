@@ -1,7 +1,7 @@
 from datetime import date
 
 from wat.lib.components import WatComponent, info, MetaComponent
-from wat.lib.models import Author
+from wat.lib.models import Author, Cost
 from wat.lib.properties import Property
 
 from ..db import __parameters__ as parameters
@@ -16,7 +16,8 @@ from ..db import __parameters__ as parameters
     version='1.1.0',
     preconditions=[
         Property("website.cms.opencart.config"),
-    ]
+    ],
+    cost=Cost(requests=0)
 )
 class GetDbConfig(WatComponent):
     """Get the OpenCart database configuration parameters."""
@@ -8,7 +8,7 @@ from wat.components.website.cms.opencart.config import parse_configuration
 from wat.lib import clients
 from wat.lib.components import WatComponent, info, MetaComponent
 from wat.lib.exceptions import ComponentFailure
-from wat.lib.models import Author
+from wat.lib.models import Author, Cost
 from wat.lib.properties import Property, Constraint
 
 
@@ -24,7 +24,8 @@ from wat.lib.properties import Property, Constraint
         Property("website.cms.opencart.admin.directory"),
         Property("website.cms.opencart.admin.session"),
         Property("website.cms.opencart.settings"),
-    ]
+    ],
+    cost=Cost(requests=3, size=8192, intrusive=True)
 )
 class GetConfigParameters(WatComponent):
     """Get the OpenCart configuration parameters by parsing config.php file red from error log file."""
@@ -71,7 +72,7 @@ class GetConfigParameters(WatComponent):
             if not self.body:
                 raise ComponentFailure('Server sent an empty response')
             else:
-                match = re.search(r'<textarea.*?>(?P<log>.*?)</textarea>', self.body, flags=re.DOTALL)
+                match = re.search(r'<textarea.*?>(?P<log>.*?)</textarea>', self.body.view(), flags=re.DOTALL)
                 if match is not None:
                     return parse_configuration(match.group('log'))
                 else:
@@ -6,7 +6,7 @@ from wat import conf
 from wat.lib import clients
 from wat.lib.components import WatComponent, info, MetaComponent
 from wat.lib.exceptions import ComponentFailure
-from wat.lib.models import Author
+from wat.lib.models import Author, Cost
 from wat.lib.properties import Constraint, Property
 
 
@@ -21,7 +21,8 @@ from wat.lib.properties import Constraint, Property
         Constraint("website.cms.name", "opencart", 'eq'),
         Property("website.cms.opencart.admin.directory"),
         Property("website.cms.opencart.admin.session"),
-    ]
+    ],
+    cost=Cost(requests=1, size=65536)
 )
 class GetStoreSettings(WatComponent):
     """ Get the complete OpenCart settings list """
@@ -50,7 +51,7 @@ class GetStoreSettings(WatComponent):
             if not self.body:
                 raise ComponentFailure('Server sent an empty response')
             else:
-                _ = PyQuery(self.body)
+                _ = PyQuery(str(self.body))
                 settings = dict()
                 for setting in _('input[type="text"][name^="config_"][value]') +\
                         _('input[type="radio"][name^="config_"][checked="checked"][value]'):
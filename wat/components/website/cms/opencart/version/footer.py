@@ -6,7 +6,7 @@ from wat import conf
 from wat.lib import clients
 from wat.lib.components import *
 from wat.lib.exceptions import ComponentFailure
-from wat.lib.models import Author
+from wat.lib.models import Author, Cost
 from wat.components.website.cms.opencart.version import __versions__, __last_version__
 from wat.lib.properties import Property, Constraint
 
@@ -21,7 +21,8 @@ from wat.lib.properties import Property, Constraint
     preconditions=[
         Constraint("website.cms.name", "opencart", 'eq'),
         Property("website.cms.opencart.admin.directory"),
-    ]
+    ],
+    cost=Cost(requests=1, size=4096)
 )
 class GetVersionByFooter(WatComponent):
     """Provide the OpenCart exact version by looking at the admin page footer unless it was disabled."""
@@ -39,6 +40,8 @@ class GetVersionByFooter(WatComponent):
         self.curl = clients.Curl()
         self.curl.setopt(URL, admin_url)
         self.curl.setopt(WRITEFUNCTION, self.save_as_attribute('body'))
+        # the body is not needed past the version in the footer
+        self.curl.fetch(until=r'<div id="footer">.*?1\.5\.(?:\d\.)?\d|<footer id="footer">')
 
     def run(self):
         self.curl.perform()
@@ -47,8 +50,9 @@ class GetVersionByFooter(WatComponent):
             if not self.body:
                 raise ComponentFailure('Server sent an empty response')
             else:
-                if re.search(r'<div id="footer">', self.body) is not None:
-                    match = re.search(r'(?P<version>1\.5\.(?:\d\.)?\d)', self.body)
+                body = self.body.view()
+                if re.search(r'<div id="footer">', body) is not None:
+                    match = re.search(r'(?P<version>1\.5\.(?:\d\.)?\d)', body)
                     if match is not None:
                         ver = match.group('version')
                         if ver in __versions__:
@@ -57,7 +61,7 @@ class GetVersionByFooter(WatComponent):
                             raise ComponentFailure("Unrecognized version '%s'" % ver)
                     else:
                         raise ComponentFailure('Version not found')
-                elif re.search(r'<footer id="footer">', self.body) is not None:
+                elif re.search(r'<footer id="footer">', body) is not None:
                     if __last_version__ == '2.0.0.0':
                         return '2.0.0.0'
                     else:
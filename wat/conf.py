@@ -13,16 +13,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-__all__ = ['clients']
+__all__ = ['clients', 'cache', 'governor', 'buffers']
 
 from pycurl import *
 
 from singleton.singleton import Singleton
 
 import wat
+from wat.lib.context import contextual
 
 
-@Singleton
+@contextual('clients')
 class clients(object):
     """
     Collect all the curl client options to use as default on client initialization.
@@ -32,6 +33,10 @@ class clients(object):
     You could modify options:
         * **here**, to make them available on every framework start
         * **programmatically**, to make them available on that start only
+
+    Options are compiled once per revision (see `wat.lib.clients`), so programmatic changes
+    have to assign the option, not to modify its value in place (e.g. append to a list).
+    Every execution context has its own copy of the options (see `wat.lib.context.ExecutionContext`).
     """
 
     __all__ = {
@@ -78,6 +83,16 @@ class clients(object):
         'SHARE', 'NEW_FILE_PERMS', 'NEW_DIRECTORY_PERMS',
     }
 
+    revision = 0  # incremented on every option change
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        object.__setattr__(self, 'revision', self.revision + 1)
+
+    def __delattr__(self, name):
+        object.__delattr__(self, name)
+        object.__setattr__(self, 'revision', self.revision + 1)
+
     # BEHAVIOR OPTIONS
     VERBOSE = False
     NOPROGRESS = True
@@ -97,6 +112,7 @@ class clients(object):
     #   "scheme://(hostname|ip):port"   use the specified proxy
     # PROXY = ""
     PORT = 80  # default port to use to make requests
+    DNS_CACHE_TIMEOUT = 300  # seconds to keep resolved names, shared by all the handles
 
     # NAMES and PASSWORDS OPTIONS (Authentication)
     # PROXYUSERNAME = "username"
@@ -119,5 +135,49 @@ class clients(object):
     CONNECTTIMEOUT = 30
 
     # SSL and SECURITY OPTIONS
+    SSL_SESSIONID_CACHE = True  # resume SSL sessions instead of full handshakes, shared by all the handles
+
     # SSH OPTIONS
-    # OTHER OPTIONS
\ No newline at end of file
+    # OTHER OPTIONS
+    # if not specified, the process-wide share object is used (see `wat.lib.clients.shared()`)
+    # SHARE = pycurl.CurlShare()
+
+
+@Singleton
+class cache(object):
+    """
+    Collect the options of the in-run HTTP response cache (see `wat.lib.clients.ResponseCache`).
+    Only the responses to GET and HEAD requests are cached, keyed by URL, request options and cookies.
+    """
+
+    SIZE = 256  # maximum number of cached responses, the least recently used are evicted (0 disables the cache)
+    MAX_RESPONSE_SIZE = 1024 * 1024  # bigger responses (in bytes) are not cached
+
+
+@Singleton
+class governor(object):
+    """
+    Collect the options of the requests governor (see `wat.lib.clients.Governor`), which limits
+    the request rate and the concurrent transfers of the framework, not to overload the targets.
+    """
+
+    RATE = 0  # maximum requests per second to every host (0 means no limit)
+    BURST = 1  # requests which could be sent at once to every host, before the rate applies
+    CONNECTIONS = 0  # maximum concurrent transfers to all the hosts (0 means no limit)
+    HOST_CONNECTIONS = 0  # maximum concurrent transfers to every host (0 means no limit)
+
+    # back off on overload signs (some status codes or a rising latency), then slowly speed up again
+    ADAPTIVE = False
+    BACKOFF_CODES = (429, 503)
+    BACKOFF_LATENCY = 2.0  # responses this many times slower than the average are an overload sign
+    MIN_RATE = 0.5  # the rate never goes down this one while backing off
+
+
+@Singleton
+class buffers(object):
+    """
+    Collect the options of the buffers the response bodies are written into (see `wat.lib.buffers.ResponseBuffer`).
+    """
+
+    SPILL_SIZE = 4 * 1024 * 1024  # bigger bodies (in bytes) are moved to a temporary file (0 means never)
+    DIRECTORY = None  # the directory of the temporary files (None means the system default one)
@@ -0,0 +1,188 @@
+# WAT Framework, make simple to do the complex
+# Copyright 2014 Francesco Marano and individual contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Record the transfers of a run into an archive, and replay them later without any network access.
+
+An archive is a gzip-compressed file of JSON lines: the first one describes the archive, every other one
+is a request (method, URL and body) together with its response (status, headers, body and transfer
+information) or its error. Replayed requests are matched by method, URL and body: requests performed
+many times get their responses in the recorded order, the last one being repeated once they run out.
+
+    from wat.lib import archive
+
+    with archive.recording('scan.jsonl.gz'):
+        plan.execute()
+    with archive.replaying('scan.jsonl.gz'):
+        plan.execute()
+"""
+
+__all__ = ['Recorder', 'Replayer', 'recording', 'replaying']
+
+import json
+import gzip
+import base64
+import threading
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime
+
+import pycurl
+
+import wat
+from wat import conf
+from wat.lib import clients
+from wat.lib.shortcuts import native
+
+FORMAT = 1
+
+# the transfer information kept in the archive, by name
+_INFO = dict((name, getattr(pycurl, name)) for name in (
+    'HTTP_CODE', 'EFFECTIVE_URL', 'CONTENT_TYPE', 'REDIRECT_URL', 'REDIRECT_COUNT', 'SIZE_DOWNLOAD', 'HEADER_SIZE',
+))
+
+
+class Recorder(object):
+    """Write the recorded transfers into an archive (see `clients.use_archive()`)"""
+
+    replaying = False
+
+    def __init__(self, filename):
+        """
+        :param filename: the archive to create (an existing one is overwritten)
+        :type filename: str
+        """
+        self.filename = filename
+        self.__lock = threading.Lock()
+        self.__count = 0  # recorded transfers
+        self.__file = gzip.open(filename, 'wb')
+        self.__write({
+            'format': FORMAT,
+            'framework': wat.project.version,
+            'url': getattr(conf.clients.instance(), 'URL', None),
+            'created': datetime.now().isoformat(),
+        })
+
+    def __len__(self):
+        return self.__count
+
+    def __write(self, line):
+        self.__file.write(json.dumps(line, sort_keys=True) + '\n')
+
+    def record(self, request, response=None, error=None):
+        """Record a transfer.
+        :param request: the method, the URL and the body of the request (see `clients.Curl.request()`)
+        :type request: tuple
+        :param response: the received response, if any
+        :type response: clients.Response
+        :param error: the error occurred during the transfer, if any
+        :type error: pycurl.error
+        """
+        method, url, body = request
+        line = {'method': method, 'url': url, 'body': body}
+        if error is not None:
+            line['error'] = list(error.args)
+        else:
+            line.update({
+                'headers': response.headers,
+                'content': base64.b64encode(response.body),
+                'info': dict((name, response.info[info]) for name, info in _INFO.iteritems() if info in response.info),
+            })
+        with self.__lock:
+            self.__write(line)
+            self.__count += 1
+
+    def close(self):
+        with self.__lock:
+            self.__file.close()
+
+
+class Replayer(object):
+    """Serve the transfers recorded into an archive (see `clients.use_archive()`)"""
+
+    replaying = True
+
+    def __init__(self, filename):
+        """
+        :param filename: the archive to replay
+        :type filename: str
+        :raise ValueError: if the archive format is not supported
+        """
+        self.filename = filename
+        self.__lock = threading.Lock()
+        self.__exchanges = defaultdict(deque)  # (method, URL, body) -> recorded responses or errors
+        with gzip.open(filename, 'rb') as f:
+            self.header = json.loads(f.readline())
+            if self.header.get('format') != FORMAT:
+                raise ValueError("Unsupported archive format: %r" % self.header.get('format'))
+            for line in f:
+                line = json.loads(line)
+                self.__exchanges[(line['method'], line['url'], line['body'])].append(line)
+
+    def __len__(self):
+        return sum(len(exchanges) for exchanges in self.__exchanges.itervalues())
+
+    def replay(self, request):
+        """:param request: the method, the URL and the body of the request (see `clients.Curl.request()`)
+        :type request: tuple
+        :return: the recorded response (a HEAD request could be served by the response to a GET one)
+        :rtype: clients.Response
+        :raise pycurl.error: if the recorded transfer failed, or the request was not recorded
+        """
+        method, url, body = request
+        with self.__lock:
+            exchanges = self.__exchanges.get(request)
+            if not exchanges and method == 'HEAD':
+                exchanges = self.__exchanges.get(('GET', url, body))
+            if not exchanges:
+                raise pycurl.error(pycurl.E_COULDNT_CONNECT, "No recorded response for %s %s" % (method, url))
+            line = exchanges.popleft() if len(exchanges) > 1 else exchanges[0]
+        if 'error' in line:
+            raise pycurl.error(*line['error'])
+        return clients.Response(
+            native(line['headers']),
+            base64.b64decode(line['content']),
+            dict((_INFO[name], native(value)) for name, value in line['info'].iteritems())
+        )
+
+    def close(self):
+        pass
+
+
+@contextmanager
+def recording(filename):
+    """Record all the transfers performed in the context into the specified archive.
+    :type filename: str
+    """
+    recorder = Recorder(filename)
+    clients.use_archive(recorder)
+    try:
+        yield recorder
+    finally:
+        clients.use_archive(None)
+        recorder.close()
+
+
+@contextmanager
+def replaying(filename):
+    """Replay all the transfers performed in the context from the specified archive.
+    :type filename: str
+    """
+    replayer = Replayer(filename)
+    clients.use_archive(replayer)
+    try:
+        yield replayer
+    finally:
+        clients.use_archive(None)
+        replayer.close()
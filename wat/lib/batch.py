@@ -0,0 +1,293 @@
+# WAT Framework, make simple to do the complex
+# Copyright 2014 Francesco Marano and individual contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Scan many targets one after the other with the same plan.
+
+The components are discovered and the plan is solved once, then it is executed against every target
+in its own execution context (see `wat.lib.context`), with a registry holding only the initial state
+and a client configuration pointing to that target.
+Once a target is done, its results are handed over and everything the framework kept about it
+(the retrieved properties, the cached responses, the idle connections and the governor statistics)
+is released, so that the memory does not grow with the number of scanned targets.
+Targets could be scanned by many worker processes too, sharing the same plan (see `ForkedBatch`).
+
+    from wat.lib.batch import Batch, targets
+
+    plan = RelaxedGraphPlan().solution
+    with open('targets.lst') as f:
+        for result in Batch(plan).run(targets(f)):
+            print result.url, result.properties
+"""
+
+__all__ = ['Target', 'Result', 'Batch', 'ForkedBatch', 'targets']
+
+import multiprocessing
+from urlparse import urlparse
+
+from wat.lib import clients
+from wat.lib.components import WatComponent
+from wat.lib.context import ExecutionContext
+from wat.lib.exceptions import ClientError, InvalidTypeError
+from wat.lib.properties import Registry
+from wat.lib.shortcuts import hierlogger as logger
+
+
+class Target(object):
+    """A website to scan"""
+
+    def __init__(self, url, port=None):
+        """
+        :param url: the website URL (a trailing slash is added if missing)
+        :type url: str
+        :param port: the port to connect to (default: the URL one, or the default port of its scheme)
+        :type port: int
+        """
+        if not url.endswith('/'):
+            url += '/'
+        self.url = url
+        parsed = urlparse(url)
+        self.port = port or parsed.port or (443 if parsed.scheme == 'https' else 80)
+        self.host = parsed.netloc  # the host the governor limits the requests to
+
+    @classmethod
+    def parse(cls, line):
+        """Parse a targets list line, made of the URL and optionally of the port (e.g. `example.com 8080`).
+        The scheme is added to the URL if missing.
+
+        :type line: str
+        :return: the target
+        :rtype: Target
+        :raise ValueError: if the port is not a number or there are more fields
+        """
+        fields = line.split()
+        if not 1 <= len(fields) <= 2:
+            raise ValueError("Invalid target '%s', URL [PORT] expected" % line.strip())
+        url = fields[0]
+        if '://' not in url:
+            url = 'http://' + url
+        return cls(url, int(fields[1]) if len(fields) == 2 else None)
+
+    def __repr__(self):
+        return "Target('%s', %d)" % (self.url, self.port)
+
+    def __eq__(self, other):
+        return isinstance(other, Target) and (self.url, self.port) == (other.url, other.port)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.url, self.port))
+
+
+class Result(object):
+    """The properties retrieved from a target"""
+
+    def __init__(self, target, properties, errors=None):
+        """
+        :param target: the scanned target
+        :type target: Target
+        :param properties: the retrieved properties and their values
+        :type properties: dict
+        :param errors: the messages of the error which stopped the scan, if any
+        :type errors: list
+        """
+        self.target = target
+        self.properties = properties
+        self.errors = errors
+
+    @property
+    def url(self):
+        return self.target.url
+
+    @property
+    def failed(self):
+        """:return: True if the scan was stopped by an error, False otherwise
+        :rtype: bool
+        """
+        return self.errors is not None
+
+    def to_dict(self):
+        return {
+            'url': self.target.url,
+            'port': self.target.port,
+            'properties': self.properties,
+            'errors': self.errors,
+        }
+
+
+def targets(lines):
+    """Parse a targets list, skipping the blank lines and the comments (starting with '#').
+    :param lines: the targets list lines (e.g. a file)
+    :type lines: collections.Iterable[str]
+    :return: the targets, in order
+    :rtype: collections.Iterator[Target]
+    :raise ValueError: if a line is not a valid target
+    """
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield Target.parse(line)
+
+
+class Batch(object):
+    """Execute a plan against many targets, one after the other"""
+
+    def __init__(self, plan, initial_state=None, scheduler='layered', concurrency=1, race=1):
+        """
+        :param plan: the plan to execute against every target
+        :type plan: wat.lib.graph.LayeredPlan
+        :param initial_state: the <property, value> pairs every scan starts from
+        :type initial_state: list|set|tuple
+        :param scheduler: the plan execution scheduler, 'layered' (see `LayeredPlan.execute()`)
+            or 'dataflow' (see `LayeredPlan.schedule()`)
+        :type scheduler: str
+        :param concurrency: the maximum number of concurrent transfers of every scan
+        :type concurrency: int
+        :param race: the maximum number of equivalent components whose transfers are performed at the same time
+        :type race: int
+        :raise InvalidTypeError: if the initial state is not a list, set or tuple
+        """
+        if initial_state is not None and not isinstance(initial_state, (list, set, tuple)):
+            raise InvalidTypeError(initial_state, (list, set, tuple, type(None)))
+        self.plan = plan
+        self.initial_state = list(initial_state or ())
+        self.scheduler = scheduler
+        self.concurrency = concurrency
+        self.race = race
+
+    def properties(self):
+        """:return: the retrieved properties to report, i.e. the goal state ones if there is a goal,
+        all of them but the initial state ones otherwise
+        :rtype: dict
+        """
+        registry = Registry.instance()
+        initial = set(prop for prop, _ in self.initial_state)
+        goal = set(str(prop) for prop in self.plan.goal_state) if self.plan.goal_state is not None else None
+        return dict(
+            (prop, value) for prop, value in registry.iteritems()
+            if prop not in initial and (goal is None or prop in goal)
+        )
+
+    def scan(self, target):
+        """Execute the plan against the target.
+        :type target: Target
+        :rtype: Result
+        """
+        _logger = logger()
+        _logger.info("Scanning '%s'" % target.url)
+        context = ExecutionContext(url=target.url, port=target.port)
+        try:
+            with context:
+                WatComponent.register(self.initial_state)
+                errors = None
+                try:
+                    if self.scheduler == 'dataflow':
+                        self.plan.schedule(concurrency=self.concurrency, race=self.race)
+                    else:
+                        self.plan.execute(concurrency=self.concurrency, race=self.race)
+                except ClientError as error:
+                    errors = [str(message) for message in error.messages]
+                    for message in errors:
+                        _logger.critical(message)
+                return Result(target, self.properties(), errors)
+        finally:
+            self.release(target, context)
+
+    @staticmethod
+    def release(target, context):
+        """Forget everything the framework kept about the target"""
+        context.close()
+        clients.ResponseCache.instance().forget(target.url, target.port)
+        clients.Governor.instance().forget(target.host)
+
+    def warm(self):
+        """Import all the plan components, e.g. before forking worker processes, so that they share them"""
+        for layer in self.plan.action_layers:
+            for action in layer.actions:
+                if hasattr(action, 'load'):
+                    action.load()
+
+    def run(self, targets):
+        """Scan the targets one after the other.
+        :type targets: collections.Iterable[Target]
+        :return: the result of every target, as soon as it is done
+        :rtype: collections.Iterator[Result]
+        """
+        for target in targets:
+            yield self.scan(target)
+
+
+_batch = None  # the batch the forked workers execute
+
+
+def _initialize():
+    """Make a forked worker ready to scan"""
+    clients.after_fork()
+
+
+def _scan(target):
+    return _batch.scan(target)
+
+
+class ForkedBatch(Batch):
+    """Execute a plan against many targets in a pool of worker processes, to use all the CPU cores.
+
+    The plan components are imported before the workers are forked, so every worker starts warm and shares
+    the components index, the plan and the imported modules with the others, copy-on-write.
+    Targets are handed out to the workers a few at a time, and their results are streamed back
+    to the parent process as soon as they are done, in completion order.
+    """
+
+    def __init__(self, plan, processes=None, chunksize=1, **kwargs):
+        """
+        :param plan: the plan to execute against every target
+        :type plan: wat.lib.graph.LayeredPlan
+        :param processes: the number of worker processes (default: the number of CPUs)
+        :type processes: int
+        :param chunksize: the number of targets handed out to a worker at a time
+        :type chunksize: int
+        :param kwargs: the scan options (see `Batch`)
+        """
+        super(ForkedBatch, self).__init__(plan, **kwargs)
+        self.processes = processes or multiprocessing.cpu_count()
+        self.chunksize = chunksize
+
+    def run(self, targets):
+        """Scan the targets in the worker processes.
+        All the targets are read before the workers start, so that an invalid one stops nothing halfway.
+
+        :type targets: collections.Iterable[Target]
+        :return: the result of every target, as soon as it is done
+        :rtype: collections.Iterator[Result]
+        :raise RuntimeError: if another batch is running in worker processes
+        """
+        global _batch
+        if _batch is not None:
+            raise RuntimeError("Another batch is running in worker processes")
+        targets = list(targets)
+        self.warm()
+        _batch = self
+        workers = multiprocessing.Pool(processes=self.processes, initializer=_initialize)
+        try:
+            for result in workers.imap_unordered(_scan, targets, self.chunksize):
+                yield result
+            workers.close()
+        except BaseException:
+            workers.terminate()
+            raise
+        finally:
+            workers.join()
+            _batch = None
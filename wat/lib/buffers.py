@@ -0,0 +1,97 @@
+# WAT Framework, make simple to do the complex
+# Copyright 2014 Francesco Marano and individual contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__all__ = ['ResponseBuffer']
+
+import mmap
+import tempfile
+
+from wat import conf
+
+
+class ResponseBuffer(object):
+    """A growable buffer for response bodies, to use as write function (see `write()`).
+
+    Appends take amortized constant time. Once the content grows past the spill size, it is moved
+    to an anonymous temporary file, memory-mapped on reading, so that the memory in use stays bounded.
+    The content is read without copying it through `view()`, or copied by `str()`.
+    """
+
+    def __init__(self, spill_size=None):
+        """
+        :param spill_size: the size (in bytes) past which the content is moved to a temporary file,
+        0 means never (default: `conf.buffers.SPILL_SIZE`)
+        :type spill_size: int
+        """
+        self.spill_size = conf.buffers.instance().SPILL_SIZE if spill_size is None else spill_size
+        self.__memory = bytearray()
+        self.__file = None
+        self.__size = 0
+        self.__map = None  # (mmap, mapped size) of the temporary file
+
+    def __len__(self):
+        return self.__size
+
+    def __str__(self):
+        return self.view()[:]
+
+    def __getitem__(self, index):
+        return self.view()[index]
+
+    @property
+    def spilled(self):
+        """:return: True if the content was moved to a temporary file
+        :rtype: bool
+        """
+        return self.__file is not None
+
+    def write(self, data):
+        """Append the specified data to the buffer.
+        :type data: str
+        """
+        if self.__file is None:
+            self.__memory += data
+            if self.spill_size and len(self.__memory) > self.spill_size:
+                self.__spill()
+        else:
+            self.__file.write(data)
+        self.__size += len(data)
+
+    def __spill(self):
+        self.__file = tempfile.TemporaryFile(prefix='wat-', dir=conf.buffers.instance().DIRECTORY)
+        self.__file.write(self.__memory)
+        self.__memory = None
+
+    def view(self):
+        """:return: a read-only view of the content, supporting slicing and the buffer interface
+        (e.g. it could be searched by the `re` functions) without copying the content.
+        It does not include the data written afterwards.
+        :rtype: buffer|mmap.mmap
+        """
+        if self.__file is None:
+            return buffer(self.__memory)
+        if self.__map is None or self.__map[1] != self.__size:
+            self.__file.flush()
+            self.__map = (mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ), self.__size)
+        return self.__map[0]
+
+    def close(self):
+        """Discard the content, releasing the memory and the temporary file"""
+        if self.__file is not None:
+            self.__map = None
+            self.__file.close()
+            self.__file = None
+        self.__memory = bytearray()
+        self.__size = 0
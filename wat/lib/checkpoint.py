@@ -0,0 +1,116 @@
+# WAT Framework, make simple to do the complex
+# Copyright 2014 Francesco Marano and individual contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Save the execution state of a plan after every component, to resume it later where it stopped.
+
+The state is made of the retrieved properties and of the completed components, i.e. those which
+retrieved their property. A resumed execution starts from the saved properties as initial state,
+so that their components are not executed again, and skips the completed components, so that only
+the failed ones, the interrupted ones and those never tried are executed::
+
+    from wat.lib.checkpoint import Checkpoint
+
+    checkpoint = Checkpoint.load('scan.checkpoint')
+    plan = RelaxedGraphPlan(initial_state=checkpoint.initial_state).solution
+    plan.execute(checkpoint=checkpoint)
+
+The checkpoint is a JSON file, replaced atomically at every save, so that a crash never leaves it half written.
+"""
+
+__all__ = ['Checkpoint']
+
+import os
+import json
+from datetime import datetime
+
+import wat
+from wat import conf
+from wat.lib.properties import Registry
+from wat.lib.shortcuts import native
+
+FORMAT = 1
+
+
+class Checkpoint(object):
+    """The execution state of a plan against a target"""
+
+    def __init__(self, filename, properties=None, completed=None, url=None):
+        """
+        :param filename: the file the state is saved into (an existing one is overwritten)
+        :type filename: str
+        :param properties: the properties retrieved by a previous execution
+        :type properties: dict
+        :param completed: the names of the components completed by a previous execution
+        :type completed: set
+        :param url: the target of a previous execution
+        :type url: str
+        """
+        self.filename = filename
+        self.properties = properties or dict()
+        self.completed = completed or set()
+        self.url = url
+
+    @classmethod
+    def load(cls, filename):
+        """Read the state saved by a previous execution
+        :param filename: the checkpoint file, if it does not exist the execution starts from scratch
+        :type filename: str
+        :rtype: Checkpoint
+        :raise ValueError: if the file is not a checkpoint
+        """
+        if not os.path.exists(filename):
+            return cls(filename)
+        with open(filename) as f:
+            state = native(json.load(f))
+        if not isinstance(state, dict) or state.get('format') != FORMAT:
+            raise ValueError("'%s' is not a checkpoint" % filename)
+        return cls(filename, state['properties'], set(state['components']), state['url'])
+
+    @property
+    def initial_state(self):
+        """:return: the <property, value> pairs to start a resumed execution from
+        :rtype: list
+        """
+        return self.properties.items()
+
+    def complete(self, component):
+        """Save the component as completed, together with the properties retrieved until now
+        :param component: the component which retrieved its property
+        :raise TypeError: if a property value cannot be saved as JSON (see `save()`)
+        """
+        self.save(self.completed | {str(component)})
+
+    def save(self, completed=None):
+        """Save the current state, i.e. the properties in the registry and the completed components
+        :param completed: the names of the completed components (default: the ones already saved)
+        :type completed: set
+        :raise TypeError: if a property value cannot be saved as JSON, then neither the file nor the checkpoint change
+        """
+        completed = self.completed if completed is None else completed
+        properties = dict(Registry.instance())
+        url = getattr(conf.clients.instance(), 'URL', None)
+        data = json.dumps({
+            'format': FORMAT,
+            'framework': wat.project.version,
+            'url': url,
+            'saved': datetime.now().isoformat(),
+            'properties': properties,
+            'components': sorted(completed),
+        }, indent=2, sort_keys=True)
+        temporary = self.filename + '.tmp'
+        with open(temporary, 'w') as f:
+            f.write(data)
+        os.rename(temporary, self.filename)
+        self.properties, self.completed, self.url = properties, completed, url
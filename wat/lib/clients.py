@@ -13,42 +13,974 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-__all__ = ['Curl', 'CurlMulti', 'CurlShare']
+__all__ = [
+    'Curl', 'CurlMulti', 'CurlShare', 'Pool', 'ResponseCache', 'Response', 'Governor', 'Transfers', 'Future',
+    'shared', 'after_fork', 'use_archive'
+]
+
+import re
+import sys
+import time
+import weakref
+import threading
+from timeit import default_timer as timer
+from urlparse import urlparse
+from collections import deque, OrderedDict
 
 import pycurl
+from singleton.singleton import ThreadSafeSingleton
 
 from wat import conf
+from wat.lib.context import contextual
 from wat.lib.exceptions import ImproperlyConfigured
 
 
+def _target(url, port=None):
+    """:return: the target of the requests to the specified URL, i.e. its scheme, host and port
+    :rtype: tuple
+    """
+    url = urlparse(url or '')
+    return url.scheme, url.hostname, port or url.port
+
+
+class _Template(object):
+    """The framework default options, compiled once per configuration revision (see `conf.clients.revision`)
+    so that new handles are initialized without walking all the configurable options every time.
+    """
+
+    def __init__(self, client_conf):
+        """
+        :type client_conf: conf.clients
+        """
+        self.revision = client_conf.revision
+        self.options = list()  # (option, value, name) to set on new handles
+        for name in client_conf.__all__:
+            if hasattr(client_conf, name) and hasattr(pycurl, name):
+                self.options.append((getattr(pycurl, name), getattr(client_conf, name), name))
+        if not hasattr(client_conf, 'SHARE'):
+            self.options.append((pycurl.SHARE, shared(), 'SHARE'))
+        self.defaults = dict((option, value) for option, value, _ in self.options)
+        url = getattr(client_conf, 'URL', None)
+        # the target of the requests (scheme, host and port)
+        self.target = _target(url, getattr(client_conf, 'PORT', None))
+        self.host = urlparse(url or '').netloc
+
+    def apply(self, curl):
+        """Set the default options on the specified easy handle.
+        :type curl: pycurl.Curl
+        :raise ImproperlyConfigured: if some default option has an invalid value
+        """
+        for option, value, name in self.options:
+            try:
+                curl.setopt(option, value)
+            except TypeError as e:
+                raise ImproperlyConfigured(
+                    message=e.message + " (option: '%(option)s')",
+                    params={'option': name}
+                )
+
+
+# client configuration -> its last compiled template, so that every execution context keeps its own
+_templates = weakref.WeakKeyDictionary()
+
+
+def _compiled():
+    """:return: the default options template for the current configuration revision
+    (of the current execution context, see `wat.lib.context`)
+    :rtype: _Template
+    """
+    client_conf = conf.clients.instance()
+    template = _templates.get(client_conf)
+    if template is None or template.revision != client_conf.revision:
+        template = _templates[client_conf] = _Template(client_conf)
+    return template
+
+
+def _defaults(curl):
+    """Set the framework default options on the specified easy handle.
+    :type curl: pycurl.Curl
+    :raise ImproperlyConfigured: if some default option has an invalid value
+    """
+    _compiled().apply(curl)
+
+
+_share = None
+_share_lock = threading.Lock()
+
+
+def shared():
+    """Return the process-wide share object, attached to every easy handle the framework creates
+    unless another one is configured. It shares the DNS cache and the SSL sessions among all the handles,
+    so that names are resolved and full SSL handshakes are made only once per target.
+    pyCurl protects the shared data with its own locks, so handles could run from several threads.
+
+    :rtype: pycurl.CurlShare
+    """
+    global _share
+    with _share_lock:
+        if _share is None:
+            share = CurlShare()
+            share.setopt(pycurl.SH_SHARE, pycurl.LOCK_DATA_DNS)
+            share.setopt(pycurl.SH_SHARE, pycurl.LOCK_DATA_SSL_SESSION)
+            _share = share
+    return _share
+
+
+def after_fork():
+    """Forget the share object and the idle handles inherited from the parent process,
+    to be called in a forked child process before performing any transfer,
+    so that it never uses the connections and the shared data of its parent.
+    """
+    global _share
+    with _share_lock:
+        _share = None
+    _templates.clear()
+    Pool.process_instance().clear()
+
+
 class _CurlClient(object):
-    def __new__(cls, pycurl_class, *args, **kwargs):
+    def __new__(cls, pycurl_class, options=True, *args, **kwargs):
         """Instantiate and initialize the specified pyCurl class with framework default options.
         :param pycurl_class: the pyCurl client class to instantiate
         :type pycurl_class: class
+        :param options: specify if the framework default options have to be set (only easy handles accept them)
+        :type options: bool
         :return: an initialized instance of the specified pyCurl class
         """
         curl = pycurl_class()
-        client_conf = conf.clients.instance()
-        for option in client_conf.__all__:
-            if hasattr(client_conf, option) and hasattr(pycurl, option):
-                try:
-                    curl.setopt(getattr(pycurl, option), getattr(client_conf, option))
-                except TypeError as e:
-                    raise ImproperlyConfigured(
-                        message=e.message + " (option: '%(option)s')",
-                        params={'option': option}
-                    )
+        if options:
+            _defaults(curl)
         return curl
 
 
-class Curl(_CurlClient):
-    """Wrapper for the `pycurl.Curl` class
-    :return: a default initialized instance of `pycurl.Curl` class
-    :rtype: pycurl.Curl
+# the options changing the request method, reset all together going back to GET
+_METHOD_OPTIONS = {
+    pycurl.NOBODY, pycurl.HTTPGET, pycurl.POST, pycurl.POSTFIELDS, pycurl.POSTFIELDSIZE, pycurl.COPYPOSTFIELDS,
+    pycurl.HTTPPOST, pycurl.UPLOAD, pycurl.PUT, pycurl.CUSTOMREQUEST,
+}
+# the options supporting `unsetopt()` to go back to the libcurl default value
+_UNSETTABLE_OPTIONS = {pycurl.COOKIE, pycurl.RANGE, pycurl.USERPWD, pycurl.HTTPPOST, pycurl.CUSTOMREQUEST}
+
+
+def _reset(curl, options):
+    """Reset the specified options of an easy handle to the framework defaults, or to the libcurl ones
+    if the framework does not specify them. If some option cannot be reset, the whole handle is reset.
+    Connections, session IDs, DNS cache and cookies are kept anyway.
+
+    :param curl: the handle to reset
+    :type curl: pycurl.Curl
+    :param options: the options to reset
+    :type options: collections.Iterable[int]
     """
-    def __new__(cls, *args, **kwargs):
-        return super(Curl, cls).__new__(cls, pycurl.Curl, args, kwargs)
+    defaults = _compiled().defaults
+    method = False
+    for option in options:
+        if option in defaults:
+            curl.setopt(option, defaults[option])
+        elif option == pycurl.URL:
+            pass  # every request sets its own
+        elif option in _METHOD_OPTIONS:
+            method = True
+        elif option in _UNSETTABLE_OPTIONS:
+            curl.unsetopt(option)
+        elif option == pycurl.WRITEFUNCTION:
+            curl.setopt(pycurl.WRITEFUNCTION, sys.stdout.write)
+        elif option == pycurl.HEADERFUNCTION:
+            curl.setopt(pycurl.HEADERFUNCTION, lambda header: None)
+        else:
+            curl.reset()
+            _defaults(curl)
+            return
+    if method:
+        # unsetting HTTPPOST switches to a POST request, so go back to GET as the last thing
+        for option in (pycurl.HTTPPOST, pycurl.CUSTOMREQUEST):
+            curl.unsetopt(option)
+        curl.setopt(pycurl.NOBODY, False)
+        curl.setopt(pycurl.HTTPGET, True)
+
+
+def _method(method, option, value):
+    """:return: the request method once the specified option is set (CUSTOMREQUEST is not considered)
+    :rtype: str
+    """
+    if option == pycurl.NOBODY:
+        return 'HEAD' if value else ('GET' if method == 'HEAD' else method)
+    elif option == pycurl.HTTPGET:
+        return 'GET' if value else method
+    elif option == pycurl.POST:
+        return 'POST' if value else method
+    elif option in (pycurl.POSTFIELDS, pycurl.COPYPOSTFIELDS, pycurl.HTTPPOST):
+        return 'POST'
+    elif option in (pycurl.UPLOAD, pycurl.PUT):
+        return 'PUT' if value else method
+    return method
+
+
+@contextual('pool')
+class Pool(object):
+    """A pool of default initialized handles, to keep the connections to the target alive
+    between the components which borrow them one after the other.
+
+    Easy handles are pooled by target, since each of them keeps its own connections cache,
+    and by configuration revision, since they are initialized with the default options of that revision.
+    Multi handles are pooled too, since the connections of the easy handles they perform are kept by them.
+    Handles could be borrowed and released from several threads.
+    Every execution context has its own pool (see `wat.lib.context.ExecutionContext`).
+    """
+
+    size = 8  # the maximum number of idle handles kept for every target
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__handles = dict()  # (target, revision) -> idle easy handles
+        self.__multi = list()  # idle multi handles
+
+    def borrow(self):
+        """:return: an idle easy handle for the current target, or a new one if there is not,
+        and the target and revision it is borrowed for
+        :rtype: tuple[pycurl.Curl, tuple]
+        """
+        template = _compiled()
+        target = (template.target, template.revision)
+        with self.__lock:
+            handles = self.__handles.get(target)
+            if handles:
+                return handles.pop(), target
+        return _CurlClient(pycurl.Curl), target
+
+    def release(self, handle, target, options):
+        """Return an easy handle to the pool, resetting the specified options it was borrowed with.
+        Handles borrowed before the last configuration change are closed instead.
+        :param handle: the borrowed handle
+        :type handle: pycurl.Curl
+        :param target: the target and revision the handle was borrowed for
+        :type target: tuple
+        :param options: the options set by the borrower
+        :type options: collections.Iterable[int]
+        """
+        if target[1] != conf.clients.instance().revision:
+            handle.close()
+            return
+        _reset(handle, options)
+        with self.__lock:
+            handles = self.__handles.setdefault(target, list())
+            if len(handles) < self.size:
+                handles.append(handle)
+                return
+        handle.close()
+
+    def clear(self):
+        """Close all the idle handles, and so their connections"""
+        with self.__lock:
+            handles = [handle for handles in self.__handles.itervalues() for handle in handles] + self.__multi
+            self.__handles.clear()
+            self.__multi = list()
+        for handle in handles:
+            handle.close()
+
+    def borrow_multi(self):
+        """:return: an idle multi handle, or a new one if there is not
+        :rtype: pycurl.CurlMulti
+        """
+        with self.__lock:
+            if self.__multi:
+                return self.__multi.pop()
+        return CurlMulti()
+
+    def release_multi(self, multi):
+        """Return a multi handle (with no easy handles) to the pool.
+        :type multi: pycurl.CurlMulti
+        """
+        with self.__lock:
+            if len(self.__multi) < self.size:
+                self.__multi.append(multi)
+                return
+        multi.close()
+
+
+# the options whose value does not change the response
+_UNKEYED_OPTIONS = _METHOD_OPTIONS | {
+    pycurl.WRITEFUNCTION, pycurl.HEADERFUNCTION, pycurl.PROGRESSFUNCTION, pycurl.DEBUGFUNCTION,
+    pycurl.NOPROGRESS, pycurl.VERBOSE, pycurl.SHARE,
+}
+# the options whose response could not be replayed
+_UNCACHEABLE_OPTIONS = {pycurl.WRITEDATA, pycurl.WRITEHEADER}
+# the framework options changing the response, when not set by the borrower
+_KEYED_DEFAULTS = (
+    pycurl.HTTPHEADER, pycurl.COOKIE, pycurl.USERPWD, pycurl.USERAGENT, pycurl.FOLLOWLOCATION, pycurl.PROXY,
+)
+# the transfer information kept together with the cached responses
+_CACHED_INFO = (
+    pycurl.HTTP_CODE, pycurl.EFFECTIVE_URL, pycurl.CONTENT_TYPE, pycurl.REDIRECT_URL, pycurl.REDIRECT_COUNT,
+    pycurl.SIZE_DOWNLOAD, pycurl.HEADER_SIZE,
+)
+
+
+class Response(object):
+    """A response kept by the `ResponseCache`"""
+
+    def __init__(self, headers, body, info):
+        """
+        :param headers: the received header lines
+        :type headers: list[str]
+        :param body: the received body
+        :type body: str
+        :param info: the transfer information (see `pycurl.Curl.getinfo()`), by option
+        :type info: dict
+        """
+        self.headers = headers
+        self.body = body
+        self.info = info
+
+    def __len__(self):
+        """Return the size of the response, in bytes"""
+        return len(self.body) + sum(len(header) for header in self.headers)
+
+
+class _Flight(object):
+    """A transfer in progress, whose response is awaited by the concurrent requests with the same key"""
+
+    def __init__(self):
+        self.thread = threading.current_thread()  # the thread performing the transfer
+        self.response = None
+        self.error = None
+        self.__landed = threading.Event()
+
+    def land(self, response=None, error=None):
+        """Wake up the awaiting requests. With neither a response nor an error the transfer was abandoned."""
+        self.response = response
+        self.error = error
+        self.__landed.set()
+
+    def wait(self):
+        self.__landed.wait()
+
+
+@ThreadSafeSingleton
+class ResponseCache(object):
+    """Keep the responses to GET and HEAD requests for the whole run, so that the components fetching
+    the same resource do not repeat the transfer (see `conf.cache` for size and eviction options).
+
+    Responses are keyed by request method, target, URL, request options (e.g. headers and cookies)
+    and the cookies of the handle. A cached GET response satisfies HEAD requests too.
+    The concurrent requests with the same key collapse into a single transfer (see `lead()`).
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__responses = OrderedDict()  # key -> response, from the least recently used
+        self.__flights = dict()  # key -> flight
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.__responses)
+
+    def get(self, key):
+        """:return: the cached response for the specified key, if any
+        :rtype: Response|None
+        """
+        keys = [key] if key[0] != 'HEAD' else [key, ('GET',) + key[1:]]
+        with self.__lock:
+            for key in keys:
+                response = self.__responses.pop(key, None)
+                if response is not None:
+                    self.__responses[key] = response  # now it is the most recently used one
+                    self.hits += 1
+                    return response
+            self.misses += 1
+        return None
+
+    def put(self, key, response):
+        """Cache the specified response, if it is cacheable, evicting the least recently used ones if needed.
+        Server errors and responses bigger than `conf.cache.MAX_RESPONSE_SIZE` are not cached.
+        :type key: tuple
+        :type response: Response
+        """
+        cache_conf = conf.cache.instance()
+        if not 0 < response.info.get(pycurl.HTTP_CODE, 0) < 500 or len(response) > cache_conf.MAX_RESPONSE_SIZE:
+            return
+        with self.__lock:
+            self.__responses.pop(key, None)
+            self.__responses[key] = response
+            while len(self.__responses) > cache_conf.SIZE:
+                self.__responses.popitem(last=False)
+
+    def lead(self, key):
+        """Register the transfer with the specified key as in progress, unless it already is.
+        :return: the flight of the transfer, and True if the caller has to perform it and then `land()` it
+        :rtype: tuple[_Flight, bool]
+        """
+        with self.__lock:
+            flight = self.__flights.get(key)
+            if flight is not None:
+                return flight, False
+            flight = self.__flights[key] = _Flight()
+            return flight, True
+
+    def land(self, key, flight, response=None, error=None):
+        """Complete a transfer registered by `lead()`, caching its response and waking up the awaiting requests.
+        :type key: tuple
+        :type flight: _Flight
+        :param response: the received response, if the transfer completed
+        :type response: Response
+        :param error: the error occurred during the transfer, if any
+        :type error: pycurl.error
+        """
+        with self.__lock:
+            if self.__flights.get(key) is flight:
+                del self.__flights[key]
+        if response is not None:
+            self.put(key, response)
+        flight.land(response, error)
+
+    def forget(self, url, port=None):
+        """Forget the cached responses of the specified target, keeping the ones of the others
+        :param url: the target URL
+        :type url: str
+        :param port: the target port (default: the URL one)
+        :type port: int
+        """
+        target = _target(url, port)
+        with self.__lock:
+            for key in [key for key in self.__responses if key[1][0] == target]:
+                del self.__responses[key]
+
+    def clear(self):
+        """Forget all the cached responses"""
+        with self.__lock:
+            self.__responses.clear()
+            self.hits = self.misses = 0
+
+
+_archive = None
+
+
+def use_archive(archive):
+    """Record all the transfers into the specified archive, or replay them from it instead of performing them
+    (see `wat.lib.archive`).
+    :param archive: the archive to use, None to go back to perform the transfers only
+    :type archive: wat.lib.archive.Recorder|wat.lib.archive.Replayer|None
+    """
+    global _archive
+    _archive = archive
+
+
+_EWMA = 0.2  # weight of the last sample in the moving averages
+
+
+class _Bucket(object):
+    """The token bucket and the traffic statistics of a host"""
+
+    def __init__(self, rate, burst):
+        self.configured = (rate, burst)
+        self.rate = float(rate) if rate else None  # requests per second, None means no limit
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = timer()
+        self.active = 0  # transfers in progress
+        self.started = None  # start time of the last transfer
+        self.interval = None  # average time between transfers
+        self.latency = None  # average response time
+        self.samples = 0
+        self.backed_off = 0
+
+    def take(self, now):
+        """Take a token, if available.
+        :return: 0 if the token was taken, otherwise the seconds to wait for it
+        :rtype: float
+        """
+        if self.rate is None:
+            self.tokens, self.updated = float(self.burst), now
+            return 0
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def start(self, now):
+        if self.started is not None:
+            interval = now - self.started
+            self.interval = interval if self.interval is None else _EWMA * interval + (1 - _EWMA) * self.interval
+        self.started = now
+        self.active += 1
+
+    def adapt(self, code, elapsed, governor_conf):
+        """Halve the rate on an overload sign (at most once per second), otherwise increase it a little
+        (about one more request per second every second), up to the configured one.
+        """
+        overloaded = code in governor_conf.BACKOFF_CODES
+        if code and elapsed is not None:
+            if self.samples >= 5 and elapsed > governor_conf.BACKOFF_LATENCY * self.latency:
+                overloaded = True
+            self.latency = elapsed if self.latency is None else _EWMA * elapsed + (1 - _EWMA) * self.latency
+            self.samples += 1
+        now = timer()
+        if overloaded:
+            if now - self.backed_off >= 1:
+                rate = self.rate or (1 / self.interval if self.interval else governor_conf.MIN_RATE)
+                self.rate = max(governor_conf.MIN_RATE, rate / 2)
+                self.tokens = min(self.tokens, 0)
+                self.updated = self.backed_off = now
+        elif self.rate is not None:
+            self.rate += 1 / self.rate
+            if governor_conf.RATE:
+                self.rate = min(self.rate, float(governor_conf.RATE))
+
+
+@ThreadSafeSingleton
+class Governor(object):
+    """Limit the request rate to every host (through a token bucket per host) and the concurrent transfers,
+    as configured in `conf.governor`. In adaptive mode, the rate to a host is halved when it responds
+    with some status codes (e.g. 429 Too Many Requests) or slower than usual, then it slowly increases again.
+
+    Every transfer performed by a `Curl` handle, directly or through a `Transfers` object, is governed:
+    it starts once admitted (see `admit()`) and then it is released (see `release()`).
+    """
+
+    poll = 0.01  # seconds between the attempts to get a transfer slot
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__buckets = dict()  # host -> bucket
+        self.__active = 0  # transfers in progress
+
+    def __bucket(self, host, reset=False):
+        """:return: the bucket of the specified host, a new one if the configured rate changed in the meanwhile"""
+        governor_conf = conf.governor.instance()
+        bucket = self.__buckets.get(host)
+        if bucket is None or reset or bucket.configured != (governor_conf.RATE, governor_conf.BURST):
+            active = bucket.active if bucket is not None else 0
+            bucket = self.__buckets[host] = _Bucket(governor_conf.RATE, governor_conf.BURST)
+            bucket.active = active
+        return bucket
+
+    def admit(self, host):
+        """Try to start a transfer to the specified host.
+        :type host: str
+        :return: 0 if the transfer could start (and then it has to be released),
+        otherwise the seconds to wait before trying again
+        :rtype: float
+        """
+        governor_conf = conf.governor.instance()
+        with self.__lock:
+            bucket = self.__bucket(host)
+            if governor_conf.CONNECTIONS and self.__active >= governor_conf.CONNECTIONS or \
+                    governor_conf.HOST_CONNECTIONS and bucket.active >= governor_conf.HOST_CONNECTIONS:
+                return self.poll
+            now = timer()
+            delay = bucket.take(now)
+            if delay:
+                return delay
+            bucket.start(now)
+            self.__active += 1
+            return 0
+
+    def acquire(self, host):
+        """Wait until a transfer to the specified host could start (see `admit()`).
+        :type host: str
+        """
+        delay = self.admit(host)
+        while delay:
+            time.sleep(delay)
+            delay = self.admit(host)
+
+    def release(self, host, code=None, elapsed=None):
+        """Mark a transfer to the specified host as done, adapting the rate to its outcome in adaptive mode.
+        :type host: str
+        :param code: the response status code (0 or None if there is not)
+        :type code: int
+        :param elapsed: the response time, in seconds
+        :type elapsed: float
+        """
+        governor_conf = conf.governor.instance()
+        with self.__lock:
+            self.__active -= 1
+            bucket = self.__bucket(host)
+            bucket.active -= 1
+            if governor_conf.ADAPTIVE:
+                bucket.adapt(code, elapsed, governor_conf)
+
+    def rate(self, host):
+        """:return: the current rate limit to the specified host, in requests per second (None means no limit)
+        :rtype: float|None
+        """
+        with self.__lock:
+            return self.__bucket(host).rate
+
+    def clear(self):
+        """Forget the statistics and the adapted rates of all the hosts"""
+        with self.__lock:
+            for host in self.__buckets.keys():
+                self.__bucket(host, reset=True)
+
+    def forget(self, host):
+        """Forget the statistics and the adapted rate of the specified host, unless it has transfers in progress
+        :type host: str
+        """
+        with self.__lock:
+            bucket = self.__buckets.get(host)
+            if bucket is not None and not bucket.active:
+                del self.__buckets[host]
+
+
+class Curl(object):
+    """Wrapper for the `pycurl.Curl` class.
+    It behaves like a default initialized `pycurl.Curl` handle, but its transfer could be performed
+    in advance by a `Transfers` object, together with many others: in that case the next call to `perform()`
+    does not repeat the transfer, but it only raises its error, if any.
+
+    The handle is borrowed from the `Pool`, so it could reuse the connections of the previous borrowers,
+    and it is returned to it only once released: every borrower must call `release()` when it is done
+    (a wrapper dropped without being released is garbage collected and its handle closed, not pooled).
+
+    GET and HEAD requests go through the `ResponseCache`: a cached response is replayed to the write
+    and header functions instead of repeating the transfer, and `getinfo()` returns its transfer information
+    (the information not kept by the cache comes from the last real transfer of the handle).
+
+    Requests could declare what they need from the response (see `fetch()`), so that the transfer
+    stops as soon as it is received.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.handle, self.__target = Pool.instance().borrow()
+        self.__options = set()  # the options set by the borrower
+        self.__values = dict()  # option -> value set by the borrower
+        self.__method = 'GET'
+        self.__url = False  # True if the URL was explicitly set
+        self.__performed = False  # True if the transfer was performed in advance
+        self.__error = None
+        self.__response = None  # the cached response the transfer was served with
+        self.__flight = None  # (key, flight) of the transfer led by this handle
+        self.__captured = None  # (headers, body) received during the transfer
+        self.__need = None  # (prefix, pattern) of the body needed, if not the whole one
+        self.__cut = False  # True if the transfer was stopped once the needed body was received
+
+    @property
+    def prefetchable(self):
+        """A transfer could be performed in advance only if its URL was explicitly set
+        and it was not already performed.
+        :rtype: bool
+        """
+        return self.__url and not self.__performed
+
+    def prefetched(self, error=None):
+        """Mark the transfer as performed in advance.
+        :param error: the error occurred during the transfer, if any
+        :type error: pycurl.error
+        """
+        self.__performed = True
+        self.__error = error
+
+    def fetch(self, status=False, headers=False, prefix=None, until=None, overlap=4096):
+        """Declare what is needed from the response, so that the transfer is as small as possible.
+        Once the needed body is received, the transfer is stopped without errors (and the response
+        is not cached, since it is partial).
+
+        :param status: True if only the status code is needed (a HEAD request is sent)
+        :type status: bool
+        :param headers: True if only the headers are needed (a HEAD request is sent)
+        :type headers: bool
+        :param prefix: the number of body bytes needed from the beginning, they are requested through
+        a Range header (so the status code could be 206), but the server could ignore it
+        :type prefix: int
+        :param until: the pattern the body is needed until (from the beginning), if it never matches
+        the whole body is received
+        :type until: str|re.RegexObject
+        :param overlap: the length of the longest expected match of the pattern: every received chunk is searched
+        together with the last `overlap` bytes before it only, so that the body is not searched again and again
+        :type overlap: int
+        """
+        if status or headers:
+            self.setopt(pycurl.NOBODY, True)
+            return
+        if prefix is not None:
+            self.setopt(pycurl.RANGE, '0-%d' % (prefix - 1))
+        if isinstance(until, basestring):
+            until = re.compile(until, re.DOTALL)
+        self.__need = (prefix, until, overlap) if prefix is not None or until is not None else None
+
+    @property
+    def cut(self):
+        """:return: True if the last transfer was stopped once the needed body was received (see `fetch()`)
+        :rtype: bool
+        """
+        return self.__cut
+
+    @property
+    def host(self):
+        """:return: the host (and port) the request is sent to
+        :rtype: str
+        """
+        url = self.__values.get(pycurl.URL)
+        return urlparse(url).netloc if url else _compiled().host
+
+    def governed(self, code=None):
+        """Release the `Governor` slot of the performed transfer.
+        :param code: the response status code, if not the one of the handle
+        :type code: int
+        """
+        Governor.instance().release(
+            self.host,
+            self.handle.getinfo(pycurl.HTTP_CODE) if code is None else code,
+            self.handle.getinfo(pycurl.TOTAL_TIME)
+        )
+
+    @property
+    def flight(self):
+        """:return: the flight of the transfer led by this handle, if any (see `ResponseCache.lead()`)
+        :rtype: _Flight|None
+        """
+        return self.__flight[1] if self.__flight is not None else None
+
+    def cache_key(self):
+        """:return: the key of the response in the `ResponseCache`, or None if it is not cacheable
+        :rtype: tuple|None
+        """
+        if not conf.cache.instance().SIZE or not self.__url or self.__method not in ('GET', 'HEAD') or \
+                pycurl.CUSTOMREQUEST in self.__values or _UNCACHEABLE_OPTIONS.intersection(self.__values):
+            return None
+        defaults = _compiled().defaults
+        options = dict(
+            (option, value) for option, value in self.__values.iteritems() if option not in _UNKEYED_OPTIONS
+        )
+        for option in _KEYED_DEFAULTS:
+            if option not in options and option in defaults:
+                options[option] = defaults[option]
+        key = (
+            self.__method,
+            self.__target,
+            frozenset((option, tuple(value) if isinstance(value, list) else value)
+                      for option, value in options.iteritems()),
+            tuple(self.handle.getinfo(pycurl.INFO_COOKIELIST)),
+        )
+        try:
+            hash(key)
+        except TypeError:  # some option value is not hashable
+            return None
+        return key
+
+    def setopt(self, option, value):
+        # changing the handle after the transfer invalidates it
+        self.__performed = False
+        self.__response = None
+        if option == pycurl.URL:
+            self.__url = True
+        self.__options.add(option)
+        self.__values[option] = value
+        self.__method = _method(self.__method, option, value)
+        return self.handle.setopt(option, value)
+
+    def unsetopt(self, option):
+        self.__performed = False
+        self.__response = None
+        self.__options.add(option)
+        self.__values.pop(option, None)
+        if option == pycurl.HTTPPOST:
+            self.__method = 'POST'  # libcurl switches to a POST request anyway
+        return self.handle.unsetopt(option)
+
+    def getinfo(self, option):
+        if self.__response is not None and option in self.__response.info:
+            return self.__response.info[option]
+        return self.handle.getinfo(option)
+
+    def request(self):
+        """:return: the method, the URL and the body (if any) of the request, to identify it in an archive
+        :rtype: tuple
+        """
+        url = self.__values.get(pycurl.URL) or getattr(conf.clients.instance(), 'URL', None)
+        body = None
+        for option in (pycurl.POSTFIELDS, pycurl.COPYPOSTFIELDS, pycurl.HTTPPOST):
+            if option in self.__values:
+                value = self.__values[option]
+                body = value if isinstance(value, basestring) else repr(value)
+        method = self.__values.get(pycurl.CUSTOMREQUEST, self.__method)
+        return method, url, body
+
+    def begin(self):
+        """Prepare the transfer going through the archive being replayed, if any, and the `ResponseCache`.
+        :return: True if the transfer was served by the archive or the cache, the flight to wait for
+        if the same request is in progress, False if the transfer has to be performed (and then completed by `end()`)
+        :rtype: bool|_Flight
+        :raise pycurl.error: if the replayed transfer failed, or it was not recorded
+        """
+        self.__response = None
+        self.__flight = None
+        self.__cut = False
+        archive = _archive
+        if archive is not None and archive.replaying:
+            self.__replay(archive.replay(self.request()))
+            return True
+        recording = archive is not None
+        key = self.cache_key()
+        if key is None:
+            self.__limit(self.__capture() if recording else None)
+            return False
+        cache = ResponseCache.instance()
+        response = cache.get(key)
+        if response is not None:
+            self.__replay(response)
+            return True
+        flight, leader = cache.lead(key)
+        if not leader:
+            self.__limit()  # in case the transfer is performed anyway
+            return flight
+        self.__flight = (key, flight)
+        self.__limit(self.__capture())
+        return False
+
+    def end(self, error=None, abandoned=False):
+        """Complete the performed transfer, caching its response if it was led by this handle
+        and recording it if an archive is being recorded.
+        :param error: the error occurred during the transfer, if any
+        :type error: pycurl.error
+        :param abandoned: True if the transfer was aborted
+        :type abandoned: bool
+        :return: the landed flight, if any
+        :rtype: _Flight|None
+        """
+        captured, self.__captured = self.__captured, None
+        response = None
+        if captured is not None and error is None and not abandoned:
+            headers, body = captured
+            response = Response(headers, ''.join(body), dict((info, self.handle.getinfo(info)) for info in _CACHED_INFO))
+        archive = _archive
+        if archive is not None and not archive.replaying and captured is not None and not abandoned:
+            archive.record(self.request(), response, error)
+        if self.__flight is None:
+            return None
+        (key, flight), self.__flight = self.__flight, None
+        if self.__cut:  # the response is partial
+            response = None
+        ResponseCache.instance().land(key, flight, response, error if not abandoned and not self.__cut else None)
+        return flight
+
+    def stopped(self, error):
+        """:return: the error occurred during the transfer, or None if it was stopped on purpose
+        :rtype: pycurl.error|None
+        """
+        if error is not None and self.__cut and error.args[0] == pycurl.E_WRITE_ERROR:
+            return None
+        return error
+
+    def follow(self, flight):
+        """Complete the transfer with the response of the same request performed by another handle.
+        :type flight: _Flight
+        :return: False if the other transfer was abandoned, so this one has to be performed
+        :rtype: bool
+        :raise pycurl.error: if an error occurred during the other transfer
+        """
+        if flight.error is not None:
+            raise flight.error
+        if flight.response is None:
+            return False
+        self.__replay(flight.response)
+        return True
+
+    def __capture(self):
+        """Keep the received headers and body, still passing them to the write and header functions.
+        :return: the write function set
+        :rtype: function
+        """
+        headers, body = self.__captured = list(), list()
+
+        def tee(function, chunks):
+            def callback(data):
+                chunks.append(data)
+                if function is not None:
+                    return function(data)
+            return callback
+
+        write = tee(self.__values.get(pycurl.WRITEFUNCTION, sys.stdout.write), body)
+        self.__options.update((pycurl.WRITEFUNCTION, pycurl.HEADERFUNCTION))
+        self.handle.setopt(pycurl.WRITEFUNCTION, write)
+        self.handle.setopt(pycurl.HEADERFUNCTION, tee(self.__values.get(pycurl.HEADERFUNCTION), headers))
+        return write
+
+    def __limit(self, write=None):
+        """Stop the transfer once the needed body is received (see `fetch()`).
+        :param write: the function to pass the needed body to (default: the write function of the handle)
+        :type write: function
+        """
+        if self.__need is None:
+            return
+        prefix, pattern, overlap = self.__need
+        if write is None:
+            write = self.__values.get(pycurl.WRITEFUNCTION, sys.stdout.write)
+        received = bytearray()
+
+        def cut(data):
+            scanned = len(received)  # the body already searched for the pattern
+            if prefix is not None and len(received) + len(data) > prefix:
+                data = data[:prefix - len(received)]
+                self.__cut = True
+            received.extend(data)
+            if data:
+                write(data)
+            if pattern is not None and pattern.search(buffer(received), max(0, scanned - overlap)) is not None:
+                self.__cut = True
+            if self.__cut:
+                return 0  # abort the transfer
+        self.handle.setopt(pycurl.WRITEFUNCTION, cut)
+        self.__options.add(pycurl.WRITEFUNCTION)
+
+    def __replay(self, response):
+        """Pass the cached response to the write and header functions"""
+        self.__response = response
+        header = self.__values.get(pycurl.HEADERFUNCTION)
+        if header is not None:
+            for line in response.headers:
+                header(line)
+        if self.__method != 'HEAD' and response.body:
+            self.__values.get(pycurl.WRITEFUNCTION, sys.stdout.write)(response.body)
+
+    def release(self):
+        """Return the handle to the pool. The wrapper cannot be used anymore."""
+        if self.handle is not None:
+            handle, self.handle = self.handle, None
+            Pool.instance().release(handle, self.__target, self.__options)
+
+    def close(self):
+        """Release the handle instead of closing it (see `release()`)"""
+        self.release()
+
+    def perform(self):
+        if self.__performed:
+            self.__performed = False
+            if self.__error is not None:
+                raise self.__error
+            return
+        state = self.begin()
+        if state is True:
+            return
+        # wait for the same request, unless it is performed by this very thread (e.g. by a `Transfers` callback)
+        if isinstance(state, _Flight) and state.thread is not threading.current_thread():
+            state.wait()
+            if self.follow(state):
+                return
+        Governor.instance().acquire(self.host)
+        try:
+            self.handle.perform()
+        except pycurl.error as e:
+            error = self.stopped(e)
+            self.end(error)
+            if error is None:
+                return
+            raise
+        except BaseException:
+            self.end(abandoned=True)
+            raise
+        finally:
+            self.governed()
+        self.end()
+
+    def __getattr__(self, name):
+        if name == 'handle':  # not yet borrowed
+            raise AttributeError(name)
+        return getattr(self.handle, name)
 
 
 class CurlMulti(_CurlClient):
@@ -57,7 +989,7 @@ class CurlMulti(_CurlClient):
     :rtype: pycurl.CurlMulti
     """
     def __new__(cls, *args, **kwargs):
-        return super(CurlMulti, cls).__new__(cls, pycurl.CurlMulti, args, kwargs)
+        return super(CurlMulti, cls).__new__(cls, pycurl.CurlMulti, False, args, kwargs)
 
 
 class CurlShare(_CurlClient):
@@ -66,4 +998,221 @@ class CurlShare(_CurlClient):
     :rtype: pycurl.CurlShare
     """
     def __new__(cls, *args, **kwargs):
-        return super(CurlShare, cls).__new__(cls, pycurl.CurlShare, args, kwargs)
+        return super(CurlShare, cls).__new__(cls, pycurl.CurlShare, False, args, kwargs)
+
+
+class Future(object):
+    """The result of a transfer submitted to a `Transfers` object (see `Transfers.submit()`)"""
+
+    def __init__(self, transfers, curl):
+        self.curl = curl
+        self.error = None
+        self.done = False
+        self.cancelled = False
+        self.__transfers = transfers
+
+    def set_result(self, error=None):
+        self.done = True
+        self.error = error
+
+    def cancel(self):
+        """Abort the transfer, if it is not done yet.
+        :return: True if the transfer was aborted, False otherwise
+        :rtype: bool
+        """
+        if not self.done:
+            self.__transfers.remove(self.curl)
+            self.done = self.cancelled = True
+        return self.cancelled
+
+    def result(self):
+        """Wait for the transfer to be done, running all the transfers if needed.
+        It must not be called from the callback of a transfer which is not done yet.
+
+        :return: the performed handle
+        :rtype: Curl
+        :raise pycurl.error: if an error occurred during the transfer
+        :raise RuntimeError: if the transfer was cancelled
+        """
+        if not self.done:
+            self.__transfers.run()
+        if self.cancelled:
+            raise RuntimeError("The transfer was cancelled")
+        if self.error is not None:
+            raise self.error
+        return self.curl
+
+
+class Transfers(object):
+    """Perform many `Curl` transfers at the same time through a `CurlMulti` handle.
+
+    Every transfer is performed in advance (see `Curl.prefetched()`) and then its callback is called
+    with the `Curl` object and the occurred error, if any. Callbacks could add new transfers.
+    Transfers served by the `ResponseCache` complete at once, and the ones with the same cache key
+    wait for the first of them instead of being performed again. The others start once admitted
+    by the `Governor`.
+    Components could use their own `Transfers` to perform many requests at the same time, e.g.::
+
+        transfers = clients.Transfers(per_host=4)
+        futures = [transfers.submit(curl) for curl in curls]
+        transfers.run()
+        codes = [future.result().getinfo(HTTP_CODE) for future in futures]
+    """
+
+    def __init__(self, concurrency=None, per_host=None):
+        """
+        :param concurrency: the maximum number of concurrent transfers (None means no limit)
+        :type concurrency: int|None
+        :param per_host: the maximum number of concurrent connections to the same host (None means no limit)
+        :type per_host: int|None
+        """
+        self.multi = None  # borrowed from the pool while running
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.__pending = deque()
+        self.__throttled = deque()  # (Curl, callback) to perform, waiting to be admitted by the governor
+        self.__active = dict()  # pycurl handle -> (Curl, callback)
+        self.__flights = dict()  # flight led by an active transfer -> [(Curl, callback)] waiting for it
+
+    def __len__(self):
+        """Return the number of pending, active and waiting transfers"""
+        return len(self.__pending) + len(self.__throttled) + len(self.__active) + \
+            sum(len(waiting) for waiting in self.__flights.itervalues())
+
+    def add(self, curl, callback=None):
+        """Schedule the transfer of the specified handle.
+        :param curl: the handle to perform
+        :type curl: Curl
+        :param callback: the function to call with the handle and the error (if any) when the transfer is done
+        :type callback: function
+        """
+        self.__pending.append((curl, callback))
+
+    def submit(self, curl, callback=None):
+        """Schedule the transfer of the specified handle.
+        :param curl: the handle to perform
+        :type curl: Curl
+        :param callback: the function to call with the future of the transfer when it is done
+        :type callback: function
+        :return: the future of the transfer
+        :rtype: Future
+        """
+        future = Future(self, curl)
+
+        def done(curl, error):
+            future.set_result(error)
+            if callback is not None:
+                callback(future)
+
+        self.add(curl, done)
+        return future
+
+    def remove(self, curl):
+        """Abort the transfer of the specified handle, if it is pending or active. Its callback will not be called.
+        :type curl: Curl
+        """
+        if curl.handle in self.__active:
+            self.multi.remove_handle(curl.handle)
+            del self.__active[curl.handle]
+            curl.governed(code=0)
+            # the transfers waiting for the aborted one have to be performed on their own
+            self.__pending.extend(self.__flights.pop(curl.end(abandoned=True), ()))
+        else:
+            for transfers in [self.__pending, self.__throttled] + self.__flights.values():
+                for transfer in list(transfers):
+                    if transfer[0] is curl:
+                        transfers.remove(transfer)
+                        if transfers is self.__throttled:
+                            self.__pending.extend(self.__flights.pop(curl.end(abandoned=True), ()))
+
+    def run(self):
+        """Perform all the transfers, returning when there are no more of them"""
+        self.multi = Pool.instance().borrow_multi()
+        self.multi.setopt(pycurl.M_MAX_HOST_CONNECTIONS, self.per_host or 0)
+        try:
+            self.__run()
+        finally:
+            for handle, (curl, _) in self.__active.iteritems():  # an exception was raised by some callback
+                self.multi.remove_handle(handle)
+                curl.governed(code=0)
+                curl.end(abandoned=True)
+            self.__active.clear()
+            for curl, callback in self.__throttled:
+                curl.end(abandoned=True)
+                self.__pending.appendleft((curl, callback))
+            self.__throttled.clear()
+            for waiting in self.__flights.itervalues():
+                self.__pending.extend(waiting)
+            self.__flights.clear()
+            multi, self.multi = self.multi, None
+            Pool.instance().release_multi(multi)
+
+    def __run(self):
+        governor = Governor.instance()
+        while self.__pending or self.__throttled or self.__active:
+            delay = 0  # the time to wait for the governor to admit the next transfer
+            while (self.__pending or self.__throttled) and \
+                    (self.concurrency is None or len(self.__active) < self.concurrency):
+                if self.__throttled:
+                    curl, callback = self.__throttled.popleft()
+                else:
+                    curl, callback = self.__pending.popleft()
+                    try:
+                        state = curl.begin()
+                    except pycurl.error as e:  # replayed
+                        self.__done(curl, callback, e)
+                        continue
+                    if state is True:  # served by the archive or the cache
+                        self.__done(curl, callback, None)
+                        continue
+                    if state in self.__flights:  # the same request is active
+                        self.__flights[state].append((curl, callback))
+                        continue
+                    # a request in progress elsewhere is not waited for, not to stall the other transfers
+                    if curl.flight is not None:
+                        self.__flights[curl.flight] = list()
+                delay = governor.admit(curl.host)
+                if delay:
+                    self.__throttled.appendleft((curl, callback))
+                    break
+                self.__active[curl.handle] = (curl, callback)
+                self.multi.add_handle(curl.handle)
+
+            while self.multi.perform()[0] == pycurl.E_CALL_MULTI_PERFORM:
+                pass
+
+            while True:
+                queued, succeeded, failed = self.multi.info_read()
+                done = [(handle, None) for handle in succeeded]
+                done.extend((handle, pycurl.error(errno, message)) for handle, errno, message in failed)
+                for handle, error in done:
+                    if handle not in self.__active:
+                        continue  # removed by a previous callback
+                    self.multi.remove_handle(handle)
+                    curl, callback = self.__active.pop(handle)
+                    curl.governed()
+                    error = curl.stopped(error)
+                    flight = curl.end(error)
+                    self.__done(curl, callback, error)
+                    for curl, callback in self.__flights.pop(flight, ()):
+                        try:
+                            if not curl.follow(flight):
+                                self.__pending.append((curl, callback))
+                                continue
+                        except pycurl.error as e:
+                            self.__done(curl, callback, e)
+                        else:
+                            self.__done(curl, callback, None)
+                if not queued:
+                    break
+
+            if self.__active:
+                self.multi.select(min(delay, 1.0) if delay else 1.0)
+            elif delay:
+                time.sleep(delay)
+
+    @staticmethod
+    def __done(curl, callback, error):
+        curl.prefetched(error)
+        if callback is not None:
+            callback(curl, error)
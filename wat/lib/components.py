@@ -23,12 +23,13 @@ import importlib
 from datetime import date
 
 from wat.lib.properties import *
-from wat.lib.models import Author
+from wat.lib.buffers import ResponseBuffer
+from wat.lib.models import Author, Cost
 from wat.lib.exceptions import InvalidTypeError, ClientError, InvalidComponentError, \
     ConstraintViolationError, ComponentFailure
 
 
-def info(authors, released, updated, preconditions=None, version='unknown'):
+def info(authors, released, updated, preconditions=None, version='unknown', cost=None):
     def wrap(cls):
         # write all the info parameters into class definition looking for misconfiguration
         if all(isinstance(author, Author) for author in authors):
@@ -47,6 +48,12 @@ def info(authors, released, updated, preconditions=None, version='unknown'):
             raise InvalidTypeError(preconditions, Property)
         # save the version as string, whatever type it really is
         cls.version = str(version)
+        if cost is None:  # if not specified, assume a single cheap request
+            cls.cost = Cost()
+        elif isinstance(cost, Cost):
+            cls.cost = cost
+        else:
+            raise InvalidTypeError(cost, Cost)
 
         return cls
 
@@ -182,18 +189,18 @@ class WatComponent(object):
         """
         :param name: the name of the attribute to create into the component
         :type name: str
-        :return: a function which create an attribute with the specified name into the component
+        :return: a function which create an attribute with the specified name into the component,
+        a `ResponseBuffer` the written values are appended to
         :rtype: function
         """
 
         def set_attr(value):
             """Create an attribute with the specified name and value into the component
-            :param value: the value to give to the attribute
+            :param value: the value to append to the attribute
             """
             if not hasattr(self, name):
-                self.__setattr__(name, value)
-            else:
-                self.__setattr__(name, self.__getattribute__(name) + value)
+                self.__setattr__(name, ResponseBuffer())
+            self.__getattribute__(name).write(value)
 
         return set_attr
 
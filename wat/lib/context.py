@@ -0,0 +1,174 @@
+# WAT Framework, make simple to do the complex
+# Copyright 2014 Francesco Marano and individual contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Execution contexts, to scan many targets at the same time in the same process.
+
+The state of a scan is the properties registry, the client configuration and the handles pool.
+They are singletons (`Registry`, `conf.clients` and `clients.Pool`) whose `instance()` is the one
+of the execution context bound to the current thread, if any, or the process-wide one otherwise.
+So components and plans work the same way in an execution context, with no need to know about it::
+
+    from wat.lib.context import ExecutionContext
+
+    def scan(url):
+        with ExecutionContext(url=url) as context:
+            plan.execute()
+            return dict(context.registry)
+
+    threads = [threading.Thread(target=scan, args=(url,)) for url in urls]
+
+A context is bound to one thread at a time, while the responses cache and the governor are
+process-wide, so that the same responses are not requested twice and every host is protected from all the scans.
+"""
+
+__all__ = ['ExecutionContext', 'contextual', 'current']
+
+import threading
+
+_local = threading.local()
+
+
+def current():
+    """:return: the execution context bound to the current thread, if any
+    :rtype: ExecutionContext|None
+    """
+    contexts = getattr(_local, 'contexts', None)
+    return contexts[-1] if contexts else None
+
+
+class _ContextSingleton(object):
+    """A thread-safe singleton class decorator, whose instance is the one of the execution context
+    bound to the current thread, if any, or the process-wide one otherwise.
+    """
+
+    def __init__(self, cls, attribute):
+        """
+        :param cls: the decorated class
+        :type cls: type
+        :param attribute: the execution context attribute holding its instance
+        :type attribute: str
+        """
+        self.__cls = cls
+        self.__attribute = attribute
+        self.__instance = None
+        self.__mutex = threading.Lock()
+        self.__doc__ = cls.__doc__
+
+    def is_initialized(self):
+        with self.__mutex:
+            return self.__instance is not None
+
+    def initialize(self, *args, **kwargs):
+        with self.__mutex:
+            if self.__instance is None:
+                self.__instance = self.__cls(*args, **kwargs)
+
+    def process_instance(self):
+        """:return: the process-wide instance, whatever the execution context"""
+        with self.__mutex:
+            if self.__instance is None:
+                self.__instance = self.__cls()
+            return self.__instance
+
+    def instance(self):
+        """:return: the instance of the current execution context, or the process-wide one"""
+        context = current()
+        if context is not None:
+            return getattr(context, self.__attribute)
+        return self.process_instance()
+
+    def new(self, *args, **kwargs):
+        """:return: a new instance, for an execution context"""
+        return self.__cls(*args, **kwargs)
+
+    def __call__(self, *args, **kwargs):
+        raise TypeError("Singletons must be access by instance")
+
+    def __instancecheck__(self, inst):
+        return isinstance(inst, self.__cls)
+
+
+def contextual(attribute):
+    """A singleton class decorator, whose instance is held by the execution contexts (see `_ContextSingleton`).
+    :param attribute: the execution context attribute holding the instance
+    :type attribute: str
+    """
+    def decorator(cls):
+        return _ContextSingleton(cls, attribute)
+    return decorator
+
+
+class ExecutionContext(object):
+    """The state of the scan of a target: its properties registry, its client configuration and its handles pool"""
+
+    def __init__(self, url=None, port=None, **options):
+        """The client configuration starts from the process-wide one, with the specified options changed.
+
+        :param url: the target URL
+        :type url: str
+        :param port: the target port
+        :type port: int
+        :param options: other client options (see `conf.clients`), e.g. `USERAGENT='...'`
+        """
+        from wat import conf
+        from wat.lib.clients import Pool
+        from wat.lib.properties import Registry
+
+        self.registry = Registry.new()
+        self.clients = conf.clients.new()
+        for name, value in vars(conf.clients.process_instance()).iteritems():
+            if name != 'revision':
+                setattr(self.clients, name, value)
+        if url is not None:
+            options['URL'] = url
+        if port is not None:
+            options['PORT'] = port
+        for name, value in options.iteritems():
+            setattr(self.clients, name, value)
+        self.pool = Pool.new()
+
+    @property
+    def url(self):
+        """:return: the target URL
+        :rtype: str
+        """
+        return getattr(self.clients, 'URL', None)
+
+    def bind(self):
+        """Make it the execution context of the current thread, until it is unbound"""
+        if not hasattr(_local, 'contexts'):
+            _local.contexts = list()
+        _local.contexts.append(self)
+
+    def unbind(self):
+        """Give the current thread its previous execution context back
+        :raise RuntimeError: if it is not the execution context of the current thread
+        """
+        if current() is not self:
+            raise RuntimeError("The execution context is not bound to the current thread")
+        _local.contexts.pop()
+
+    def close(self):
+        """Forget the retrieved properties and close the idle handles, and so their connections"""
+        self.registry.clear()
+        self.pool.clear()
+
+    def __enter__(self):
+        self.bind()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.unbind()
+        return False
@@ -13,14 +13,460 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from wat.lib import components, search
+from collections import deque
+
+import pycurl
+
+from wat.lib import clients, components, search
 from wat.lib.components import WatComponent
 from wat.lib.exceptions import InvalidTypeError, PropertyNotAchievedError, PropertyDoesNotExist, WatError, \
     InvalidComponentError, ComponentFailure
-from wat.lib.properties import Property, Registry
+from wat.lib.manifest import ComponentEntry
+from wat.lib.models import Cost
+from wat.lib.properties import Property, Constraint, Registry
 from wat.lib.shortcuts import hierlogger as logger
 
 
+class PropertyIndex(object):
+    """Give every property an integer ID, to represent property sets as bitsets (Python ints)
+    whose bit *i* is set iff the property with ID *i* is in the set.
+    """
+
+    def __init__(self):
+        self.__ids = dict()  # property name -> ID
+        self.__names = list()  # ID -> property name
+        self.__preconditions = dict()  # action -> preconditions bitset
+
+    def __len__(self):
+        """Return the number of indexed properties"""
+        return len(self.__names)
+
+    def id(self, prop):
+        """:return: the ID of the specified property, indexing it if needed
+        :rtype: int
+        """
+        name = str(prop)
+        try:
+            return self.__ids[name]
+        except KeyError:
+            self.__ids[name] = len(self.__names)
+            self.__names.append(name)
+            return self.__ids[name]
+
+    def mask(self, properties):
+        """:return: the bitset of the specified properties
+        :rtype: int
+        """
+        mask = 0
+        for prop in properties:
+            mask |= 1 << self.id(prop)
+        return mask
+
+    def ids(self, mask):
+        """:return: the IDs of the properties in the bitset
+        :rtype: list[int]
+        """
+        ids = list()
+        while mask:
+            bit = mask & -mask
+            ids.append(bit.bit_length() - 1)
+            mask ^= bit
+        return ids
+
+    def names(self, mask):
+        """:return: the names of the properties in the bitset
+        :rtype: list[str]
+        """
+        return [self.__names[i] for i in self.ids(mask)]
+
+    def preconditions(self, action):
+        """:return: the bitset of the action preconditions
+        :rtype: int
+        """
+        try:
+            return self.__preconditions[action]
+        except KeyError:
+            mask = self.__preconditions[action] = self.mask(action.preconditions)
+            return mask
+
+
+class LayeredPlan(object):
+    """The solution of a planning problem, as the action layers to execute to achieve the goal state."""
+
+    def __init__(self, planning_graph, actions=None):
+        """
+        :param planning_graph: the expanded planning graph
+        :type planning_graph: RelaxedGraphPlan
+        :param actions: the only components to keep in the plan (default: all the useful ones)
+        :type actions: set
+        """
+        # build the action layers which represent the solution
+        self.action_layers = list()
+        # if there is a specified goal state, remove all the useless components
+        # in the action layers
+        if planning_graph.goal_state is not None:
+            # copy the goal state as property name list
+            self.goal_state = [str(prop) for prop in planning_graph.goal_state]
+            index = planning_graph.index
+            goal_state = index.mask(planning_graph.goal_state)
+            # copy backwards the graph structure
+            for action_layer in planning_graph.action_layers[::-1]:
+                if self.action_layers:  # mantain the actions which need for these properties
+                    layer_needed = self.action_layers[0].actions
+                elif planning_graph.goal_state:  # if first step take them from specified goal state if any
+                    layer_needed = ()
+                else:
+                    # if no goal was specified mantain all actions as side-effect of
+                    # choosing as needed all the precondition in the last action layer
+                    layer_needed = planning_graph.action_layers[-1].actions
+                # keep the goal state as precondition needed to be sure that all the goal components
+                # will be mantained even if in different layers
+                precondition_needed = goal_state
+                for action in layer_needed:
+                    precondition_needed |= index.preconditions(action)
+                # keep only the useful actions (those with needed postcondition and chosen),
+                # removing all the NoOpAction, and check if some action remain
+                action_layer = RelaxedGraphPlan.ActionLayer(
+                    actions=[
+                        action for action in action_layer.actions
+                        if not isinstance(action, RelaxedGraphPlan.ActionLayer.NoOpAction) and
+                        precondition_needed >> index.id(action.postcondition) & 1 and
+                        (actions is None or action in actions)
+                    ]
+                )
+                if len(action_layer):
+                    # copy the remaining action layer at the beginning of the layered plan
+                    self.action_layers.insert(0, action_layer)
+        # if there is NOT a specified goal state, remove just the NoOpAction pseudo-components
+        # in the action layers
+        else:
+            self.goal_state = None
+            for action_layer in planning_graph.action_layers[::-1]:
+                action_layer = RelaxedGraphPlan.ActionLayer(
+                    actions=[
+                        action for action in action_layer.actions
+                        if not isinstance(action, RelaxedGraphPlan.ActionLayer.NoOpAction)
+                    ]
+                )
+                if len(action_layer):
+                    # copy the remaining action layer at the beginning of the layered plan
+                    self.action_layers.insert(0, action_layer)
+
+    def execute(self, concurrency=1, race=1, checkpoint=None):
+        """Execute the plan, one action layer after the other.
+        Within an action layer the transfers of the components providing different properties
+        are performed at the same time, up to the specified concurrency level.
+        Equivalent components are tried one after the other, until one of them succeeds.
+
+        :param concurrency: the maximum number of concurrent transfers (1 means one transfer at a time)
+        :type concurrency: int
+        :param race: the maximum number of equivalent components whose transfers are performed at the same time,
+            the first one succeeding retrieves the property and the transfers of the others are aborted
+        :type race: int
+        :param checkpoint: the execution state to save after every component, the components it holds as
+            completed are skipped (see `wat.lib.checkpoint`)
+        :type checkpoint: wat.lib.checkpoint.Checkpoint
+        :raise ClientError: if some pycurl.error occurred during components running
+        """
+        _logger = logger()
+        _logger.info("Executing solution")
+        registry = Registry.instance()
+        for layer_no, layer in enumerate(self.action_layers, start=1):
+            _logger.debug("Executing action layer '%d'" % layer_no)
+            transfers = clients.Transfers(concurrency=concurrency)
+            equivalent_actions = layer.equivalent_actions
+            for prop, actions in equivalent_actions.iteritems():
+                _logger.debug("Retrieving '%s' property" % prop)
+                self.__retrieve(prop, list(actions), transfers, race, list(), checkpoint)
+            transfers.run()
+            for prop in equivalent_actions:
+                if prop not in registry:
+                    _logger.error(PropertyNotAchievedError(prop))
+        _logger.info("Execution completed")
+
+    def __retrieve(self, prop, candidates, transfers, race, running, checkpoint):
+        """Run the candidate components to retrieve the specified property, until one of them succeeds.
+        If the component transfer could be performed in advance, it is added to the transfers
+        and the next candidate will be tried, if needed, when the transfer is done.
+        Up to `race` candidate transfers are performed at the same time.
+
+        :param prop: the property to retrieve
+        :type prop: str
+        :param candidates: the equivalent components to try, in order
+        :type candidates: list
+        :param transfers: the transfers of the current action layer
+        :type transfers: clients.Transfers
+        :param race: the maximum number of candidate transfers to perform at the same time
+        :type race: int
+        :param running: the handles of the candidate transfers in progress
+        :type running: list
+        :param checkpoint: the execution state to save after every component
+        :type checkpoint: wat.lib.checkpoint.Checkpoint
+        """
+        _logger = logger()
+        registry = Registry.instance()
+        while candidates and prop not in registry and len(running) < race:
+            component = candidates.pop(0)
+            # if the component is not runnable go ahead
+            if not all(str(precondition) in registry for precondition in component.preconditions):
+                _logger.debug("Component '%s' is not able to run" % component)
+                continue
+            if _completed(component, checkpoint):
+                continue
+            _logger.debug("Executing component '%s'" % component)
+            instance = component()
+            curl = _transferable(component, instance)
+            if curl is not None:
+
+                def done(curl, error, component=component, instance=instance):
+                    running.remove(curl)
+                    if _checkpoint(_execute(prop, component, instance, self.goal_state), component, checkpoint):
+                        _abort(running, transfers)
+                    else:
+                        self.__retrieve(prop, candidates, transfers, race, running, checkpoint)
+
+                running.append(curl)
+                transfers.add(curl, done)
+                continue
+            if _checkpoint(_execute(prop, component, instance, self.goal_state), component, checkpoint):
+                _abort(running, transfers)
+                return
+
+    def schedule(self, concurrency=None, race=1, checkpoint=None):
+        """Execute the plan without barriers between its action layers (see `DataflowScheduler`).
+        :param concurrency: the maximum number of concurrent transfers (None means no limit)
+        :type concurrency: int|None
+        :param race: the maximum number of equivalent components whose transfers are performed at the same time
+        :type race: int
+        :param checkpoint: the execution state to save after every component (see `execute()`)
+        :type checkpoint: wat.lib.checkpoint.Checkpoint
+        :raise ClientError: if some pycurl.error occurred during components running
+        """
+        DataflowScheduler(self, concurrency=concurrency, race=race, checkpoint=checkpoint).run()
+
+
+class DataflowScheduler(object):
+    """Execute a layered plan without barriers between its action layers.
+
+    Every property is retrieved as soon as the preconditions of one of its components are in the registry,
+    so a component never waits for the slowest component of the previous action layer.
+    Equivalent components are tried one after the other in action layers order, until one of them succeeds,
+    or raced against each other if more than one of their transfers could be performed at the same time.
+    """
+
+    def __init__(self, plan, concurrency=None, race=1, checkpoint=None):
+        """
+        :param plan: the plan to execute
+        :type plan: LayeredPlan
+        :param concurrency: the maximum number of concurrent transfers (None means no limit)
+        :type concurrency: int|None
+        :param race: the maximum number of equivalent components whose transfers are performed at the same time,
+            the first one succeeding retrieves the property and the transfers of the others are aborted
+        :type race: int
+        :param checkpoint: the execution state to save after every component, the components it holds as
+            completed are skipped (see `wat.lib.checkpoint`)
+        :type checkpoint: wat.lib.checkpoint.Checkpoint
+        """
+        self.goal_state = plan.goal_state
+        self.race = race
+        self.checkpoint = checkpoint
+        self.transfers = clients.Transfers(concurrency=concurrency)
+        self.__candidates = dict()  # property -> equivalent components still to try
+        self.__dependents = dict()  # property -> properties with a component which needs it
+        for layer in plan.action_layers:
+            for prop, actions in layer.equivalent_actions.iteritems():
+                self.__candidates.setdefault(prop, list()).extend(actions)
+        for prop, candidates in self.__candidates.iteritems():
+            for component in candidates:
+                for precondition in component.preconditions:
+                    self.__dependents.setdefault(str(precondition), set()).add(prop)
+        self.__running = dict()  # property -> handles of its component transfers in progress
+        self.__failed = set()  # properties which cannot be retrieved anymore
+        self.__queue = deque()  # properties to try to retrieve
+        self.__draining = False
+
+    def run(self):
+        """Execute all the plan components, returning when no more of them could run"""
+        _logger = logger()
+        _logger.info("Executing solution")
+        self.__advance(self.__candidates)
+        self.transfers.run()
+        registry = Registry.instance()
+        for prop in self.__candidates:
+            if prop not in registry:
+                _logger.error(PropertyNotAchievedError(prop))
+        _logger.info("Execution completed")
+
+    def __advance(self, props):
+        """Try to retrieve the specified properties.
+        Properties are queued and retrieved one after the other, so that nested calls do not recurse.
+        """
+        self.__queue.extend(props)
+        if self.__draining:
+            return
+        self.__draining = True
+        try:
+            while self.__queue:
+                self.__retrieve(self.__queue.popleft())
+        finally:
+            self.__draining = False
+
+    def __settle(self, prop):
+        """The property was retrieved, or it cannot be anymore: try again all the properties which need it"""
+        self.__advance(self.__dependents.get(prop, ()))
+
+    def __retrieve(self, prop):
+        """Run the first candidate component of the property if its preconditions are in the registry,
+        skip it if they cannot be anymore, or wait for them otherwise.
+        """
+        _logger = logger()
+        registry = Registry.instance()
+        if prop in registry or prop in self.__failed:
+            return
+        candidates = self.__candidates[prop]
+        running = self.__running.setdefault(prop, list())
+        while candidates and len(running) < self.race:
+            component = candidates[0]
+            preconditions = [str(precondition) for precondition in component.preconditions]
+            if not all(precondition in registry for precondition in preconditions):
+                if any(precondition in self.__failed or
+                       (precondition not in registry and precondition not in self.__candidates)
+                       for precondition in preconditions):
+                    _logger.debug("Component '%s' is not able to run" % component)
+                    candidates.pop(0)
+                    continue
+                return  # wait for the missing preconditions
+            candidates.pop(0)
+            if _completed(component, self.checkpoint):
+                continue
+            _logger.debug("Executing component '%s'" % component)
+            instance = component()
+            curl = _transferable(component, instance)
+            if curl is not None:
+
+                def done(curl, error, component=component, instance=instance):
+                    running.remove(curl)
+                    if _checkpoint(_execute(prop, component, instance, self.goal_state), component, self.checkpoint):
+                        _abort(running, self.transfers)
+                        self.__settle(prop)
+                    else:
+                        self.__advance([prop])
+
+                running.append(curl)
+                self.transfers.add(curl, done)
+                continue
+            if _checkpoint(_execute(prop, component, instance, self.goal_state), component, self.checkpoint):
+                _abort(running, self.transfers)
+                self.__settle(prop)
+                return
+        if not candidates and not running:
+            self.__failed.add(prop)
+            self.__settle(prop)
+
+
+def _transferable(component, instance):
+    """:return: the handle of the component instance, if its transfer could be performed in advance
+    :rtype: clients.Curl|None
+    """
+    curl = getattr(instance, 'curl', None)
+    if isinstance(curl, clients.Curl) and curl.prefetchable and not any(
+            precondition.compare() is False for precondition in component.preconditions
+            if isinstance(precondition, Constraint)):
+        return curl
+    return None
+
+
+def _abort(running, transfers):
+    """Abort the candidate transfers still in progress, because the property was already retrieved,
+    giving their handles back to the pool since their components will never be executed.
+    """
+    for curl in running:
+        logger(depth=1).debug("Aborting transfer of '%s'" % curl.getinfo(pycurl.EFFECTIVE_URL))
+        transfers.remove(curl)
+        curl.release()
+    del running[:]
+
+
+def _execute(prop, component, instance, goal_state):
+    """Execute the component instance to retrieve the specified property.
+    :return: True if the property was succesfully retrieved, False otherwise
+    :rtype: bool
+    """
+    _logger = logger(depth=1)
+    try:
+        instance.execute()
+    except (InvalidComponentError, ComponentFailure) as error:
+        _logger.warning("%(component)s: %(message)s" % {
+            'component': component,
+            'message': error.messages
+        })
+        return False
+    finally:
+        # give the handle back to the pool, keeping its connections alive for the next components
+        curl = getattr(instance, 'curl', None)
+        if isinstance(curl, clients.Curl):
+            curl.release()
+    # if no error raised and property was saved
+    # go ahead with the next one
+    if goal_state is None or prop in goal_state:
+        _logger.info("Goal property '%s' succesfully retrieved" % prop)
+    else:
+        _logger.debug("Property '%s' succesfully retrieved" % prop)
+    return True
+
+
+def _completed(component, checkpoint):
+    """:return: True if the component was completed by the execution the checkpoint was saved by, False otherwise
+    :rtype: bool
+    """
+    if checkpoint is not None and str(component) in checkpoint.completed:
+        logger(depth=1).debug("Component '%s' already completed" % component)
+        return True
+    return False
+
+
+def _checkpoint(succeeded, component, checkpoint):
+    """Save the execution state if the component retrieved its property, so that a failed one is tried again on resume.
+    A failed save is logged and skipped, so that it never stops the execution.
+    :param succeeded: whether the component retrieved its property
+    :type succeeded: bool
+    :return: whether the component retrieved its property
+    :rtype: bool
+    """
+    if succeeded and checkpoint is not None:
+        try:
+            checkpoint.complete(component)
+        except (TypeError, EnvironmentError) as error:
+            logger(depth=1).error("Execution state not saved after component '%s': %s" % (component, error))
+    return succeeded
+
+
+def regress(goal_state, initial_state=None):
+    """Find the components relevant to the goal state, regressing from the goal properties
+    through the components providing them to their preconditions, recursively.
+    Only the components in the dependency cone of the goal state are ever looked at.
+
+    :param goal_state: the properties to achieve
+    :type goal_state: collections.Iterable[Property]
+    :param initial_state: the already achieved properties, which need no components
+    :type initial_state: collections.Iterable[Property]
+    :return: the relevant components
+    :rtype: list
+    """
+    actions = list()
+    regressed = set(str(prop) for prop in initial_state or ())
+    needed = [str(prop) for prop in goal_state]
+    while needed:
+        prop = needed.pop()
+        if prop in regressed:
+            continue
+        regressed.add(prop)
+        for action in search.components(postconditions=[prop]):
+            actions.append(action)
+            needed.extend(str(precondition) for precondition in action.preconditions)
+    return actions
+
+
 class RelaxedGraphPlan(object):
     """It is a relaxed version of the GraphPlan algorithm, to represent the planning problem to build a components chain
      to achieve the goal from a specified initial state.
@@ -54,6 +500,8 @@ class RelaxedGraphPlan(object):
             **Briefly**: No-Op for property *p* is an action *a* such that *precondition(a)=postcondition(a)=p*
             """
 
+            cost = Cost(requests=0)
+
             def __init__(self, prop):
                 """Initialize the No-Operation action with the specified property.
                 :param prop: the property to bring forward through the NoOp node
@@ -94,13 +542,16 @@ class RelaxedGraphPlan(object):
         def add(self, action):
             """Add an action to the current action layer
             :param action: the action to add
-            :type action: RelaxedGraphPlan.ActionLayer.NoOpAction|WatComponent
-            :raise InvalidTypeError: if the specified action is not a NoOpAction or a WatComponent
+            :type action: RelaxedGraphPlan.ActionLayer.NoOpAction|ComponentEntry|WatComponent
+            :raise InvalidTypeError: if the specified action is not a NoOpAction, a ComponentEntry or a WatComponent
             """
-            if isinstance(action, RelaxedGraphPlan.ActionLayer.NoOpAction) or components.iswatcomponent(action):
+            if isinstance(action, (RelaxedGraphPlan.ActionLayer.NoOpAction, ComponentEntry)) \
+                    or components.iswatcomponent(action):
                 self.actions.add(action)
             else:
-                raise InvalidTypeError(action, (RelaxedGraphPlan.ActionLayer.NoOpAction, WatComponent))
+                raise InvalidTypeError(
+                    action, (RelaxedGraphPlan.ActionLayer.NoOpAction, ComponentEntry, WatComponent)
+                )
 
         def remove(self, action):
             """Remove the specified action from the current action layer if it is present in it, otherwise do nothing
@@ -112,15 +563,12 @@ class RelaxedGraphPlan(object):
         def equivalent_actions(self):
             """Two actions a1 and a2 are equivalent iff postcondition(a1) = postcondition(a2)
             :return: all the actions in the current action layer, grouped by postcondition provided
-            :rtype: dict[set[WatComponent]]
+             and sorted from the cheapest to the most expensive one
+            :rtype: dict[list[WatComponent]]
             """
             equivalent_actions = dict()
-            for action in self.actions:
-                postcondition = str(action.postcondition)
-                if postcondition in equivalent_actions:
-                    equivalent_actions[postcondition].add(action)
-                else:
-                    equivalent_actions[postcondition] = {action}
+            for action in sorted(self.actions, key=lambda action: (action.cost, str(action))):
+                equivalent_actions.setdefault(str(action.postcondition), list()).append(action)
             return equivalent_actions
 
         @property
@@ -130,7 +578,7 @@ class RelaxedGraphPlan(object):
             """
             preconditions = set()
             for action in self.actions:
-                preconditions = preconditions.union(action.preconditions)
+                preconditions.update(action.preconditions)
             return preconditions
 
         @property
@@ -148,7 +596,7 @@ class RelaxedGraphPlan(object):
             """
             return self.preconditions.union(self.postconditions)
 
-    def __init__(self, initial_state=None, goal_state=None, fail_on_invalid=False):
+    def __init__(self, initial_state=None, goal_state=None, fail_on_invalid=False, backward=False):
         """Initialize the graph to build a layered plan as solution of the specified planning problem.
 
         :param initial_state: all the <property, value> pair to set as initial state
@@ -160,6 +608,9 @@ class RelaxedGraphPlan(object):
         :param fail_on_invalid: specify if the initialization have to fail on invalid input (set it to True) or it simply ignore the invalid input and go ahead (set it to False). **Default** is *False*.
         :type fail_on_invalid: bool
 
+        :param backward: specify if the graph has to be built only from the components relevant to the goal state, found by regressing from the goal properties (see `regress()`). It has no effect without a goal state. **Default** is *False*.
+        :type backward: bool
+
         :raise InvalidTypeError: If the initial state or goal state are not of the required type
         :raise WatError: If there is at least an invalid initial state or goal state and *fail_on_invalid* is set to True
         """
@@ -232,22 +683,60 @@ class RelaxedGraphPlan(object):
         elif self.goal_state is None:
             _logger.warning("No goal state specified. Retrieving all possible properties")
 
-        self.__uncollected_actions = set(search.components())
+        # Property sets are bitsets over the property IDs, so subset tests and unions are integer operations.
+        # The inverted index from each property to the components waiting for it makes a new property
+        # only touch the components which depend on it, so the expansion is linear in the graph edges
+        self.index = PropertyIndex()
+        self.__waiting = dict()  # property ID -> components with it among their preconditions
+        self.__achieved = 0  # all the achieved properties
+        self.__goal = self.index.mask(self.goal_state) if self.goal_state else 0
+        self.__ready = list()  # the components whose preconditions are all achieved
         self.__collected_actions = set()  # it collects all the already seen components to avoid loops
+        if backward and self.goal_state:
+            actions = regress(self.goal_state, self.initial_state)
+            _logger.debug("%d components relevant to the goal state" % len(actions))
+        else:
+            actions = search.components()
+        for action in actions:
+            action_preconditions = self.index.preconditions(action)
+            if action_preconditions:
+                for precondition in self.index.ids(action_preconditions):
+                    self.__waiting.setdefault(precondition, list()).append(action)
+            else:
+                self.__ready.append(action)
 
         self.action_layers = list()
 
         # make the first step to build the first action layer
         _logger.debug("Calculating initial state action layer")
 
-        initial_action_layer = RelaxedGraphPlan.ActionLayer()
-        for action in self.__uncollected_actions.copy():
-            action_preconditions = {Property(str(precondition)) for precondition in action.preconditions}
-            if not action_preconditions or action_preconditions.issubset(self.initial_state):
-                self.__uncollected_actions.remove(action)
-                self.__collected_actions.add(action)
-                initial_action_layer.add(action)
-        self.action_layers.append(initial_action_layer)
+        self.__achieve(self.initial_state)
+        self.action_layers.append(RelaxedGraphPlan.ActionLayer(self.__collect()))
+
+    def __achieve(self, properties):
+        """Add the specified properties to the achieved ones, moving to the ready components
+        all those which have no more unsatisfied preconditions.
+        :param properties: the achieved properties
+        :type properties: collections.Iterable[Property]
+        """
+        for prop in properties:
+            prop_id = self.index.id(prop)
+            if self.__achieved >> prop_id & 1:
+                continue
+            self.__achieved |= 1 << prop_id
+            for action in self.__waiting.pop(prop_id, ()):
+                if not self.index.preconditions(action) & ~self.__achieved:
+                    self.__ready.append(action)
+
+    def __collect(self):
+        """Collect all the ready components and achieve their postconditions.
+        :return: the collected components
+        :rtype: list
+        """
+        collected, self.__ready = self.__ready, list()
+        self.__collected_actions.update(collected)
+        self.__achieve(action.postcondition for action in collected)
+        return collected
 
     def __expand(self):
         """Make a step forward in the process of building the planning graph, making true that:
@@ -255,125 +744,80 @@ class RelaxedGraphPlan(object):
         """
         logger(depth=2).debug("Expanding graph. Calculating action layer '%d'" % (len(self.action_layers) + 1))
 
-        last_action_layer = self.action_layers[-1]
         next_action_layer = self.ActionLayer(
-            {RelaxedGraphPlan.ActionLayer.NoOpAction(prop) for prop in last_action_layer.property_layer}
+            {RelaxedGraphPlan.ActionLayer.NoOpAction(Property(name)) for name in self.index.names(self.__achieved)}
         )
-        for action in self.__uncollected_actions.copy():
-            if action.preconditions.issubset(last_action_layer.property_layer):
-                self.__uncollected_actions.remove(action)
-                self.__collected_actions.add(action)
-                next_action_layer.add(action)
+        for action in self.__collect():
+            next_action_layer.add(action)
         self.action_layers.append(next_action_layer)
 
     def __goal_reached(self):
         """Check if the specified goal state was reached or not.
         :returns None: if no goal state was specified
-        :returns True: if the last action layer contains the goal state
+        :returns True: if the last property layer contains the goal state
         :returns False: otherwise
         """
-        return self.goal_state.issubset(self.action_layers[-1].property_layer) if self.goal_state else None
+        return not self.__goal & ~self.__achieved if self.goal_state else None
 
     def __solution_possible(self):
         """Check if is it possible to reach the goal state.
         :returns True: if goal is already reached or if the graph is expandable
         :returns False: if fixed point was reached without solution
         """
-        if self.__goal_reached():
-            return True
-        else:
-            # if no goal state was specified or goal is not reached yet, check for possibility to expand the graph
-            last_action_layer = self.action_layers[-1]
-            return last_action_layer.preconditions != last_action_layer.property_layer
+        # if no goal state was specified or goal is not reached yet, the graph is expandable
+        # only if the last action layer has made some other component ready to run
+        return bool(self.__goal_reached() or self.__ready)
+
+    def __cheapest_actions(self):
+        """Choose the cheapest components to achieve the goal state.
+
+        The cost of a property is the cheapest cost among its components, where the cost of a component
+        is its own cost plus the cost of its preconditions (properties in the initial state cost nothing).
+        The chosen properties are those needed by the cheapest component of every goal property, recursively.
+        All the components providing a chosen property using only chosen properties are kept as fallbacks.
+
+        :return: the chosen components
+        :rtype: set
+        """
+        actions = sorted(
+            (action for layer in self.action_layers for action in layer.actions
+             if not isinstance(action, RelaxedGraphPlan.ActionLayer.NoOpAction)),
+            key=str
+        )
+        costs = dict((str(prop), Cost(requests=0)) for prop in self.initial_state)
+        cheapest = dict()  # property -> its cheapest component
+        changed = True
+        while changed:  # costs only decrease, so a fixed point is always reached
+            changed = False
+            for action in actions:
+                preconditions = [str(precondition) for precondition in action.preconditions]
+                if not all(precondition in costs for precondition in preconditions):
+                    continue
+                cost = sum((costs[precondition] for precondition in preconditions), action.cost)
+                postcondition = str(action.postcondition)
+                if postcondition not in costs or cost < costs[postcondition]:
+                    costs[postcondition] = cost
+                    cheapest[postcondition] = action
+                    changed = True
+
+        chosen = set(str(prop) for prop in self.initial_state)
+        needed = [str(prop) for prop in self.goal_state]
+        cost = Cost(requests=0)
+        while needed:
+            prop = needed.pop()
+            if prop not in chosen:
+                chosen.add(prop)
+                cost += cheapest[prop].cost
+                needed.extend(str(precondition) for precondition in cheapest[prop].preconditions)
+        logger(depth=2).info("Cheapest solution cost is %r" % cost)
+        return set(
+            action for action in actions
+            if str(action.postcondition) in chosen and
+            all(str(precondition) in chosen for precondition in action.preconditions)
+        )
 
     @property
     def solution(self):
-        class LayeredPlan(object):
-
-            def __init__(self, planning_graph):
-                # build the action layers which represent the solution
-                self.action_layers = list()
-                # if there is a specified goal state, remove all the useless components
-                # in the action layers
-                if planning_graph.goal_state is not None:
-                    # copy the goal state as property name list
-                    self.__goal_state = [str(prop) for prop in planning_graph.goal_state]
-                    # copy backwards the graph structure
-                    for action_layer in planning_graph.action_layers[::-1]:
-                        if self.action_layers:  # mantain the actions which need for these properties
-                            precondition_needed = self.action_layers[0].preconditions
-                        elif planning_graph.goal_state:  # if first step take them from specified goal state if any
-                            precondition_needed = planning_graph.goal_state
-                        else:
-                            # if no goal was specified mantain all actions as side-effect of
-                            # choosing as needed all the precondition in the last action layer
-                            precondition_needed = planning_graph.action_layers[-1].preconditions
-                        # keep the goal state as precondition needed to be sure that all the goal components
-                        # will be mantained even if in different layers
-                        precondition_needed = precondition_needed.union(planning_graph.goal_state)
-                        # clean up all the unused actions (those with useless postcondition)
-                        for action in action_layer.actions.copy():
-                            if action.postcondition not in precondition_needed:
-                                action_layer.remove(action)
-                        # remove all the NoOpAction and check if some action remain
-                        action_layer = RelaxedGraphPlan.ActionLayer(
-                            actions=[
-                                action for action in action_layer.actions
-                                if not isinstance(action, RelaxedGraphPlan.ActionLayer.NoOpAction)
-                            ]
-                        )
-                        if len(action_layer):
-                            # copy the remaining action layer at the beginning of the layered plan
-                            self.action_layers.insert(0, action_layer)
-                # if there is NOT a specified goal state, remove just the NoOpAction pseudo-components
-                # in the action layers
-                else:
-                    self.__goal_state = None
-                    for action_layer in planning_graph.action_layers[::-1]:
-                        action_layer = RelaxedGraphPlan.ActionLayer(
-                            actions=[
-                                action for action in action_layer.actions
-                                if not isinstance(action, RelaxedGraphPlan.ActionLayer.NoOpAction)
-                            ]
-                        )
-                        if len(action_layer):
-                            # copy the remaining action layer at the beginning of the layered plan
-                            self.action_layers.insert(0, action_layer)
-
-            def execute(self):
-                _logger = logger()
-                _logger.info("Executing solution")
-                registry = Registry.instance()
-                for layer_no, layer in enumerate(self.action_layers, start=1):
-                    _logger.debug("Executing action layer '%d'" % layer_no)
-                    for prop, actions in layer.equivalent_actions.iteritems():
-                        _logger.debug("Retrieving '%s' property" % prop)
-                        for component in actions:
-                            if prop not in registry:
-                                # if the component is not runnable go ahead
-                                if not all(str(prop) in registry for prop in component.preconditions):
-                                    _logger.debug("Component '%s' is not able to run" % component)
-                                    continue
-                                try:
-                                    _logger.debug("Executing component '%s'" % component)
-                                    component().execute()
-                                except (InvalidComponentError, ComponentFailure) as error:
-                                    _logger.warning("%(component)s: %(message)s" % {
-                                        'component': component,
-                                        'message': error.messages
-                                    })
-                                else:
-                                    # if no error raised and property was saved
-                                    # go ahead with the next one
-                                    if self.__goal_state is None or prop in self.__goal_state:
-                                        _logger.info("Goal property '%s' succesfully retrieved" % prop)
-                                    else:
-                                        _logger.debug("Property '%s' succesfully retrieved" % prop)
-                                    break
-                        if prop not in registry:
-                            _logger.error(PropertyNotAchievedError(prop))
-                _logger.info("Execution completed")
-
         while True:
             # Termination is granted by fixed-point level.
             # A fixed-point level in a planning graph G is a level k such that for all i > k
@@ -381,7 +825,7 @@ class RelaxedGraphPlan(object):
             goal_reached = self.__goal_reached()
             if goal_reached:
                 logger().info("Goal is reachable!")
-                return LayeredPlan(self)
+                return LayeredPlan(self, actions=self.__cheapest_actions())
             else:
                 if self.__solution_possible():
                     self.__expand()  # go ahead with the next step
@@ -0,0 +1,386 @@
+# WAT Framework, make simple to do the complex
+# Copyright 2014 Francesco Marano and individual contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A durable queue of targets to scan, so that a long scan campaign survives crashes and restarts.
+
+The queue is a SQLite database holding every target with its state: pending, in progress, done or failed.
+A worker leases a pending target, scans it and writes its result back as soon as its registry is final,
+so the results of the finished targets are never lost. Many worker processes, on the same machine,
+could pull targets from the same queue at the same time.
+
+The lease of a target in progress expires after a while, or as soon as its worker process is found dead,
+and then the target is pending again: restarting a campaign picks up where the previous run stopped,
+scanning only the targets which are not done yet. A target whose lease expired too many times fails.
+
+    from wat.lib.batch import Batch, targets
+    from wat.lib.jobs import JobQueue, drain
+
+    queue = JobQueue('campaign.db')
+    with open('targets.lst') as f:
+        queue.add(targets(f))  # the targets already in the queue are kept as they are
+    for result in drain(queue, Batch(plan), processes=4):
+        print result.url, result.properties
+"""
+
+__all__ = ['Job', 'JobQueue', 'work', 'drain']
+
+import os
+import json
+import time
+import errno
+import socket
+import sqlite3
+import multiprocessing
+from contextlib import contextmanager
+
+from wat.lib import clients
+from wat.lib.batch import Result, Target
+from wat.lib.shortcuts import hierlogger as logger, native
+
+PENDING = 'pending'
+IN_PROGRESS = 'in progress'
+DONE = 'done'
+FAILED = 'failed'
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY,
+        url TEXT NOT NULL,
+        port INTEGER NOT NULL,
+        state TEXT NOT NULL DEFAULT 'pending',
+        owner TEXT,
+        expires REAL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        sequence INTEGER,
+        properties TEXT,
+        errors TEXT,
+        UNIQUE (url, port)
+    );
+    CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id);
+    CREATE INDEX IF NOT EXISTS jobs_sequence ON jobs (sequence);
+"""
+
+
+def _owner():
+    """:return: the name of the current worker process, i.e. its host and its PID
+    :rtype: str
+    """
+    return '%s:%d' % (socket.gethostname(), os.getpid())
+
+
+def _alive(owner):
+    """:return: False if the worker process is known to be dead, i.e. it ran on this host and its PID is gone,
+    True otherwise
+    :rtype: bool
+    """
+    host, _, pid = owner.rpartition(':')
+    if host != socket.gethostname() or not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except OSError as e:
+        return e.errno != errno.ESRCH
+    return True
+
+
+class Job(object):
+    """A target leased by a worker"""
+
+    def __init__(self, id, target, owner, attempts):
+        """
+        :param id: the job identifier in the queue
+        :type id: int
+        :param target: the target to scan
+        :type target: Target
+        :param owner: the worker holding the lease
+        :type owner: str
+        :param attempts: the number of times the target was leased, this one included
+        :type attempts: int
+        """
+        self.id = id
+        self.target = target
+        self.owner = owner
+        self.attempts = attempts
+
+    def __repr__(self):
+        return "Job(%d, %r)" % (self.id, self.target)
+
+
+class JobQueue(object):
+    """The targets of a scan campaign and their results, in a SQLite database"""
+
+    def __init__(self, filename, lease=3600, attempts=3):
+        """
+        :param filename: the database file (created if it does not exist)
+        :type filename: str
+        :param lease: the seconds a worker has to scan a target before it is handed out again
+        :type lease: float
+        :param attempts: the maximum number of leases of a target, before it fails
+        :type attempts: int
+        """
+        self.filename = filename
+        self.lease = lease
+        self.attempts = attempts
+        self.__connection = None
+        self.__pid = None
+        connection = self.__connect()
+        connection.execute('PRAGMA journal_mode=WAL')  # the workers read while another one writes
+        connection.executescript(_SCHEMA)
+
+    def __connect(self):
+        """:return: the connection of the current process, since a connection must not cross a fork
+        :rtype: sqlite3.Connection
+        """
+        if self.__connection is None or self.__pid != os.getpid():
+            # transactions are explicit (see `__transaction()`)
+            self.__connection = sqlite3.connect(self.filename, timeout=60, isolation_level=None)
+            self.__pid = os.getpid()
+        return self.__connection
+
+    @contextmanager
+    def __transaction(self):
+        """A transaction holding the database write lock, so that the workers never lease the same target"""
+        connection = self.__connect()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    @staticmethod
+    def __finish(connection, job_id, state, properties, errors, owner=None):
+        """Set the final state of a job, numbering it in the order the jobs finished in
+        :return: True if the job was finished, False if it was not leased by the owner anymore
+        :rtype: bool
+        :raise TypeError: if a property value cannot be stored as JSON
+        """
+        query = """
+            UPDATE jobs SET state = ?, properties = ?, errors = ?, owner = NULL, expires = NULL,
+                sequence = (SELECT COALESCE(MAX(sequence), 0) + 1 FROM jobs)
+            WHERE id = ?
+        """
+        params = [
+            state,
+            json.dumps(properties) if properties is not None else None,
+            json.dumps(errors) if errors is not None else None,
+            job_id,
+        ]
+        if owner is not None:
+            query += " AND owner = ? AND state = ?"
+            params.extend([owner, IN_PROGRESS])
+        return connection.execute(query, params).rowcount == 1
+
+    def add(self, targets):
+        """Add the targets to scan, keeping the ones already in the queue as they are.
+        :type targets: collections.Iterable[Target]
+        :return: the number of targets added
+        :rtype: int
+        :raise ValueError: if a target is not valid (see `batch.targets()`), then none is added
+        """
+        added = 0
+        with self.__transaction() as connection:
+            for target in targets:
+                added += connection.execute(
+                    "INSERT OR IGNORE INTO jobs (url, port) VALUES (?, ?)", (target.url, target.port)
+                ).rowcount
+        return added
+
+    def acquire(self, owner=None):
+        """Lease the next target to scan, i.e. a pending one or one whose lease expired.
+        :param owner: the worker leasing the target (default: the current process)
+        :type owner: str
+        :return: the leased target, or None if there is nothing left to scan
+        :rtype: Job|None
+        """
+        owner = owner or _owner()
+        now = time.time()
+        with self.__transaction() as connection:
+            # the leases of the dead workers expire right away
+            for job_id, job_owner in connection.execute(
+                "SELECT id, owner FROM jobs WHERE state = ? AND expires >= ?", (IN_PROGRESS, now)
+            ).fetchall():
+                if not _alive(job_owner):
+                    connection.execute("UPDATE jobs SET expires = 0 WHERE id = ?", (job_id,))
+            # a target whose lease expired too many times probably kills or hangs its worker
+            for job_id, attempts in connection.execute(
+                "SELECT id, attempts FROM jobs WHERE state = ? AND expires < ? AND attempts >= ?",
+                (IN_PROGRESS, now, self.attempts)
+            ).fetchall():
+                logger().error("Job %d failed, its lease expired %d times" % (job_id, attempts))
+                self.__finish(connection, job_id, FAILED, {}, ["Lease expired %d times" % attempts])
+            row = connection.execute(
+                "SELECT id, url, port, attempts FROM jobs WHERE state = ? OR (state = ? AND expires < ?) "
+                "ORDER BY id LIMIT 1",
+                (PENDING, IN_PROGRESS, now)
+            ).fetchone()
+            if row is None:
+                return None
+            job_id, url, port, attempts = row
+            connection.execute(
+                "UPDATE jobs SET state = ?, owner = ?, expires = ?, attempts = ? WHERE id = ?",
+                (IN_PROGRESS, owner, now + self.lease, attempts + 1, job_id)
+            )
+        return Job(job_id, Target(native(url), port), owner, attempts + 1)
+
+    def complete(self, job, result):
+        """Write the result of a leased target back.
+        :type job: Job
+        :type result: Result
+        :return: True if the result was written, False if the lease was lost (e.g. it expired)
+        :rtype: bool
+        :raise TypeError: if a property value cannot be stored as JSON, then nothing is written
+        """
+        with self.__transaction() as connection:
+            return self.__finish(
+                connection, job.id, FAILED if result.failed else DONE, result.properties, result.errors, job.owner
+            )
+
+    def release(self, job):
+        """Give a leased target back without scanning it, e.g. if its worker is stopped
+        :type job: Job
+        """
+        with self.__transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET state = ?, owner = NULL, expires = NULL, attempts = attempts - 1 "
+                "WHERE id = ? AND owner = ? AND state = ?",
+                (PENDING, job.id, job.owner, IN_PROGRESS)
+            )
+
+    def fail(self, job, errors):
+        """Give a leased target up, e.g. if its scan raised an unexpected error
+        :type job: Job
+        :param errors: the error messages
+        :type errors: list
+        """
+        with self.__transaction() as connection:
+            self.__finish(connection, job.id, FAILED, {}, errors, job.owner)
+
+    def statistics(self):
+        """:return: the number of targets in every state
+        :rtype: dict
+        """
+        counts = dict.fromkeys([PENDING, IN_PROGRESS, DONE, FAILED], 0)
+        counts.update(self.__connect().execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+        return counts
+
+    def sequence(self):
+        """:return: the number of the last finished target, 0 if there is none
+        :rtype: int
+        """
+        return self.__connect().execute("SELECT COALESCE(MAX(sequence), 0) FROM jobs").fetchone()[0]
+
+    def results(self, after=0):
+        """Read the results of the finished targets, in the order they were finished in.
+        :param after: the number of the last finished target already read (see `sequence()`)
+        :type after: int
+        :return: the number of every finished target and its result
+        :rtype: collections.Iterator[(int, Result)]
+        """
+        rows = self.__connect().execute(
+            "SELECT sequence, url, port, properties, errors FROM jobs WHERE sequence > ? ORDER BY sequence",
+            (after,)
+        ).fetchall()
+        for sequence, url, port, properties, errors in rows:
+            yield sequence, Result(
+                Target(native(url), port),
+                native(json.loads(properties)) if properties is not None else {},
+                native(json.loads(errors)) if errors is not None else None
+            )
+
+
+def work(queue, batch, owner=None):
+    """Scan the targets of the queue one after the other, until there is nothing left to scan.
+
+    :type queue: JobQueue
+    :param batch: the plan execution options
+    :type batch: wat.lib.batch.Batch
+    :param owner: the worker name (default: the current process)
+    :type owner: str
+    :return: the result of every scanned target, once written back
+    :rtype: collections.Iterator[Result]
+    """
+    while True:
+        job = queue.acquire(owner)
+        if job is None:
+            return
+        try:
+            result = batch.scan(job.target)
+        except Exception as error:
+            logger().exception("Unexpected error scanning '%s'" % job.target.url)
+            queue.fail(job, [str(error)])
+            continue
+        except BaseException:
+            queue.release(job)
+            raise
+        try:
+            completed = queue.complete(job, result)
+        except TypeError as error:
+            logger().error("The result of '%s' cannot be stored: %s" % (job.target.url, error))
+            queue.fail(job, [str(error)])
+            continue
+        if completed:
+            yield result
+        else:
+            logger().warning("The lease of '%s' expired before it was scanned" % job.target.url)
+
+
+def _work(queue, batch):
+    """The forked worker processes body"""
+    clients.after_fork()
+    for _ in work(queue, batch):
+        pass
+
+
+def drain(queue, batch, processes=1, poll=0.5):
+    """Scan the targets of the queue until there is nothing left to scan.
+
+    :type queue: JobQueue
+    :param batch: the plan execution options
+    :type batch: wat.lib.batch.Batch
+    :param processes: the number of worker processes, 1 means the current one, 0 means one per CPU
+    :type processes: int
+    :param poll: the seconds between two reads of the results written back by the worker processes
+    :type poll: float
+    :return: the result of every target scanned by the workers, as soon as it is written back
+    :rtype: collections.Iterator[Result]
+    """
+    processes = processes or multiprocessing.cpu_count()
+    if processes == 1:
+        for result in work(queue, batch):
+            yield result
+        return
+
+    # the workers are forked warm, see `ForkedBatch`
+    batch.warm()
+    last = queue.sequence()
+    workers = [multiprocessing.Process(target=_work, args=(queue, batch)) for _ in range(processes)]
+    try:
+        for worker in workers:
+            worker.start()
+        while any(worker.is_alive() for worker in workers):
+            time.sleep(poll)
+            for last, result in queue.results(after=last):
+                yield result
+        for last, result in queue.results(after=last):
+            yield result
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()  # its target is leased again by the next run, once found dead
+            worker.join()
+            if worker.exitcode:
+                logger().error("Worker process %d exited with code %d" % (worker.pid, worker.exitcode))
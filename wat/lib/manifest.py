@@ -0,0 +1,457 @@
+# WAT Framework, make simple to do the complex
+# Copyright 2014 Francesco Marano and individual contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__all__ = ['Manifest', 'ComponentEntry', 'describe']
+
+import os
+import ast
+import json
+import inspect
+import importlib
+from datetime import date, datetime
+
+from singleton.singleton import Singleton
+
+import wat
+from wat.lib.components import iswatcomponent
+from wat.lib.models import Cost
+from wat.lib.properties import Property, Constraint
+from wat.lib.shortcuts import hierlogger as logger, native
+
+
+class ComponentEntry(object):
+    """A lightweight description of a wat component, as stored into the manifest.
+
+    It exposes the same metadata of the component class (name, postcondition, preconditions, ...),
+    so that searching and planning do not need to import the component module.
+    The component class is imported only when the entry is loaded or called.
+    """
+
+    def __init__(self, name, module, postcondition, preconditions=None, provides=None,
+                 version='unknown', description=None, released=None, updated=None, cost=None):
+        self.name = name
+        self.module = module
+        self.postcondition = postcondition
+        self.preconditions = set(preconditions) if preconditions else set()
+        self.provides = provides
+        self.version = version
+        self.description = description
+        self.released = released
+        self.updated = updated
+        self.cost = cost if cost is not None else Cost()
+
+    @classmethod
+    def from_component(cls, component, provides=None):
+        """Describe the specified (already imported) component class.
+        :param component: the wat component class to describe
+        :param provides: the `__provides__` set of the component postcondition, if any
+        :rtype: ComponentEntry
+        """
+        return cls(
+            name=component.name,
+            module=component.__module__,
+            postcondition=component.postcondition,
+            preconditions=component.preconditions,
+            provides=provides,
+            version=component.version,
+            description=component.description,
+            released=getattr(component, 'released', None),
+            updated=getattr(component, 'updated', None),
+            cost=getattr(component, 'cost', None),
+        )
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild an entry from its manifest representation.
+        :type data: dict
+        :rtype: ComponentEntry
+        """
+        preconditions = set()
+        for spec in data['preconditions']:
+            if 'expected' in spec:
+                preconditions.add(Constraint(spec['property'], spec['expected'], spec['compare_fn']))
+            else:
+                preconditions.add(Property(spec['property']))
+
+        def _date(value):
+            return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+        return cls(
+            name=data['name'],
+            module=data['module'],
+            postcondition=Property(data['postcondition']),
+            preconditions=preconditions,
+            provides=set(data['provides']) if data['provides'] is not None else None,
+            version=data['version'],
+            description=data['description'],
+            released=_date(data['released']),
+            updated=_date(data['updated']),
+            cost=Cost(**data['cost']),
+        )
+
+    def to_dict(self):
+        """:return: the manifest representation of the entry
+        :rtype: dict
+        """
+        preconditions = list()
+        for spec in self.preconditions:
+            if isinstance(spec, Constraint):
+                preconditions.append({
+                    'property': str(spec),
+                    'expected': spec.expected_value,
+                    'compare_fn': spec.compare_fn
+                })
+            else:
+                preconditions.append({'property': str(spec)})
+        return {
+            'name': self.name,
+            'module': self.module,
+            'postcondition': str(self.postcondition),
+            'preconditions': preconditions,
+            'provides': sorted(self.provides) if self.provides is not None else None,
+            'version': self.version,
+            'description': self.description,
+            'released': self.released.isoformat() if self.released else None,
+            'updated': self.updated.isoformat() if self.updated else None,
+            'cost': {'requests': self.cost.requests, 'size': self.cost.size, 'intrusive': self.cost.intrusive},
+        }
+
+    def load(self):
+        """Import the component module.
+        :return: the described component class
+        """
+        return getattr(importlib.import_module(self.module), self.name)
+
+    def __call__(self, *args, **kwargs):
+        """Instantiate the described component, importing it if needed"""
+        return self.load()(*args, **kwargs)
+
+    def __eq__(self, other):
+        return isinstance(other, ComponentEntry) and (self.module, self.name) == (other.module, other.name)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash((self.module, self.name))
+
+    def __repr__(self):
+        return "ComponentEntry('%s')" % self
+
+    def __str__(self):
+        return '.'.join([str(self.postcondition), self.name])
+
+
+class _NotStatic(Exception):
+    """The source code cannot be described without running it"""
+
+
+# the callables allowed into a statically described `@info(...)` decorator
+_constructors = {'date': date, 'Property': Property, 'Constraint': Constraint, 'Cost': Cost}
+# the `info()` decorator parameters, in positional order
+_info_parameters = ('authors', 'released', 'updated', 'preconditions', 'version', 'cost')
+
+
+def _name(node):
+    """:return: the name referenced by a `Name` or `Attribute` node, None otherwise"""
+    if isinstance(node, ast.Name):
+        return node.id
+    elif isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+
+def _literal(node):
+    """Evaluate a literal expression, allowing calls to the known constructors only.
+    :param node: the expression node to evaluate
+    :return: the value of the expression
+    :raise _NotStatic: if the expression cannot be evaluated without running the module
+    """
+    if isinstance(node, ast.Str):
+        return node.s
+    elif isinstance(node, ast.Num):
+        return node.n
+    elif isinstance(node, ast.Name) and node.id in ('None', 'True', 'False'):
+        return {'None': None, 'True': True, 'False': False}[node.id]
+    elif isinstance(node, (ast.List, ast.Tuple)):
+        return [_literal(element) for element in node.elts]
+    elif isinstance(node, ast.Set):
+        return set(_literal(element) for element in node.elts)
+    elif isinstance(node, ast.Dict):
+        return dict((_literal(key), _literal(value)) for key, value in zip(node.keys, node.values))
+    elif isinstance(node, ast.Call) and _name(node.func) in _constructors \
+            and node.starargs is None and node.kwargs is None:
+        return _constructors[_name(node.func)](
+            *[_literal(arg) for arg in node.args],
+            **dict((keyword.arg, _literal(keyword.value)) for keyword in node.keywords)
+        )
+    raise _NotStatic(node)
+
+
+def _iscomponent(node):
+    """:return: True if the class definition looks like a wat component one, False otherwise"""
+    return any(_name(base) == 'WatComponent' for base in node.bases) and any(
+        isinstance(statement, ast.Assign) and _name(statement.value) == 'MetaComponent'
+        and any(_name(target) == '__metaclass__' for target in statement.targets)
+        for statement in node.body
+    )
+
+
+def _info(node):
+    """:return: the `info()` decorator parameters of the class definition
+    :rtype: dict
+    :raise _NotStatic: if the class is not decorated with a statically defined `info()`
+    """
+    for decorator in node.decorator_list:
+        if isinstance(decorator, ast.Call) and _name(decorator.func) == 'info':
+            if decorator.starargs is not None or decorator.kwargs is not None:
+                break
+            parameters = dict(zip(_info_parameters, decorator.args))
+            parameters.update((keyword.arg, keyword.value) for keyword in decorator.keywords)
+            return parameters
+    raise _NotStatic(node)
+
+
+def describe(filename, module, postcondition):
+    """Describe the components defined into a module by statically analyzing its source code,
+    following the same rules of the `info()` decorator and of the `MetaComponent` metaclass.
+    The module is never imported, so neither its dependencies are.
+
+    :param filename: the module source file path
+    :param module: the module name in dotted notation
+    :param postcondition: the postcondition of the module components (i.e. the module package)
+    :return: the entries of all the module components,
+     or None if the module cannot be described without importing it
+    :rtype: list[ComponentEntry]|None
+    """
+    with open(filename, mode='r') as f:
+        try:
+            tree = ast.parse(f.read(), filename)
+        except SyntaxError:
+            return None
+
+    entries = list()
+    try:
+        for node in tree.body:
+            if not isinstance(node, ast.ClassDef) or not _iscomponent(node):
+                continue
+            description = ast.get_docstring(node, clean=False)
+            if not description:
+                raise _NotStatic(node)  # let the import raise the proper error
+            parameters = _info(node)
+            preconditions = _literal(parameters['preconditions']) if 'preconditions' in parameters else None
+            if preconditions and not all(isinstance(spec, Property) for spec in preconditions):
+                raise _NotStatic(node)
+            released = _literal(parameters['released']) if 'released' in parameters else None
+            updated = _literal(parameters['updated']) if 'updated' in parameters else None
+            cost = _literal(parameters['cost']) if 'cost' in parameters else None
+            if cost is not None and not isinstance(cost, Cost):
+                raise _NotStatic(node)
+            entries.append(ComponentEntry(
+                name=node.name,
+                module=module,
+                postcondition=Property(postcondition),
+                preconditions=preconditions,
+                version=str(_literal(parameters['version'])) if 'version' in parameters else 'unknown',
+                description=description,
+                released=released if isinstance(released, date) else None,
+                updated=updated if isinstance(updated, date) else None,
+                cost=cost,
+            ))
+    except (_NotStatic, TypeError, ValueError):
+        return None
+    return entries
+
+
+def _provides(filename):
+    """:return: the `__provides__` set defined into a package, if any
+    :raise _NotStatic: if `__provides__` cannot be evaluated without importing the package
+    """
+    with open(filename, mode='r') as f:
+        tree = ast.parse(f.read(), filename)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(_name(target) == '__provides__' for target in node.targets):
+            return _literal(node.value)
+    return None
+
+
+@Singleton
+class Manifest(object):
+    """An on-disk index of all the available components.
+
+    Every component module is described by its modification time and size, so only new or changed
+    modules are analyzed again to refresh their entries, while all the others are read from the manifest.
+    Modules are statically analyzed (see `describe()`) and imported only if that is not possible.
+    """
+
+    format = 2
+
+    def __init__(self, filename=None, path=None, package=None):
+        """
+        :param filename: the manifest file path (default: `wat.files.manifest`)
+        :param path: the components directory (default: `wat.dirs.components`)
+        :param package: the components package name (default: `wat.packages.components`)
+        """
+        self.filename = filename or wat.files.manifest
+        self.path = path or wat.dirs.components
+        self.package = package or wat.packages.components
+        self.packages = dict()
+        self.modules = dict()
+        self.load()
+        self.refresh()
+
+    def load(self):
+        """Read the manifest file, if it exists and it is compatible with the current framework"""
+        try:
+            with open(self.filename, mode='r') as f:
+                data = native(json.load(f))
+        except (IOError, ValueError):
+            return
+        if data.get('format') == self.format and data.get('version') == wat.project.version:
+            self.packages = data['packages']
+            self.modules = data['modules']
+
+    def save(self):
+        """Write the manifest file, ignoring errors (e.g. read-only installation)"""
+        try:
+            with open(self.filename, mode='w') as f:
+                json.dump({
+                    'format': self.format,
+                    'version': wat.project.version,
+                    'packages': self.packages,
+                    'modules': self.modules,
+                }, f)
+        except (IOError, TypeError, ValueError) as e:
+            logger(depth=2).debug("Unable to save components manifest: %s" % e)
+
+    def __files(self):
+        """Walk the components directory without importing anything.
+        :return: the (relative path, stat) pairs of all packages and modules found
+        :rtype: tuple[dict, dict]
+        """
+        packages, modules = dict(), dict()
+        for dirpath, dirnames, filenames in os.walk(self.path):
+            if '__init__.py' not in filenames:
+                del dirnames[:]  # not a package, so neither its subdirectories are
+                continue
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.endswith('.py'):
+                    path = os.path.join(dirpath, filename)
+                    stat = os.stat(path)
+                    relpath = os.path.relpath(path, self.path)
+                    if filename == '__init__.py':
+                        packages[relpath] = [stat.st_mtime, stat.st_size]
+                    else:
+                        modules[relpath] = [stat.st_mtime, stat.st_size]
+        return packages, modules
+
+    def __module_name(self, relpath):
+        name, _ = os.path.splitext(relpath)
+        if name.endswith('__init__'):
+            name = os.path.dirname(name)
+        return '.'.join([self.package] + [part for part in name.split(os.path.sep) if part])
+
+    def __scan_package(self, relpath):
+        try:
+            provides = _provides(os.path.join(self.path, relpath))
+        except (_NotStatic, SyntaxError, TypeError, ValueError):
+            provides = getattr(importlib.import_module(self.__module_name(relpath)), '__provides__', None)
+        return sorted(provides) if provides is not None else None
+
+    def __scan_module(self, relpath):
+        entries = describe(
+            filename=os.path.join(self.path, relpath),
+            module=self.__module_name(relpath),
+            postcondition=self.__module_name(os.path.dirname(relpath))[len(self.package) + 1:]
+        )
+        if entries is not None:
+            return [entry.to_dict() for entry in entries]
+
+        logger(depth=2).debug("Unable to statically describe '%s', importing it" % relpath)
+        module = importlib.import_module(self.__module_name(relpath))
+        return [
+            ComponentEntry.from_component(cls).to_dict()
+            for _, cls in inspect.getmembers(module, inspect.isclass)
+            if cls.__module__ == module.__name__ and iswatcomponent(cls)
+        ]
+
+    def refresh(self):
+        """Update the entries of all the new or changed components, drop the removed ones
+        and save the manifest if anything changed.
+        :return: True if the manifest changed, False otherwise
+        :rtype: bool
+        """
+        changed = False
+        packages, modules = self.__files()
+
+        for scanned, files, scan in ((self.packages, packages, self.__scan_package),
+                                     (self.modules, modules, self.__scan_module)):
+            for relpath in set(scanned).difference(files):
+                del scanned[relpath]
+                changed = True
+            for relpath, stat in files.iteritems():
+                if relpath not in scanned or scanned[relpath]['stat'] != stat:
+                    logger(depth=2).debug("Indexing '%s'" % relpath)
+                    scanned[relpath] = {'stat': stat, 'data': scan(relpath)}
+                    changed = True
+
+        if changed:
+            self.save()
+        self.__build()
+        return changed
+
+    def __build(self):
+        """Build the in-memory indexes from the manifest data"""
+        self.__properties = dict()  # property name -> __provides__
+        for relpath, package in self.packages.iteritems():
+            self.__properties[self.__module_name(relpath)[len(self.package) + 1:]] = package['data']
+        self.__components = list()
+        self.__producers = dict()  # property name -> components providing it
+        for relpath in sorted(self.modules):
+            for data in self.modules[relpath]['data']:
+                entry = ComponentEntry.from_dict(data)
+                entry.provides = self.provides(str(entry.postcondition))
+                self.__components.append(entry)
+                self.__producers.setdefault(str(entry.postcondition), list()).append(entry)
+
+    @property
+    def components(self):
+        """:return: all the indexed components
+        :rtype: list[ComponentEntry]
+        """
+        return list(self.__components)
+
+    def producers(self, prop):
+        """:param prop: the property name
+        :return: the components providing the property
+        :rtype: list[ComponentEntry]
+        """
+        return list(self.__producers.get(str(prop), ()))
+
+    def exists(self, prop):
+        """:param prop: the property name
+        :return: True if the property is an existing components package, False otherwise
+        :rtype: bool
+        """
+        return str(prop) in self.__properties
+
+    def provides(self, prop):
+        """:param prop: the property name
+        :return: the `__provides__` set of the property, if any
+        :rtype: set|None
+        """
+        provides = self.__properties.get(str(prop))
+        return set(provides) if provides is not None else None
@@ -13,7 +13,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-__all__ = ['Author']
+__all__ = ['Author', 'Cost']
+
+from functools import total_ordering
 
 
 class Author(object):
@@ -43,4 +45,51 @@ class Author(object):
             string = "%s <%s>" % (self.nickname, self.email)
         else:
             string = self.email
-        return string
\ No newline at end of file
+        return string
+
+
+@total_ordering
+class Cost(object):
+    """The expected cost of running a component against the target.
+
+    Costs add up along a components chain and they are compared by intrusiveness first,
+    then by number of requests and finally by number of bytes received.
+    """
+
+    def __init__(self, requests=1, size=0, intrusive=False):
+        """
+        :param requests: the expected number of HTTP requests
+        :type requests: int
+        :param size: the expected number of bytes received
+        :type size: int
+        :param intrusive: True if the component changes the target state (e.g. logging in or saving settings)
+        :type intrusive: bool
+        """
+        self.requests = int(requests)
+        self.size = int(size)
+        self.intrusive = bool(intrusive)
+
+    def __add__(self, other):
+        return Cost(
+            requests=self.requests + other.requests,
+            size=self.size + other.size,
+            intrusive=self.intrusive or other.intrusive
+        )
+
+    def __key(self):
+        return self.intrusive, self.requests, self.size
+
+    def __eq__(self, other):
+        return isinstance(other, Cost) and self.__key() == other.__key()
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __lt__(self, other):
+        return self.__key() < other.__key()
+
+    def __hash__(self):
+        return hash(self.__key())
+
+    def __repr__(self):
+        return "Cost(requests=%d, size=%d, intrusive=%s)" % (self.requests, self.size, self.intrusive)
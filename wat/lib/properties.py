@@ -15,15 +15,14 @@
 
 __all__ = ['Registry', 'Property', 'Constraint']
 
-from singleton.singleton import Singleton
-
-import wat
+from wat.lib.context import contextual
 from wat.lib.exceptions import InvalidTypeError
 
 
-@Singleton
+@contextual('registry')
 class Registry(dict):
-    """A singleton dictionary to store components provided properties and to solve components preconditions."""
+    """A singleton dictionary to store components provided properties and to solve components preconditions.
+    Every execution context has its own (see `wat.lib.context.ExecutionContext`)."""
 
 
 class Property(object):
@@ -43,11 +42,8 @@ class Property(object):
         :return: True if the property exists, False otherwise
         :rtype: bool
         """
-        try:
-            __import__('.'.join([wat.packages.components, self._name]))
-        except ImportError:
-            return False
-        return True
+        from wat.lib.manifest import Manifest
+        return Manifest.instance().exists(self._name)
 
     def __repr__(self):
         return "Property('%s')" % self._name
@@ -15,38 +15,12 @@
 
 __all__ = {'components', 'properties'}
 
-import importlib
-import inspect
-from pkgutil import walk_packages, os
-
-import wat
-from wat.lib.components import iswatcomponent, component_from
 from wat.lib.exceptions import InvalidTypeError
-
-
-def __submoduleof(module):
-    for submodule_name in module.__modules__:
-        yield '.'.join([module.__name__, submodule_name])
-
-
-def __componentsin(module):
-    return filter(
-        lambda cls: cls.__module__ == module.__name__ and iswatcomponent(cls),
-        [member[1] for member in inspect.getmembers(module, inspect.isclass)]
-    )
+from wat.lib.manifest import Manifest
 
 
 def __components():
-    components = list()
-    paths = [wat.dirs.components]
-    for path in paths:
-        for _, package_or_path, ispackage in walk_packages(path=[path], prefix=path + os.path.sep):
-            if ispackage:
-                paths.append(package_or_path)
-            else:
-                components.extend(__componentsin(importlib.import_module(component_from(package_or_path))))
-
-    return components
+    return Manifest.instance().components
 
 
 def components(postconditions=None, preconditions=None):
@@ -66,10 +40,11 @@ def components(postconditions=None, preconditions=None):
 
     if postconditions is not None:
         # take all the components which give the specified postconditions
-        components = filter(
-            lambda component: str(component.postcondition) in postconditions,
-            components
-        )
+        manifest = Manifest.instance()
+        components = [
+            component for postcondition in sorted(set(str(prop) for prop in postconditions))
+            for component in manifest.producers(postcondition)
+        ]
 
     if preconditions is not None:
         # take all the components which require at least one of the specified precondition
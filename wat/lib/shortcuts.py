@@ -81,4 +81,22 @@ def hierlogger(depth=3):
         logger = logging.getLogger(logger_name)
         logger.addHandler(logging.NullHandler())
         caller.f_locals[lname] = logger
-    return caller.f_locals[lname]
\ No newline at end of file
+    return caller.f_locals[lname]
+
+
+def native(value):
+    """Convert the unicode strings loaded from JSON into native strings, recursively, as the components expect.
+
+    >>> native(json.loads('{"aaa.bbb": ["ccc", 1]}'))
+    {'aaa.bbb': ['ccc', 1]}
+
+    :param value: the value loaded from JSON
+    :return: the same value with `str` (UTF-8 encoded) in place of `unicode`
+    """
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    elif isinstance(value, list):
+        return [native(item) for item in value]
+    elif isinstance(value, dict):
+        return dict((native(key), native(item)) for key, item in value.iteritems())
+    return value
\ No newline at end of file
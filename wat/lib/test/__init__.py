@@ -1,6 +1,14 @@
 import unittest
 
+from wat.lib.test import archive
+from wat.lib.test import batch
+from wat.lib.test import checkpoint
+from wat.lib.test import buffers
+from wat.lib.test import clients
+from wat.lib.test import context
 from wat.lib.test import graph
+from wat.lib.test import jobs
+from wat.lib.test import manifest
 from wat.lib.test import properties
 
 
@@ -21,6 +29,21 @@ def graph_suite():
                 'test_preconditions', 'test_postconditions', 'test_property_layer'
             ]
         ),
+        suite(
+            testcase=graph.PropertyIndexTestCase,
+            tests=['test_id', 'test_mask', 'test_preconditions']
+        ),
+        suite(
+            testcase=graph.RelaxedGraphPlanTestCase,
+            tests=[
+                'test_solution', 'test_solution_initial_state', 'test_solution_without_goal',
+                'test_cost', 'test_backward', 'test_regress', 'test_no_solution'
+            ]
+        ),
+        suite(
+            testcase=graph.RaceTestCase,
+            tests=['test_sequential', 'test_race', 'test_abort']
+        ),
     ])
 
 
@@ -44,9 +67,142 @@ def properties_suite():
     ])
 
 
+def manifest_suite():
+    return unittest.TestSuite([
+        suite(
+            testcase=manifest.ComponentEntryTestCase,
+            tests=['test_from_component', 'test_dict', 'test_load']
+        ),
+        suite(
+            testcase=manifest.DescribeTestCase,
+            tests=['test_describe', 'test_describe_all']
+        ),
+        suite(
+            testcase=manifest.ManifestTestCase,
+            tests=['test_singleton', 'test_refresh', 'test_components', 'test_exists', 'test_provides', 'test_producers']
+        ),
+    ])
+
+
+def clients_suite():
+    return unittest.TestSuite([
+        suite(
+            testcase=clients.CurlTestCase,
+            tests=['test_init', 'test_perform', 'test_prefetchable', 'test_prefetched']
+        ),
+        suite(
+            testcase=clients.TransfersTestCase,
+            tests=['test_run', 'test_concurrency', 'test_callback', 'test_remove']
+        ),
+        suite(
+            testcase=clients.PoolTestCase,
+            tests=['test_reuse', 'test_reset', 'test_garbage_collected', 'test_transfers', 'test_revision']
+        ),
+        suite(
+            testcase=clients.ShareTestCase,
+            tests=['test_shared', 'test_threads']
+        ),
+        suite(
+            testcase=clients.FutureTestCase,
+            tests=['test_result', 'test_error', 'test_callback', 'test_cancel', 'test_per_host']
+        ),
+        suite(
+            testcase=clients.ResponseCacheTestCase,
+            tests=['test_hit', 'test_head', 'test_key', 'test_eviction', 'test_forget', 'test_disabled', 'test_threads',
+                   'test_transfers']
+        ),
+        suite(
+            testcase=clients.GovernorTestCase,
+            tests=['test_rate', 'test_burst', 'test_connections', 'test_perform', 'test_adaptive']
+        ),
+        suite(
+            testcase=clients.FetchTestCase,
+            tests=['test_status', 'test_prefix', 'test_until', 'test_incremental', 'test_no_match', 'test_transfers']
+        ),
+    ])
+
+
+def buffers_suite():
+    return unittest.TestSuite([
+        suite(
+            testcase=buffers.ResponseBufferTestCase,
+            tests=['test_write', 'test_view', 'test_spill', 'test_close']
+        ),
+    ])
+
+
+def archive_suite():
+    return unittest.TestSuite([
+        suite(
+            testcase=archive.ArchiveTestCase,
+            tests=['test_replay', 'test_transfers', 'test_order']
+        ),
+    ])
+
+
+def batch_suite():
+    return unittest.TestSuite([
+        suite(
+            testcase=batch.TargetTestCase,
+            tests=['test_parse', 'test_targets']
+        ),
+        suite(
+            testcase=batch.BatchTestCase,
+            tests=['test_run', 'test_error']
+        ),
+        suite(
+            testcase=batch.ForkedBatchTestCase,
+            tests=['test_run']
+        ),
+    ])
+
+
+def context_suite():
+    return unittest.TestSuite([
+        suite(
+            testcase=context.ExecutionContextTestCase,
+            tests=['test_bind', 'test_isolation', 'test_templates']
+        ),
+        suite(
+            testcase=context.ThreadsTestCase,
+            tests=['test_threads']
+        ),
+    ])
+
+
+def checkpoint_suite():
+    return unittest.TestSuite([
+        suite(
+            testcase=checkpoint.CheckpointTestCase,
+            tests=['test_save', 'test_unserializable', 'test_resume', 'test_load']
+        ),
+    ])
+
+
+def jobs_suite():
+    return unittest.TestSuite([
+        suite(
+            testcase=jobs.JobQueueTestCase,
+            tests=['test_add', 'test_acquire', 'test_lease', 'test_dead_worker', 'test_results', 'test_unserializable']
+        ),
+        suite(
+            testcase=jobs.WorkTestCase,
+            tests=['test_work', 'test_unserializable', 'test_drain']
+        ),
+    ])
+
+
 if __name__ == '__main__':
     def run_suite(tests_or_suite):
         return unittest.TextTestRunner(verbosity=2).run(tests_or_suite)
 
     run_suite(graph_suite())
-    run_suite(properties_suite())
\ No newline at end of file
+    run_suite(properties_suite())
+    run_suite(manifest_suite())
+    run_suite(clients_suite())
+    run_suite(buffers_suite())
+    run_suite(archive_suite())
+    run_suite(batch_suite())
+    run_suite(context_suite())
+    run_suite(jobs_suite())
+    run_suite(checkpoint_suite())
\ No newline at end of file
@@ -0,0 +1,69 @@
+import os
+import tempfile
+
+import pycurl
+
+from wat.lib import archive, clients
+from wat.lib.test.clients import ClientTestCase
+
+
+class ArchiveTestCase(ClientTestCase):
+
+    def setUp(self):
+        super(ArchiveTestCase, self).setUp()
+        fd, self.filename = tempfile.mkstemp(suffix='.jsonl.gz')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def test_replay(self):
+        with archive.recording(self.filename) as recorder:
+            for path in ['/0', '/missing']:
+                self.curl(path).perform()
+        self.assertEqual(2, len(recorder))
+        clients.ResponseCache.instance().clear()
+        requests = len(self.server.paths)
+
+        with archive.replaying(self.filename):
+            for path, code in [('/0', 200), ('/missing', 404)]:
+                body = list()
+                curl = self.curl(path, body)
+                curl.perform()
+                self.assertEqual(code, curl.getinfo(pycurl.HTTP_CODE))
+                self.assertEqual(path, ''.join(body))
+            # a HEAD request is served by the response to a GET one
+            curl = self.curl('/0')
+            curl.setopt(pycurl.NOBODY, True)
+            curl.perform()
+            self.assertEqual(200, curl.getinfo(pycurl.HTTP_CODE))
+        # no request reached the server
+        self.assertEqual(requests, len(self.server.paths))
+
+    def test_transfers(self):
+        with archive.recording(self.filename):
+            self.curl('/0').perform()
+        with archive.replaying(self.filename):
+            transfers = clients.Transfers()
+            found = transfers.submit(self.curl('/0'))
+            missing = transfers.submit(self.curl('/1'))
+            transfers.run()
+            self.assertEqual(200, found.result().getinfo(pycurl.HTTP_CODE))
+            # the request was not recorded
+            self.assertRaises(pycurl.error, missing.result)
+
+    def test_order(self):
+        request = ('GET', self.url + '/path', None)
+        recorder = archive.Recorder(self.filename)
+        for code in (500, 200):
+            recorder.record(request, clients.Response([], 'body', {pycurl.HTTP_CODE: code}))
+        recorder.record(('GET', self.url + '/error', None), error=pycurl.error(7, "Couldn't connect"))
+        recorder.close()
+
+        replayer = archive.Replayer(self.filename)
+        # the responses are replayed in the recorded order, the last one is repeated
+        self.assertListEqual(
+            [500, 200, 200],
+            [replayer.replay(request).info[pycurl.HTTP_CODE] for _ in range(3)]
+        )
+        self.assertRaises(pycurl.error, replayer.replay, ('GET', self.url + '/error', None))
@@ -0,0 +1,105 @@
+import socket
+import unittest
+
+import pycurl
+
+from wat import conf
+from wat.lib import clients
+from wat.lib.batch import Batch, ForkedBatch, Target, targets
+from wat.lib.exceptions import ClientError
+from wat.lib.properties import Registry
+from wat.lib.test.clients import ClientTestCase
+
+
+class _Plan(object):
+    """A plan requesting the 'path' page of the target, whose body is the retrieved property"""
+
+    goal_state = None
+    action_layers = ()
+
+    def __init__(self):
+        self.registries = list()  # the registry content at the beginning of every execution
+
+    def execute(self, concurrency=1, race=1):
+        registry = Registry.instance()
+        self.registries.append(dict(registry))
+        body = list()
+        curl = clients.Curl()
+        curl.setopt(pycurl.URL, conf.clients.instance().URL + 'path')
+        curl.setopt(pycurl.WRITEFUNCTION, body.append)
+        try:
+            curl.perform()
+        except pycurl.error as e:
+            raise ClientError(pycurl_error=e)  # as the components do
+        finally:
+            curl.release()
+        registry['test.body'] = ''.join(body)
+
+
+class TargetTestCase(unittest.TestCase):
+
+    def test_parse(self):
+        target = Target.parse('example.com')
+        self.assertEqual('http://example.com/', target.url)
+        self.assertEqual(80, target.port)
+        self.assertEqual(8080, Target.parse('http://example.com:8080/shop/').port)
+        self.assertEqual(8000, Target.parse('example.com:8080 8000').port)
+        self.assertEqual(443, Target.parse('https://example.com').port)
+        self.assertRaises(ValueError, Target.parse, 'example.com port')
+        self.assertRaises(ValueError, Target.parse, 'example.com 80 443')
+
+    def test_targets(self):
+        self.assertListEqual(
+            [Target('http://a.com/'), Target('http://b.com/', 8080)],
+            list(targets(['# a comment\n', 'a.com\n', '\n', '  b.com 8080  \n']))
+        )
+
+
+class BatchTestCase(ClientTestCase):
+
+    def test_run(self):
+        revision = conf.clients.instance().revision
+        registry = dict(Registry.instance())
+        plan = _Plan()
+        scanner = Batch(plan, initial_state=[('test.initial', 'value')])
+        results = list(scanner.run([Target(self.url + '/a'), Target(self.url + '/b')]))
+        self.assertListEqual(
+            [{'test.body': '/a/path'}, {'test.body': '/b/path'}],
+            [result.properties for result in results]
+        )
+        self.assertFalse(any(result.failed for result in results))
+        # every target starts from the initial state only, and leaves nothing behind
+        self.assertListEqual([{'test.initial': 'value'}] * 2, plan.registries)
+        self.assertDictEqual(registry, Registry.instance())
+        # every target is scanned in its own execution context
+        self.assertEqual(revision, conf.clients.instance().revision)
+
+    def test_error(self):
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        port = listener.getsockname()[1]
+        listener.close()  # nothing listens on the port anymore
+        results = list(Batch(_Plan()).run([Target('http://127.0.0.1:%d/' % port), Target(self.url)]))
+        self.assertTrue(results[0].failed)
+        self.assertDictEqual({}, results[0].properties)
+        # the next targets are scanned anyway
+        self.assertFalse(results[1].failed)
+        self.assertDictEqual({'test.body': '/path'}, results[1].properties)
+
+
+class ForkedBatchTestCase(ClientTestCase):
+
+    def test_run(self):
+        registry = dict(Registry.instance())
+        plan = _Plan()
+        scanner = ForkedBatch(plan, processes=2, initial_state=[('test.initial', 'value')])
+        results = list(scanner.run(Target(self.url + '/' + name) for name in 'abcd'))
+        # results come back in completion order
+        self.assertListEqual(
+            [{'test.body': '/%s/path' % name} for name in 'abcd'],
+            sorted((result.properties for result in results), key=lambda properties: properties['test.body'])
+        )
+        self.assertFalse(any(result.failed for result in results))
+        # the scans are made by the workers only
+        self.assertListEqual([], plan.registries)
+        self.assertDictEqual(registry, Registry.instance())
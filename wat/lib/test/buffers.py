@@ -0,0 +1,45 @@
+import re
+import unittest
+
+from wat.lib.buffers import ResponseBuffer
+
+
+class ResponseBufferTestCase(unittest.TestCase):
+
+    def test_write(self):
+        buf = ResponseBuffer()
+        self.assertFalse(buf)
+        for chunk in ['<html>', '<div id="footer">', '</html>']:
+            buf.write(chunk)
+        self.assertEqual(len('<html><div id="footer"></html>'), len(buf))
+        self.assertEqual('<html><div id="footer"></html>', str(buf))
+        self.assertEqual('<html>', buf[:6])
+        self.assertFalse(buf.spilled)
+
+    def test_view(self):
+        buf = ResponseBuffer()
+        buf.write('<textarea>log</textarea>')
+        # the view could be searched without copying the content
+        match = re.search(r'<textarea.*?>(?P<log>.*?)</textarea>', buf.view())
+        self.assertEqual('log', match.group('log'))
+
+    def test_spill(self):
+        buf = ResponseBuffer(spill_size=16)
+        buf.write('0123456789')
+        self.assertFalse(buf.spilled)
+        buf.write('0123456789')
+        self.assertTrue(buf.spilled)
+        self.assertEqual('01234567890123456789', str(buf))
+        # the data written after the spill is visible through a new view
+        buf.write('<end>')
+        self.assertEqual(25, len(buf))
+        self.assertIsNotNone(re.search('<end>', buf.view()))
+        self.assertEqual('<end>', buf[-5:])
+
+    def test_close(self):
+        buf = ResponseBuffer(spill_size=4)
+        buf.write('0123456789')
+        buf.close()
+        self.assertFalse(buf.spilled)
+        self.assertEqual(0, len(buf))
+        self.assertEqual('', str(buf))
@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+
+import pycurl
+
+from wat.lib.checkpoint import Checkpoint
+from wat.lib.context import ExecutionContext
+from wat.lib.exceptions import ClientError
+from wat.lib.graph import LayeredPlan
+from wat.lib.properties import Property, Registry
+from wat.lib.test.clients import ClientTestCase
+from wat.lib.test.graph import _Candidate
+
+
+class _Broken(object):
+    """A fake component whose transfer always fails"""
+    preconditions = set()
+    postcondition = Property('test.broken')
+
+    def __call__(self):
+        class Instance(object):
+            def execute(self):
+                raise ClientError(pycurl_error=pycurl.error(pycurl.E_COULDNT_CONNECT, "Connection refused"))
+
+        return Instance()
+
+    def __str__(self):
+        return 'broken'
+
+
+class _Layer(object):
+    def __init__(self, prop, *actions):
+        self.equivalent_actions = {prop: list(actions)}
+
+
+class CheckpointTestCase(ClientTestCase):
+
+    def setUp(self):
+        super(CheckpointTestCase, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'scan.checkpoint')
+        # the registry holds the properties of this execution only
+        self.context = ExecutionContext(url=self.url)
+        self.context.bind()
+
+    def tearDown(self):
+        self.context.unbind()
+        self.context.close()
+        shutil.rmtree(self.directory)
+
+    @staticmethod
+    def plan(*layers):
+        plan = LayeredPlan.__new__(LayeredPlan)
+        plan.goal_state = None
+        plan.action_layers = list(layers)
+        return plan
+
+    def test_save(self):
+        candidates = [_Candidate(self, '/missing'), _Candidate(self, '/found')]
+        plan = self.plan(_Layer('test.race', *candidates), _Layer('test.broken', _Broken()))
+        self.assertRaises(ClientError, plan.execute, checkpoint=Checkpoint(self.filename))
+        checkpoint = Checkpoint.load(self.filename)
+        # the failed component and the one interrupted by the client error are not completed
+        self.assertSetEqual({'/found'}, checkpoint.completed)
+        self.assertListEqual([('test.race', '/found')], checkpoint.initial_state)
+        self.assertEqual(self.url, checkpoint.url)
+
+    def test_unserializable(self):
+        checkpoint = Checkpoint(self.filename)
+        Registry.instance()['test.race'] = '/found'
+        checkpoint.complete('/found')
+        # a value that would not be restored as it was is refused
+        Registry.instance()['test.object'] = object()
+        self.assertRaises(TypeError, checkpoint.complete, '/other')
+        for state in (checkpoint, Checkpoint.load(self.filename)):
+            self.assertListEqual([('test.race', '/found')], state.initial_state)
+            self.assertSetEqual({'/found'}, state.completed)
+        self.assertListEqual(['scan.checkpoint'], os.listdir(self.directory))
+        # the execution goes ahead without saving
+        del Registry.instance()['test.race']
+        candidates = [_Candidate(self, '/missing'), _Candidate(self, '/other')]
+        self.plan(_Layer('test.race', *candidates)).execute(checkpoint=checkpoint)
+        self.assertEqual('/other', Registry.instance()['test.race'])
+        self.assertSetEqual({'/found'}, Checkpoint.load(self.filename).completed)
+
+    def test_resume(self):
+        for execute in (LayeredPlan.execute, LayeredPlan.schedule):
+            self.tearDown()
+            self.setUp()
+            candidates = [_Candidate(self, '/missing'), _Candidate(self, '/done'), _Candidate(self, '/found')]
+            # '/missing' failed during the previous execution, so it was not completed
+            checkpoint = Checkpoint(self.filename, completed={'/done'})
+            execute(self.plan(_Layer('test.race', *candidates)), checkpoint=checkpoint)
+            # the completed components are skipped, the failed ones are tried again
+            self.assertListEqual([True, False, True], [candidate.executed for candidate in candidates])
+            self.assertEqual('/found', Registry.instance()['test.race'])
+            self.assertSetEqual({'/done', '/found'}, Checkpoint.load(self.filename).completed)
+
+    def test_load(self):
+        # a missing checkpoint starts from scratch
+        checkpoint = Checkpoint.load(self.filename)
+        self.assertListEqual([], checkpoint.initial_state)
+        self.assertSetEqual(set(), checkpoint.completed)
+        with open(self.filename, 'w') as f:
+            f.write('[]')
+        self.assertRaises(ValueError, Checkpoint.load, self.filename)
@@ -0,0 +1,556 @@
+import gc
+import re
+import time
+import threading
+import unittest
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+
+import pycurl
+
+from wat import conf
+from wat.lib import clients
+from wat.lib.context import ExecutionContext
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = 0.2
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.paths.append(self.path)
+        time.sleep(self.latency)
+        body = self.path if self.path != '/big' else 'a' * 100000 + '<marker>' + 'b' * 100000
+        self.send_response(200 if self.path != '/missing' else 404)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    do_HEAD = do_GET
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # aborted transfers reset their connections
+
+
+class ClientTestCase(unittest.TestCase):
+    """A test case with a local HTTP server answering with the requested path after some latency"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = _Server(('127.0.0.1', 0), _RequestHandler)
+        cls.port = cls.server.server_address[1]
+        cls.url = 'http://127.0.0.1:%d' % cls.port
+        cls.server.paths = list()  # the requested paths
+        thread = threading.Thread(target=cls.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        clients.Pool.instance().clear()  # close the kept alive connections
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        clients.ResponseCache.instance().clear()
+
+    def curl(self, path, body=None):
+        curl = clients.Curl()
+        curl.setopt(pycurl.URL, self.url + path)
+        curl.setopt(pycurl.PORT, self.port)  # the default port would override the URL one
+        curl.setopt(pycurl.WRITEFUNCTION, (body if body is not None else list()).append)
+        return curl
+
+
+class CurlTestCase(ClientTestCase):
+
+    def test_init(self):
+        clients.Curl()
+        clients.CurlMulti()
+        clients.CurlShare()
+
+    def test_perform(self):
+        body = list()
+        curl = self.curl('/path', body)
+        curl.perform()
+        self.assertEqual(200, curl.getinfo(pycurl.HTTP_CODE))
+        self.assertEqual('/path', ''.join(body))
+
+    def test_prefetchable(self):
+        # the URL was not explicitly set
+        self.assertFalse(clients.Curl().prefetchable)
+        curl = self.curl('/path')
+        self.assertTrue(curl.prefetchable)
+        curl.prefetched()
+        self.assertFalse(curl.prefetchable)
+        # changing the handle invalidates the performed transfer
+        curl.setopt(pycurl.NOBODY, True)
+        self.assertTrue(curl.prefetchable)
+
+    def test_prefetched(self):
+        body = list()
+        curl = self.curl('/path', body)
+        curl.prefetched(error=pycurl.error(7, "Couldn't connect to server"))
+        # the transfer is not repeated, but its error is raised
+        self.assertRaises(pycurl.error, curl.perform)
+        self.assertListEqual([], body)
+        # the next perform is a real one
+        curl.perform()
+        self.assertEqual('/path', ''.join(body))
+
+
+class TransfersTestCase(ClientTestCase):
+
+    def test_run(self):
+        transfers = clients.Transfers()
+        bodies = [list() for _ in range(4)]
+        done = list()
+        for index, body in enumerate(bodies):
+            transfers.add(self.curl('/%d' % index, body), lambda curl, error: done.append(error))
+        self.assertEqual(4, len(transfers))
+
+        start = time.time()
+        transfers.run()
+        # all the transfers were performed at the same time
+        self.assertLess(time.time() - start, 4 * _RequestHandler.latency)
+        self.assertEqual(0, len(transfers))
+        self.assertListEqual([None] * 4, done)
+        self.assertListEqual(['/%d' % index for index in range(4)], [''.join(body) for body in bodies])
+
+    def test_concurrency(self):
+        transfers = clients.Transfers(concurrency=1)
+        for index in range(3):
+            transfers.add(self.curl('/%d' % index))
+        start = time.time()
+        transfers.run()
+        # one transfer at a time
+        self.assertGreaterEqual(time.time() - start, 3 * _RequestHandler.latency)
+
+    def test_callback(self):
+        transfers = clients.Transfers()
+        body = list()
+        curl = self.curl('/first')
+
+        def callback(curl, error):
+            # callbacks could add new transfers
+            transfers.add(self.curl('/second', body))
+
+        transfers.add(curl, callback)
+        transfers.run()
+        self.assertEqual('/second', ''.join(body))
+        # the first transfer was performed in advance
+        self.assertFalse(curl.prefetchable)
+        self.assertEqual(200, curl.getinfo(pycurl.HTTP_CODE))
+
+    def test_remove(self):
+        transfers = clients.Transfers()
+        done = list()
+        curl = self.curl('/path')
+        transfers.add(curl, lambda curl, error: done.append(curl))
+        transfers.remove(curl)
+        transfers.run()
+        self.assertListEqual([], done)
+
+
+class PoolTestCase(ClientTestCase):
+
+    def setUp(self):
+        super(PoolTestCase, self).setUp()
+        clients.Pool.instance().clear()
+
+    def test_reuse(self):
+        curl = self.curl('/first')
+        handle = curl.handle
+        curl.perform()
+        self.assertEqual(1, curl.getinfo(pycurl.NUM_CONNECTS))
+        curl.release()
+        self.assertIsNone(curl.handle)
+        # the next borrower gets the same handle, and its connection
+        curl = self.curl('/second')
+        self.assertIs(handle, curl.handle)
+        curl.perform()
+        self.assertEqual(0, curl.getinfo(pycurl.NUM_CONNECTS))
+
+    def test_reset(self):
+        curl = self.curl('/first')
+        curl.setopt(pycurl.NOBODY, True)
+        curl.setopt(pycurl.HTTPPOST, [('name', 'value')])
+        curl.setopt(pycurl.HEADERFUNCTION, list().append)
+        curl.release()
+        # per-request options do not leak to the next borrower
+        body = list()
+        curl = self.curl('/second', body)
+        curl.perform()
+        self.assertEqual(200, curl.getinfo(pycurl.HTTP_CODE))
+        self.assertEqual('/second', ''.join(body))
+
+    def test_garbage_collected(self):
+        def drop():
+            curl = self.curl('/path')
+            curl.setopt(pycurl.WRITEFUNCTION, lambda data: curl)  # a reference cycle, as the components make
+
+        drop()
+        gc.collect()
+        # a wrapper dropped without being released is not kept alive by its reference cycle
+        self.assertListEqual([], [obj for obj in gc.garbage if isinstance(obj, clients.Curl)])
+
+    def test_transfers(self):
+        connects = list()
+        for index in range(2):
+            curl = self.curl('/%d' % index)
+            transfers = clients.Transfers()
+            transfers.add(curl)
+            transfers.run()
+            self.assertEqual(200, curl.getinfo(pycurl.HTTP_CODE))
+            connects.append(curl.getinfo(pycurl.NUM_CONNECTS))
+            curl.release()
+        # the connection kept by the multi handle was reused
+        self.assertListEqual([1, 0], connects)
+
+    def test_revision(self):
+        client_conf = conf.clients.instance()
+        template = clients._compiled()
+        # the default options are compiled once per configuration revision
+        self.assertIs(template, clients._compiled())
+        curl = self.curl('/path')
+        handle = curl.handle
+        useragent, client_conf.USERAGENT = client_conf.USERAGENT, 'test'
+        try:
+            self.assertEqual(template.revision + 1, client_conf.revision)
+            self.assertEqual('test', clients._compiled().defaults[pycurl.USERAGENT])
+            curl.release()
+            # the handle initialized with the previous options was not pooled
+            self.assertIsNot(handle, clients.Curl().handle)
+        finally:
+            client_conf.USERAGENT = useragent
+
+
+class ShareTestCase(ClientTestCase):
+
+    def test_shared(self):
+        self.assertIs(clients.shared(), clients.shared())
+        self.assertIsInstance(clients.shared(), pycurl.CurlShare)
+
+    def test_threads(self):
+        codes = list()
+
+        def perform(index):
+            curl = self.curl('/%d' % index)
+            curl.perform()
+            codes.append(curl.getinfo(pycurl.HTTP_CODE))
+            curl.release()
+
+        # handles attached to the same share object run from several threads
+        threads = [threading.Thread(target=perform, args=(index,)) for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertListEqual([200] * 8, codes)
+
+
+class FutureTestCase(ClientTestCase):
+
+    def test_result(self):
+        transfers = clients.Transfers()
+        body = list()
+        future = transfers.submit(self.curl('/path', body))
+        self.assertFalse(future.done)
+        # the transfers are run on demand
+        curl = future.result()
+        self.assertTrue(future.done)
+        self.assertEqual(200, curl.getinfo(pycurl.HTTP_CODE))
+        self.assertEqual('/path', ''.join(body))
+
+    def test_error(self):
+        transfers = clients.Transfers()
+        curl = self.curl('/path')
+        curl.setopt(pycurl.URL, 'http://127.0.0.1:1/')
+        curl.setopt(pycurl.PORT, 1)
+        future = transfers.submit(curl)
+        transfers.run()
+        self.assertIsInstance(future.error, pycurl.error)
+        self.assertRaises(pycurl.error, future.result)
+
+    def test_callback(self):
+        transfers = clients.Transfers()
+        done = list()
+        future = transfers.submit(self.curl('/path'), done.append)
+        transfers.run()
+        self.assertListEqual([future], done)
+
+    def test_cancel(self):
+        transfers = clients.Transfers()
+        done = list()
+        future = transfers.submit(self.curl('/path'), done.append)
+        self.assertTrue(future.cancel())
+        transfers.run()
+        self.assertListEqual([], done)
+        self.assertRaises(RuntimeError, future.result)
+
+    def test_per_host(self):
+        transfers = clients.Transfers(per_host=1)
+        futures = [transfers.submit(self.curl('/%d' % index)) for index in range(3)]
+        start = time.time()
+        transfers.run()
+        # one connection to the server at a time
+        self.assertGreaterEqual(time.time() - start, 3 * _RequestHandler.latency)
+        self.assertListEqual([200] * 3, [future.result().getinfo(pycurl.HTTP_CODE) for future in futures])
+
+
+class ResponseCacheTestCase(ClientTestCase):
+
+    def setUp(self):
+        super(ResponseCacheTestCase, self).setUp()
+        del self.server.paths[:]
+
+    def test_hit(self):
+        bodies = [list(), list()]
+        for body in bodies:
+            curl = self.curl('/cached', body)
+            curl.perform()
+            self.assertEqual(200, curl.getinfo(pycurl.HTTP_CODE))
+        # the second response was replayed from the cache
+        self.assertListEqual(['/cached'], self.server.paths)
+        self.assertListEqual(['/cached', '/cached'], [''.join(body) for body in bodies])
+        self.assertEqual(1, clients.ResponseCache.instance().hits)
+
+    def test_head(self):
+        self.curl('/cached').perform()
+        body = list()
+        curl = self.curl('/cached', body)
+        curl.setopt(pycurl.NOBODY, True)
+        curl.perform()
+        # the cached GET response satisfies the HEAD request
+        self.assertListEqual(['/cached'], self.server.paths)
+        self.assertEqual(200, curl.getinfo(pycurl.HTTP_CODE))
+        self.assertListEqual([], body)
+
+    def test_key(self):
+        self.curl('/cached').perform()
+        curl = self.curl('/cached')
+        curl.setopt(pycurl.HTTPHEADER, ['X-Test: 1'])
+        curl.perform()
+        # different request headers make a different request
+        self.assertListEqual(['/cached', '/cached'], self.server.paths)
+        curl = self.curl('/cached')
+        curl.setopt(pycurl.POSTFIELDS, 'name=value')
+        self.assertIsNone(curl.cache_key())
+
+    def test_eviction(self):
+        cache_conf = conf.cache.instance()
+        size, cache_conf.SIZE = cache_conf.SIZE, 2
+        try:
+            for path in ['/0', '/1', '/2', '/0']:
+                self.curl(path).perform()
+        finally:
+            cache_conf.SIZE = size
+        # the least recently used response was evicted
+        self.assertListEqual(['/0', '/1', '/2', '/0'], self.server.paths)
+        self.assertEqual(2, len(clients.ResponseCache.instance()))
+
+    def test_forget(self):
+        targets = ['http://127.0.0.1:%d/' % self.port, 'http://localhost:%d/' % self.port]
+
+        def scan():
+            for target in targets:
+                with ExecutionContext(url=target, port=self.port):
+                    self.curl('/cached').perform()
+
+        scan()
+        clients.ResponseCache.instance().forget(targets[0], self.port)
+        scan()
+        # only the response of the forgotten target was requested again
+        self.assertListEqual(['/cached'] * 3, self.server.paths)
+        self.assertEqual(2, len(clients.ResponseCache.instance()))
+
+    def test_disabled(self):
+        cache_conf = conf.cache.instance()
+        size, cache_conf.SIZE = cache_conf.SIZE, 0
+        try:
+            for _ in range(2):
+                self.curl('/cached').perform()
+        finally:
+            cache_conf.SIZE = size
+        self.assertListEqual(['/cached', '/cached'], self.server.paths)
+
+    def test_threads(self):
+        bodies = [list() for _ in range(4)]
+        threads = [threading.Thread(target=self.curl('/cached', body).perform) for body in bodies]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # the concurrent requests collapsed into a single transfer
+        self.assertListEqual(['/cached'], self.server.paths)
+        self.assertListEqual(['/cached'] * 4, [''.join(body) for body in bodies])
+
+    def test_transfers(self):
+        transfers = clients.Transfers()
+        bodies = [list() for _ in range(3)]
+        futures = [transfers.submit(self.curl('/cached', body)) for body in bodies]
+        transfers.run()
+        self.assertListEqual(['/cached'], self.server.paths)
+        self.assertListEqual(['/cached'] * 3, [''.join(body) for body in bodies])
+        self.assertListEqual([200] * 3, [future.result().getinfo(pycurl.HTTP_CODE) for future in futures])
+        # the next transfers are served by the cache
+        future = transfers.submit(self.curl('/cached'))
+        self.assertEqual(200, future.result().getinfo(pycurl.HTTP_CODE))
+        self.assertListEqual(['/cached'], self.server.paths)
+
+
+class GovernorTestCase(ClientTestCase):
+
+    def setUp(self):
+        super(GovernorTestCase, self).setUp()
+        governor_conf = conf.governor.instance()
+        self.governor_conf = dict(
+            (name, getattr(governor_conf, name)) for name in ('RATE', 'BURST', 'CONNECTIONS', 'ADAPTIVE')
+        )
+        clients.Governor.instance().clear()
+
+    def tearDown(self):
+        governor_conf = conf.governor.instance()
+        for name, value in self.governor_conf.iteritems():
+            setattr(governor_conf, name, value)
+        clients.Governor.instance().clear()
+
+    def test_rate(self):
+        conf.governor.instance().RATE = 10
+        transfers = clients.Transfers()
+        futures = [transfers.submit(self.curl('/%d' % index)) for index in range(4)]
+        start = time.time()
+        transfers.run()
+        # the last transfer started after 3 tenths of a second
+        self.assertGreaterEqual(time.time() - start, 0.3 + _RequestHandler.latency)
+        self.assertListEqual([200] * 4, [future.result().getinfo(pycurl.HTTP_CODE) for future in futures])
+
+    def test_burst(self):
+        governor_conf = conf.governor.instance()
+        governor_conf.RATE, governor_conf.BURST = 1, 4
+        transfers = clients.Transfers()
+        for index in range(4):
+            transfers.add(self.curl('/%d' % index))
+        start = time.time()
+        transfers.run()
+        self.assertLess(time.time() - start, 4 * _RequestHandler.latency)
+
+    def test_connections(self):
+        conf.governor.instance().CONNECTIONS = 1
+        transfers = clients.Transfers()
+        for index in range(3):
+            transfers.add(self.curl('/%d' % index))
+        start = time.time()
+        transfers.run()
+        # one transfer at a time
+        self.assertGreaterEqual(time.time() - start, 3 * _RequestHandler.latency)
+
+    def test_perform(self):
+        conf.governor.instance().RATE = 5
+        start = time.time()
+        for index in range(2):
+            self.curl('/%d' % index).perform()
+        # the first token is available at once, the second one after a fifth of a second
+        self.assertGreaterEqual(time.time() - start, 0.2 + _RequestHandler.latency)
+
+    def test_adaptive(self):
+        governor_conf = conf.governor.instance()
+        governor_conf.RATE, governor_conf.BURST, governor_conf.ADAPTIVE = 8, 8, True
+        governor = clients.Governor.instance()
+        for _ in range(8):
+            self.assertEqual(0, governor.admit('host'))
+        for _ in range(6):
+            governor.release('host', 200, 0.1)
+        # never faster than the configured rate
+        self.assertEqual(8, governor.rate('host'))
+        # a rising latency halves the rate
+        governor.release('host', 200, 1.0)
+        self.assertEqual(4, governor.rate('host'))
+        self.assertGreater(governor.admit('host'), 0)
+        # backing off at most once per second
+        governor.release('host', 503, 0.1)
+        self.assertEqual(4, governor.rate('host'))
+
+
+class FetchTestCase(ClientTestCase):
+
+    def setUp(self):
+        super(FetchTestCase, self).setUp()
+        del self.server.paths[:]
+
+    def test_status(self):
+        body = list()
+        curl = self.curl('/path', body)
+        curl.fetch(status=True)
+        curl.perform()
+        self.assertEqual(200, curl.getinfo(pycurl.HTTP_CODE))
+        self.assertListEqual([], body)
+
+    def test_prefix(self):
+        body = list()
+        curl = self.curl('/big', body)
+        curl.fetch(prefix=10)
+        # the server ignores the range, but the transfer is stopped without errors
+        curl.perform()
+        self.assertTrue(curl.cut)
+        self.assertEqual(200, curl.getinfo(pycurl.HTTP_CODE))
+        self.assertEqual('a' * 10, ''.join(body))
+
+    def test_until(self):
+        body = list()
+        curl = self.curl('/big', body)
+        curl.fetch(until='<marker>')
+        curl.perform()
+        self.assertTrue(curl.cut)
+        self.assertIn('<marker>', ''.join(body))
+        self.assertLess(len(''.join(body)), 200008)
+        # the partial response was not cached
+        body = list()
+        self.curl('/big', body).perform()
+        self.assertEqual(200008, len(''.join(body)))
+        self.assertListEqual(['/big', '/big'], self.server.paths)
+
+    def test_incremental(self):
+        pattern = re.compile('<marker>')
+
+        class Pattern(object):
+            scanned = 0  # the bytes searched, overall
+
+            def search(self, string, pos=0):
+                Pattern.scanned += len(string) - pos
+                return pattern.search(string, pos)
+
+        body = list()
+        curl = self.curl('/big', body)
+        curl.fetch(until=Pattern(), overlap=16)
+        curl.perform()
+        self.assertTrue(curl.cut)
+        # every chunk is searched once, together with the overlap only
+        received = len(''.join(body))
+        self.assertLess(Pattern.scanned, received + 16 * received / 1024)
+
+    def test_no_match(self):
+        body = list()
+        curl = self.curl('/path', body)
+        curl.fetch(until='<marker>')
+        curl.perform()
+        self.assertFalse(curl.cut)
+        self.assertEqual('/path', ''.join(body))
+
+    def test_transfers(self):
+        transfers = clients.Transfers()
+        body = list()
+        curl = self.curl('/big', body)
+        curl.fetch(until='<marker>')
+        future = transfers.submit(curl)
+        transfers.run()
+        self.assertIsNone(future.error)
+        self.assertIn('<marker>', ''.join(body))
@@ -0,0 +1,86 @@
+import threading
+import unittest
+
+import pycurl
+
+from wat import conf
+from wat.lib import clients
+from wat.lib.context import ExecutionContext, current
+from wat.lib.properties import Registry
+from wat.lib.test.clients import ClientTestCase
+
+
+class ExecutionContextTestCase(unittest.TestCase):
+
+    def test_bind(self):
+        registry = Registry.instance()
+        self.assertIsNone(current())
+        with ExecutionContext() as outer:
+            self.assertIs(outer, current())
+            self.assertIs(outer.registry, Registry.instance())
+            self.assertIs(outer.clients, conf.clients.instance())
+            self.assertIs(outer.pool, clients.Pool.instance())
+            with ExecutionContext() as inner:
+                self.assertIs(inner.registry, Registry.instance())
+                self.assertRaises(RuntimeError, outer.unbind)
+            self.assertIs(outer.registry, Registry.instance())
+        self.assertIs(registry, Registry.instance())
+        self.assertIsNone(current())
+
+    def test_isolation(self):
+        process = conf.clients.instance()
+        useragent = process.USERAGENT
+        process.USERAGENT = 'test'
+        try:
+            context = ExecutionContext(url='http://example.com/', TIMEOUT=5)
+        finally:
+            process.USERAGENT = useragent
+        # the context starts from the process-wide options
+        self.assertEqual('test', context.clients.USERAGENT)
+        self.assertEqual('http://example.com/', context.url)
+        self.assertEqual(5, context.clients.TIMEOUT)
+        self.assertEqual(0, process.TIMEOUT)
+        with context:
+            Registry.instance()['test.property'] = 'value'
+        self.assertNotIn('test.property', Registry.instance())
+        self.assertIn('test.property', context.registry)
+        context.close()
+        self.assertDictEqual({}, context.registry)
+
+    def test_templates(self):
+        first, second = ExecutionContext(url='http://a.com/'), ExecutionContext(url='http://b.com/')
+        with first:
+            template = clients._compiled()
+        with second:
+            self.assertEqual(('http', 'b.com', 80), clients._compiled().target)
+        # interleaving contexts do not compile their options again
+        with first:
+            self.assertIs(template, clients._compiled())
+
+
+class ThreadsTestCase(ClientTestCase):
+
+    def test_threads(self):
+        bodies = dict()
+
+        def scan(path):
+            with ExecutionContext(url=self.url + path, port=self.port) as context:
+                body = list()
+                curl = clients.Curl()  # the URL is the context one
+                curl.setopt(pycurl.WRITEFUNCTION, body.append)
+                curl.perform()
+                curl.release()
+                Registry.instance()['test.body'] = ''.join(body)
+                bodies[path] = dict(context.registry)
+                context.close()
+
+        threads = [threading.Thread(target=scan, args=('/%d/' % number,)) for number in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertDictEqual(
+            dict(('/%d/' % number, {'test.body': '/%d/' % number}) for number in range(4)),
+            bodies
+        )
+        self.assertNotIn('test.body', Registry.instance())
@@ -1,7 +1,13 @@
+import time
 import unittest
-from wat.lib.exceptions import InvalidTypeError
-from wat.lib.graph import RelaxedGraphPlan
-from wat.lib.properties import Property, Constraint
+
+import pycurl
+
+from wat.lib import search
+from wat.lib.exceptions import InvalidTypeError, ComponentFailure
+from wat.lib.graph import RelaxedGraphPlan, LayeredPlan, PropertyIndex, regress
+from wat.lib.properties import Property, Constraint, Registry
+from wat.lib.test.clients import ClientTestCase
 
 
 class NoOpActionTestCase(unittest.TestCase):
@@ -112,5 +118,186 @@ class ActionLayerTestCase(unittest.TestCase):
         )
 
 
+class PropertyIndexTestCase(unittest.TestCase):
+
+    def test_id(self):
+        index = PropertyIndex()
+        self.assertEqual(0, index.id('website.cms.name'))
+        self.assertEqual(1, index.id(Property('http.server.name')))
+        # the same property always has the same ID
+        self.assertEqual(0, index.id(Constraint('website.cms.name', expected='opencart')))
+        self.assertEqual(2, len(index))
+
+    def test_mask(self):
+        index = PropertyIndex()
+        mask = index.mask(['a', 'b', 'c'])
+        self.assertEqual(0b111, mask)
+        self.assertEqual(0b101, index.mask(['c', 'a']))
+        self.assertListEqual([0, 2], index.ids(0b101))
+        self.assertListEqual(['a', 'c'], index.names(0b101))
+        self.assertListEqual([], index.names(0))
+
+    def test_preconditions(self):
+        index = PropertyIndex()
+        action = RelaxedGraphPlan.ActionLayer.NoOpAction(Property('a'))
+        self.assertEqual(0b1, index.preconditions(action))
+        self.assertEqual(0b1, index.preconditions(action))
+
+
 class RelaxedGraphPlanTestCase(unittest.TestCase):
-    pass  # TODO!
\ No newline at end of file
+
+    @staticmethod
+    def layers(plan):
+        return [sorted(str(action) for action in layer.actions) for layer in plan.action_layers]
+
+    def test_solution(self):
+        solution = RelaxedGraphPlan(goal_state=['website.cms.opencart.version']).solution
+        self.assertListEqual(
+            [
+                ['website.cms.name.CheckCmsNameAsOpencart'],
+                [
+                    'website.cms.opencart.admin.directory.GetAdminDirByBruteforce',
+                    'website.cms.opencart.admin.directory.GetAdminDirByDefault'
+                ],
+                ['website.cms.opencart.version.GetVersionByFooter'],
+            ],
+            self.layers(solution)
+        )
+
+    def test_solution_initial_state(self):
+        # preconditions in the initial state are not achieved again
+        solution = RelaxedGraphPlan(
+            initial_state=[('website.cms.name', 'opencart'), ('website.cms.opencart.admin.directory', 'admin/')],
+            goal_state=['website.cms.opencart.version']
+        ).solution
+        self.assertListEqual([['website.cms.opencart.version.GetVersionByFooter']], self.layers(solution))
+
+    def test_solution_without_goal(self):
+        # all the components are in the solution
+        solution = RelaxedGraphPlan().solution
+        self.assertEqual(
+            len(search.components()),
+            sum(len(layer.actions) for layer in solution.action_layers)
+        )
+
+    def test_cost(self):
+        solution = RelaxedGraphPlan(goal_state=['website.cms.opencart.admin.directory']).solution
+        actions = solution.action_layers[1].equivalent_actions['website.cms.opencart.admin.directory']
+        # equivalent components are tried from the cheapest one
+        self.assertListEqual(
+            [
+                'website.cms.opencart.admin.directory.GetAdminDirByDefault',
+                'website.cms.opencart.admin.directory.GetAdminDirByBruteforce'
+            ],
+            [str(action) for action in actions]
+        )
+
+    def test_backward(self):
+        # only the goal dependency cone is planned, with the same result
+        for goal in ('website.cms.opencart.version', 'website.cms.opencart.config.db', 'http.server.name'):
+            self.assertListEqual(
+                self.layers(RelaxedGraphPlan(goal_state=[goal]).solution),
+                self.layers(RelaxedGraphPlan(goal_state=[goal], backward=True).solution)
+            )
+        self.assertIsNone(RelaxedGraphPlan(goal_state=['website.cms.opencart'], backward=True).solution)
+
+    def test_regress(self):
+        self.assertListEqual(
+            [
+                'website.cms.name.CheckCmsNameAsOpencart',
+                'website.cms.opencart.admin.directory.GetAdminDirByBruteforce',
+                'website.cms.opencart.admin.directory.GetAdminDirByDefault',
+                'website.cms.opencart.version.GetVersionByFooter',
+            ],
+            sorted(str(action) for action in regress([Property('website.cms.opencart.version')]))
+        )
+        # properties in the initial state are not regressed
+        self.assertListEqual(
+            ['website.cms.opencart.version.GetVersionByFooter'],
+            [str(action) for action in regress(
+                [Property('website.cms.opencart.version')],
+                [Property('website.cms.name'), Property('website.cms.opencart.admin.directory')]
+            )]
+        )
+
+    def test_no_solution(self):
+        # the property exists, but no component provides it
+        self.assertIsNone(RelaxedGraphPlan(goal_state=['website.cms.opencart']).solution)
+
+
+class _Candidate(object):
+    """A fake component retrieving the property from the response of the specified path"""
+    preconditions = set()
+    postcondition = Property('test.race')
+
+    def __init__(self, testcase, path):
+        self.testcase = testcase
+        self.path = path
+        self.executed = False
+        self.curl = None  # the handle of the last instance
+
+    def __call__(self):
+        candidate = self
+
+        class Instance(object):
+            def __init__(self):
+                self.body = list()
+                self.curl = candidate.curl = candidate.testcase.curl(candidate.path, self.body)
+
+            def execute(self):
+                candidate.executed = True
+                self.curl.perform()
+                if self.curl.getinfo(pycurl.HTTP_CODE) != 200:
+                    raise ComponentFailure("Not found")
+                Registry.instance()[str(candidate.postcondition)] = ''.join(self.body)
+
+        return Instance()
+
+    def __str__(self):
+        return self.path
+
+
+class _Layer(object):
+    def __init__(self, *actions):
+        self.equivalent_actions = {'test.race': list(actions)}
+
+
+class RaceTestCase(ClientTestCase):
+
+    def tearDown(self):
+        Registry.instance().pop('test.race', None)
+
+    def plan(self, *candidates):
+        plan = LayeredPlan.__new__(LayeredPlan)
+        plan.goal_state = None
+        plan.action_layers = [_Layer(*candidates)]
+        return plan
+
+    def test_sequential(self):
+        plan = self.plan(_Candidate(self, '/missing'), _Candidate(self, '/found'))
+        start = time.time()
+        plan.execute(concurrency=None, race=1)
+        # the second candidate is tried only after the first one failed
+        self.assertGreaterEqual(time.time() - start, 2 * 0.2)
+        self.assertEqual('/found', Registry.instance()['test.race'])
+
+    def test_race(self):
+        for execute in (LayeredPlan.execute, LayeredPlan.schedule):
+            self.tearDown()
+            plan = self.plan(_Candidate(self, '/missing'), _Candidate(self, '/found'))
+            start = time.time()
+            execute(plan, concurrency=None, race=2)
+            # the failure of the first candidate does not delay the second one
+            self.assertLess(time.time() - start, 2 * 0.2)
+            self.assertEqual('/found', Registry.instance()['test.race'])
+
+    def test_abort(self):
+        for execute in (LayeredPlan.execute, LayeredPlan.schedule):
+            self.tearDown()
+            candidates = [_Candidate(self, '/first'), _Candidate(self, '/second')]
+            execute(self.plan(*candidates), concurrency=None, race=2)
+            # only the winner is executed, the transfer of the other one is aborted
+            self.assertEqual(1, sum(candidate.executed for candidate in candidates))
+            self.assertIn(Registry.instance()['test.race'], ('/first', '/second'))
+            # the handle of the loser is given back to the pool as well
+            self.assertListEqual([None, None], [candidate.curl.handle for candidate in candidates])
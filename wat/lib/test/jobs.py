@@ -0,0 +1,137 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from wat.lib.batch import Batch, Result, Target
+from wat.lib.jobs import JobQueue, work, drain
+from wat.lib.properties import Registry
+from wat.lib.test.batch import _Plan
+from wat.lib.test.clients import ClientTestCase
+
+
+class JobQueueTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.queue = JobQueue(os.path.join(self.directory, 'queue.db'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_add(self):
+        self.assertEqual(2, self.queue.add([Target('http://a.com/'), Target('http://b.com/')]))
+        # the targets already in the queue are kept
+        self.assertEqual(1, self.queue.add([Target('http://a.com/'), Target('http://a.com/', 8080)]))
+        self.assertEqual(3, self.queue.statistics()['pending'])
+        # the queue is durable
+        self.assertEqual(3, JobQueue(self.queue.filename).statistics()['pending'])
+
+    def test_acquire(self):
+        self.queue.add([Target('http://a.com/'), Target('http://b.com/')])
+        first = self.queue.acquire('worker:a')
+        second = self.queue.acquire('worker:b')
+        self.assertEqual(Target('http://a.com/'), first.target)
+        self.assertEqual(Target('http://b.com/'), second.target)
+        self.assertIsNone(self.queue.acquire('worker:c'))
+        self.assertEqual(2, self.queue.statistics()['in progress'])
+        # a released target is handed out again
+        self.queue.release(first)
+        self.assertEqual(Target('http://a.com/'), self.queue.acquire('worker:c').target)
+
+    def test_lease(self):
+        self.queue.lease = -1  # every lease is already expired
+        self.queue.attempts = 2
+        self.queue.add([Target('http://a.com/')])
+        first = self.queue.acquire('worker:a')
+        second = self.queue.acquire('worker:b')
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(2, second.attempts)
+        # the result of a lost lease is not written
+        self.assertFalse(self.queue.complete(first, Result(first.target, {'test.property': 'a'})))
+        # a target leased too many times fails
+        self.assertIsNone(self.queue.acquire('worker:c'))
+        self.assertEqual(1, self.queue.statistics()['failed'])
+
+    def test_dead_worker(self):
+        self.queue.add([Target('http://a.com/')])
+        pid = os.fork()
+        if pid == 0:
+            self.queue.acquire()
+            os._exit(0)
+        os.waitpid(pid, 0)
+        self.assertEqual(1, self.queue.statistics()['in progress'])
+        # the lease of a dead worker expires right away
+        self.assertEqual(Target('http://a.com/'), self.queue.acquire().target)
+
+    def test_results(self):
+        self.queue.add([Target('http://a.com/'), Target('http://b.com/')])
+        for job, errors in [(self.queue.acquire(), None), (self.queue.acquire(), ['message'])]:
+            self.assertTrue(self.queue.complete(job, Result(job.target, {'test.property': job.id}, errors)))
+        results = list(self.queue.results())
+        self.assertListEqual([1, 2], [sequence for sequence, _ in results])
+        self.assertDictEqual({'test.property': 1}, results[0][1].properties)
+        # the results are made of native strings, as the ones of the in-process scans
+        self.assertIs(str, type(results[0][1].url))
+        self.assertIs(str, type(results[0][1].properties.keys()[0]))
+        self.assertIs(str, type(results[1][1].errors[0]))
+        self.assertTrue(results[1][1].failed)
+        self.assertListEqual([2], [sequence for sequence, _ in self.queue.results(after=1)])
+        self.assertDictEqual({'pending': 0, 'in progress': 0, 'done': 1, 'failed': 1}, self.queue.statistics())
+
+    def test_unserializable(self):
+        self.queue.add([Target('http://a.com/')])
+        job = self.queue.acquire()
+        # a value that would not be read back as it was is refused
+        self.assertRaises(TypeError, self.queue.complete, job, Result(job.target, {'test.property': object()}))
+        self.assertEqual(1, self.queue.statistics()['in progress'])
+
+
+class WorkTestCase(ClientTestCase):
+
+    def setUp(self):
+        super(WorkTestCase, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.queue = JobQueue(os.path.join(self.directory, 'queue.db'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_work(self):
+        self.queue.add([Target(self.url + '/a'), Target(self.url + '/b')])
+        results = list(work(self.queue, Batch(_Plan())))
+        self.assertListEqual(
+            [{'test.body': '/a/path'}, {'test.body': '/b/path'}],
+            [result.properties for result in results]
+        )
+        self.assertEqual(2, self.queue.statistics()['done'])
+        # a restart scans nothing done already
+        self.queue.add([Target(self.url + '/a'), Target(self.url + '/c')])
+        self.assertListEqual(
+            [{'test.body': '/c/path'}],
+            [result.properties for result in work(self.queue, Batch(_Plan()))]
+        )
+
+    def test_unserializable(self):
+        class Plan(_Plan):
+            def execute(self, concurrency=1, race=1):
+                super(Plan, self).execute(concurrency, race)
+                Registry.instance()['test.object'] = object()
+
+        self.queue.add([Target(self.url + '/a')])
+        # the target whose result cannot be stored fails
+        self.assertListEqual([], list(work(self.queue, Batch(Plan()))))
+        self.assertEqual(1, self.queue.statistics()['failed'])
+        self.assertTrue(list(self.queue.results())[0][1].failed)
+
+    def test_drain(self):
+        self.queue.add(Target(self.url + '/' + name) for name in 'abcd')
+        plan = _Plan()
+        results = list(drain(self.queue, Batch(plan), processes=2, poll=0.1))
+        self.assertListEqual(
+            ['/%s/path' % name for name in 'abcd'],
+            sorted(result.properties['test.body'] for result in results)
+        )
+        # the scans are made by the workers only
+        self.assertListEqual([], plan.registries)
+        self.assertEqual(4, self.queue.statistics()['done'])
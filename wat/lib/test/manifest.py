@@ -0,0 +1,99 @@
+import os
+import unittest
+import wat
+from wat.lib.manifest import Manifest, ComponentEntry, describe
+from wat.lib.properties import Property
+
+
+class ComponentEntryTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        from wat.components.website.cms.opencart.version.footer import GetVersionByFooter
+        cls.component = GetVersionByFooter
+        cls.entry = ComponentEntry.from_component(GetVersionByFooter)
+
+    def test_from_component(self):
+        self.assertEqual(self.component.name, self.entry.name)
+        self.assertEqual(self.component.__module__, self.entry.module)
+        self.assertEqual(self.component.postcondition, self.entry.postcondition)
+        self.assertSetEqual(self.component.preconditions, self.entry.preconditions)
+        self.assertEqual(self.component.version, self.entry.version)
+        self.assertEqual(str(self.component), str(self.entry))
+
+    def test_dict(self):
+        entry = ComponentEntry.from_dict(self.entry.to_dict())
+        self.assertEqual(self.entry, entry)
+        self.assertSetEqual(self.entry.preconditions, entry.preconditions)
+        self.assertEqual(self.entry.released, entry.released)
+        self.assertEqual(self.entry.updated, entry.updated)
+        self.assertEqual(self.entry.cost, entry.cost)
+
+    def test_load(self):
+        self.assertIs(self.component, self.entry.load())
+
+
+class DescribeTestCase(unittest.TestCase):
+
+    def test_describe(self):
+        from wat.components.website.cms.opencart.version.footer import GetVersionByFooter
+        filename = os.path.join(wat.dirs.components, 'website', 'cms', 'opencart', 'version', 'footer.py')
+        entries = describe(filename, GetVersionByFooter.__module__, 'website.cms.opencart.version')
+        self.assertEqual(1, len(entries))
+        # static analysis gives the same result of the component import
+        expected = ComponentEntry.from_component(GetVersionByFooter)
+        self.assertEqual(expected, entries[0])
+        self.assertEqual(expected.postcondition, entries[0].postcondition)
+        self.assertSetEqual(expected.preconditions, entries[0].preconditions)
+        self.assertEqual(expected.description, entries[0].description)
+        self.assertEqual(expected.version, entries[0].version)
+        self.assertEqual(expected.released, entries[0].released)
+        self.assertEqual(expected.updated, entries[0].updated)
+        self.assertEqual(expected.cost, entries[0].cost)
+
+    def test_describe_all(self):
+        for entry in Manifest.instance().components:
+            expected = ComponentEntry.from_component(entry.load())
+            self.assertEqual(expected, entry)
+            self.assertSetEqual(expected.preconditions, entry.preconditions)
+            self.assertEqual(expected.postcondition, entry.postcondition)
+            self.assertEqual(expected.cost, entry.cost)
+
+
+class ManifestTestCase(unittest.TestCase):
+
+    def test_singleton(self):
+        self.assertEqual(Manifest.instance(), Manifest.instance())
+
+    def test_refresh(self):
+        manifest = Manifest.instance()
+        manifest.refresh()
+        # nothing changed since the last refresh
+        self.assertFalse(manifest.refresh())
+
+    def test_components(self):
+        components = Manifest.instance().components
+        self.assertTrue(all(isinstance(component, ComponentEntry) for component in components))
+        self.assertIn('website.cms.opencart.version.GetVersionByFooter', [str(component) for component in components])
+
+    def test_exists(self):
+        manifest = Manifest.instance()
+        self.assertTrue(manifest.exists('website.cms.name'))
+        self.assertTrue(manifest.exists(Property('website.cms.opencart.config.db')))
+        self.assertFalse(manifest.exists('this.not.exists'))
+
+    def test_provides(self):
+        manifest = Manifest.instance()
+        self.assertIsNone(manifest.provides('website.cms.name'))
+        self.assertSetEqual(
+            {'driver', 'hostname', 'username', 'password', 'database', 'prefix'},
+            manifest.provides('website.cms.opencart.config.db')
+        )
+
+    def test_producers(self):
+        manifest = Manifest.instance()
+        self.assertListEqual([], manifest.producers('this.not.exists'))
+        self.assertListEqual(
+            ['GetAdminDirByBruteforce', 'GetAdminDirByDefault'],
+            sorted(entry.name for entry in manifest.producers('website.cms.opencart.admin.directory'))
+        )
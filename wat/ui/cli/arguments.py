@@ -19,6 +19,7 @@ import argparse
 from textwrap import dedent as _
 
 import wat
+from wat import conf
 
 
 class _NoArgsAction(argparse.Action):
@@ -73,7 +74,7 @@ class _ShowAllComponentsAction(_NoArgsAction):
 
         components = search.components()
         print "Found %d result(s)" % len(components)
-        for index, component in enumerate(search.components(), start=1):
+        for index, component in enumerate(components, start=1):
             print "%(no.)d.\t%(component)s (r:%(released)s, u:%(updated)s)\n\t\t%(description)s\n" % {
                 'no.': index,
                 'component': component,
@@ -84,6 +85,67 @@ class _ShowAllComponentsAction(_NoArgsAction):
         parser.exit()
 
 
+def _framework_arguments(parser):
+    """Add the planning and execution options of a scan"""
+    framework = parser.add_argument_group('Framework')
+    framework.add_argument('-i', '--init', dest="initial_state", nargs=2, metavar=('PROPERTY', 'VALUE'),
+                           help="add PROPERTY=VALUE in the initial state", action="append")
+    framework.add_argument('-g', '--goal', dest="goal_state", metavar="PROPERTY",
+                           help="add PROPERTY in the goal state", action="append")
+    framework.add_argument('--planner', choices=['forward', 'backward'], default='forward',
+                           help="plan from all the components, or only from those the goal state depends on "
+                                "(default: %(default)s)")
+    framework.add_argument('-s', '--scheduler', choices=['layered', 'dataflow'], default='layered',
+                           help="run the components one action layer after the other, or as soon as their "
+                                "preconditions are retrieved (default: %(default)s)")
+    framework.add_argument('--race', metavar="N", type=int, default=1,
+                           help="perform the transfers of up to N equivalent components at the same time, "
+                                "keeping the first one succeeding (default: %(default)s)")
+    fail = framework.add_mutually_exclusive_group(required=False)
+    fail.add_argument('-f', '--fail', dest="fail_on_invalid", action="store_true")
+    fail.add_argument('-nf', '--no-fail', dest="fail_on_invalid", action="store_false", default=False)
+
+
+def _network_arguments(network):
+    """Add the client options of a scan to the network arguments group"""
+    network.add_argument('--concurrency', metavar="N", type=int, default=1,
+                         help="perform up to N independent requests at the same time (default: %(default)s)")
+    network.add_argument('--cache-size', metavar="N", type=int, default=None,
+                         help="cache up to N responses to GET and HEAD requests, 0 disables the cache "
+                              "(default: %d)" % conf.cache.instance().SIZE)
+    network.add_argument('--rate', metavar="N", type=float, default=None,
+                         help="send up to N requests per second to every host (default: no limit)")
+    network.add_argument('--burst', metavar="N", type=int, default=None,
+                         help="send up to N requests at once to every host, before the rate applies "
+                              "(default: %d)" % conf.governor.instance().BURST)
+    network.add_argument('--max-connections', metavar="N", type=int, default=None,
+                         help="perform up to N transfers at the same time overall (default: no limit)")
+    network.add_argument('--max-host-connections', metavar="N", type=int, default=None,
+                         help="perform up to N transfers at the same time to every host (default: no limit)")
+    network.add_argument('--adaptive', action="store_true", default=False,
+                         help="slow down when the target responds with 429/503 status codes or slower than usual")
+    # Network > Proxy
+    proxy = network.add_mutually_exclusive_group(required=False)
+    proxy.add_argument('--no-proxy', action="store_const", dest="proxy", const="",
+                       help="no proxy, environmental one will be ignored")
+    # Network > Proxy > Custom Proxy
+    # TODO: add proxy username and password support
+    proxy.add_argument('--proxy', metavar="SCHEME://(HOSTNAME|IP):PORT", dest="proxy",
+                       help="supply a proxy. HTTP, SOCKS4 SOCKS4A and SOCKS5 are supported.")
+    # Network > User-Agent
+    user_agent = network.add_mutually_exclusive_group(required=False)
+    user_agent.add_argument('-a', '--user-agent', dest="user_agent", metavar="USER-AGENT",
+                            help="use the specified User-Agent")
+    user_agent.add_argument('-ra', '--random-user-agent', nargs=0, dest="user_agent", metavar="USER-AGENT",
+                            help="use a random User-Agent", action=_RandomUserAgentAction)
+    # Network > Redirection
+    redirection = network.add_mutually_exclusive_group(required=False)
+    redirection.add_argument('-3xx', '--follow-redirection', dest="followlocation",
+                             help="if the target url has a redirection, it will be followed", action="store_true")
+    redirection.add_argument('-no-3xx', '--no-redirection', dest="followlocation", default=False,
+                             help="if the target url has a redirection, it will not be followed", action="store_false")
+
+
 def parse(arguments=None):
     # Initialize the parser object
     parser = argparse.ArgumentParser(prog='watf', add_help=False, fromfile_prefix_chars="@")
@@ -147,46 +209,81 @@ def parse(arguments=None):
                 Examples:
                     - Tell everything possible about "http://foo.bar.com/", without initial information:
                         %(prog)s --url foo.bar.com
+                    - Same as above, resuming where a previous run stopped, if any:
+                        %(prog)s --url foo.bar.com --checkpoint foo.checkpoint --resume
             """)
     )
+    run_parser.set_defaults(command='run')
     # Run > Framework
-    framework = run_parser.add_argument_group('Framework')
-    framework.add_argument('-i', '--init', dest="initial_state", nargs=2, metavar=('PROPERTY', 'VALUE'),
-                           help="add PROPERTY=VALUE in the initial state", action="append")
-    framework.add_argument('-g', '--goal', dest="goal_state", metavar="PROPERTY",
-                           help="add PROPERTY in the goal state", action="append")
-    fail = framework.add_mutually_exclusive_group(required=False)
-    fail.add_argument('-f', '--fail', dest="fail_on_invalid", action="store_true")
-    fail.add_argument('-nf', '--no-fail', dest="fail_on_invalid", action="store_false", default=False)
-
+    _framework_arguments(run_parser)
     # Run > Network
     network = run_parser.add_argument_group('Network')
     network.add_argument('-u', '--url', required=True, help="the target URL", action=_UrlAction)
     network.add_argument('-h', '--host', help="use the specified host (in case of virtual hosts)")
     network.add_argument('-p', '--port', help="use the specified port", type=int, default=80)
-    # Run > Network > Proxy
-    proxy = network.add_mutually_exclusive_group(required=False)
-    proxy.add_argument('--no-proxy', action="store_const", dest="proxy", const="",
-                       help="no proxy, environmental one will be ignored")
-    # Run > Network > Proxy > Custom Proxy
-    # TODO: add proxy username and password support
-    proxy.add_argument('--proxy', metavar="SCHEME://(HOSTNAME|IP):PORT", dest="proxy",
-                       help="supply a proxy. HTTP, SOCKS4 SOCKS4A and SOCKS5 are supported.")
-    # Run > Network > User-Agent
-    user_agent = network.add_mutually_exclusive_group(required=False)
-    user_agent.add_argument('-a', '--user-agent', dest="user_agent", metavar="USER-AGENT",
-                            help="use the specified User-Agent")
-    user_agent.add_argument('-ra', '--random-user-agent', nargs=0, dest="user_agent", metavar="USER-AGENT",
-                            help="use a random User-Agent", action=_RandomUserAgentAction)
-    # Run > Network > Redirection
-    redirection = network.add_mutually_exclusive_group(required=False)
-    redirection.add_argument('-3xx', '--follow-redirection', dest="followlocation",
-                             help="if the target url has a redirection, it will be followed", action="store_true")
-    redirection.add_argument('-no-3xx', '--no-redirection', dest="followlocation", default=False,
-                             help="if the target url has a redirection, it will not be followed", action="store_false")
+    _network_arguments(network)
+    # Run > Network > Archive
+    archive = network.add_mutually_exclusive_group(required=False)
+    archive.add_argument('--record', metavar="FILENAME", default=None,
+                         help="record all the requests and their responses into the specified archive")
+    archive.add_argument('--replay', metavar="FILENAME", default=None,
+                         help="replay the responses recorded into the specified archive, without any request")
+    # Run > Checkpoint
+    checkpoint = run_parser.add_argument_group('Checkpoint')
+    checkpoint.add_argument('--checkpoint', metavar="FILENAME", default=None,
+                            help="save the retrieved properties and the completed components into the specified file "
+                                 "after every component")
+    checkpoint.add_argument('--resume', default=False, action="store_true",
+                            help="start from the state saved into the checkpoint, skipping the work already done")
     # Run > Info
     info = run_parser.add_argument_group('Info')
     info.add_argument('--help', help="show this help message and exit", action="help")
     info.add_argument('--usage', help="show the usage and exit", action=_UsageAction)
 
+    # Batch
+    batch_parser = subparsers.add_parser(
+        'batch',
+        add_help=False,
+        help="run the framework against many targets, planning only once",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=_("""
+                Every line of the targets list is a target URL, optionally followed by its port
+                (blank lines and lines starting with '#' are skipped).
+
+                Examples:
+                    - Tell everything possible about all the targets listed in "targets.lst":
+                        %(prog)s targets.lst
+                    - Find the OpenCart version of the targets piped in, writing the results as JSON lines:
+                        %(prog)s --goal website.cms.opencart.version --output results.jsonl < targets.lst
+                    - Scan all the targets listed in "targets.lst" with a worker process per CPU:
+                        %(prog)s --processes 0 targets.lst
+                    - Scan all the targets listed in "targets.lst" as a campaign, resumed by running it again:
+                        %(prog)s --queue campaign.db targets.lst
+            """)
+    )
+    batch_parser.set_defaults(command='batch')
+    # Batch > Targets
+    targets = batch_parser.add_argument_group('Targets')
+    targets.add_argument('targets', metavar="FILENAME", nargs='?', type=argparse.FileType('r'), default=None,
+                         help="the targets list (default: the standard input, or nothing with a queue)")
+    targets.add_argument('-o', '--output', metavar="FILENAME", type=argparse.FileType('w'), default=None,
+                         help="write the results into the specified file as JSON lines, one per target")
+    targets.add_argument('-P', '--processes', metavar="N", type=int, default=1,
+                         help="scan the targets in N worker processes, 0 means one per CPU (default: %(default)s)")
+    targets.add_argument('-q', '--queue', metavar="FILENAME", default=None,
+                         help="add the targets to the specified queue, and scan the ones not done yet "
+                              "(the queue is created if it does not exist)")
+    targets.add_argument('--lease', metavar="SECONDS", type=float, default=3600,
+                         help="the time a worker has to scan a queued target, "
+                              "before it is handed out again (default: %(default)s)")
+    # Batch > Framework
+    _framework_arguments(batch_parser)
+    # Batch > Network
+    network = batch_parser.add_argument_group('Network')
+    _network_arguments(network)
+    # Batch > Info
+    info = batch_parser.add_argument_group('Info')
+    info.add_argument('--help', help="show this help message and exit", action="help")
+    info.add_argument('--usage', help="show the usage and exit", action=_UsageAction)
+
     return parser.parse_args(arguments)
\ No newline at end of file
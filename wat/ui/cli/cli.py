@@ -14,9 +14,14 @@
 # limitations under the License.
 
 import sys
+import json
 
 import wat
 from wat import conf
+from wat.lib import archive, clients
+from wat.lib.batch import Batch, ForkedBatch, targets as batch_targets
+from wat.lib.checkpoint import Checkpoint
+from wat.lib.jobs import JobQueue, drain
 from wat.lib.exceptions import InvalidTypeError, WatError, ClientError
 from wat.lib.graph import RelaxedGraphPlan
 from wat.lib.properties import Property, Registry
@@ -78,23 +83,20 @@ def main():
                 }
         sys.exit()
 
-    clients_conf = conf.clients.instance()
-    clients_conf.URL = options.url
-    clients_conf.PORT = options.port
-    clients_conf.FOLLOWLOCATION = options.followlocation
-    if options.user_agent is not None:
-        clients_conf.USERAGENT = options.user_agent
-    if options.host is not None:
-        clients_conf.HTTPHEADER.append("Host: %s" % options.host)
-    if options.proxy is not None:
-        clients_conf.PROXY = options.proxy
-
+    _configure(options)
+    initial_state = options.initial_state
+    checkpoint = None
+    if options.command == 'run' and options.checkpoint is not None:
+        checkpoint = _checkpoint(options)
+        # the properties already retrieved are not retrieved again
+        initial_state = (initial_state or list()) + checkpoint.initial_state
     # build the planning graph problem
     try:
         rgp = RelaxedGraphPlan(
-            initial_state=options.initial_state,
+            initial_state=initial_state,
             goal_state=options.goal_state,
-            fail_on_invalid=options.fail_on_invalid
+            fail_on_invalid=options.fail_on_invalid,
+            backward=options.planner == 'backward'
         )
     except (InvalidTypeError, WatError) as errors:
         for error in errors:
@@ -105,12 +107,83 @@ def main():
     if solution is None:
         print "No solution found"
         sys.exit()
+
+    if options.command == 'batch':
+        batch(options, solution)
+    else:
+        run(options, rgp, solution, checkpoint)
+
+
+def _checkpoint(options):
+    """:return: the checkpoint to save the execution state into, holding the saved one if resuming
+    :rtype: Checkpoint
+    """
+    if not options.resume:
+        return Checkpoint(options.checkpoint)
+    try:
+        checkpoint = Checkpoint.load(options.checkpoint)
+    except ValueError as error:
+        logger(depth=1).critical(error)
+        sys.exit(1)
+    if checkpoint.url is not None and checkpoint.url != options.url:
+        logger(depth=1).critical("The checkpoint was saved scanning '%s', not '%s'" % (checkpoint.url, options.url))
+        sys.exit(1)
+    if checkpoint.completed:
+        logger(depth=1).info("Resuming from %d completed component(s) and %d retrieved property(ies)" % (
+            len(checkpoint.completed), len(checkpoint.properties)
+        ))
+    return checkpoint
+
+
+def _configure(options):
+    """Set the client options shared by all the targets"""
+    clients_conf = conf.clients.instance()
+    clients_conf.FOLLOWLOCATION = options.followlocation
+    if options.user_agent is not None:
+        clients_conf.USERAGENT = options.user_agent
+    if options.proxy is not None:
+        clients_conf.PROXY = options.proxy
+    if options.cache_size is not None:
+        conf.cache.instance().SIZE = options.cache_size
+    governor_conf = conf.governor.instance()
+    if options.rate is not None:
+        governor_conf.RATE = options.rate
+    if options.burst is not None:
+        governor_conf.BURST = options.burst
+    if options.max_connections is not None:
+        governor_conf.CONNECTIONS = options.max_connections
+    if options.max_host_connections is not None:
+        governor_conf.HOST_CONNECTIONS = options.max_host_connections
+    governor_conf.ADAPTIVE = options.adaptive
+
+
+def run(options, rgp, solution, checkpoint=None):
+    clients_conf = conf.clients.instance()
+    clients_conf.URL = options.url
+    clients_conf.PORT = options.port
+    if options.host is not None:
+        clients_conf.HTTPHEADER = clients_conf.HTTPHEADER + ["Host: %s" % options.host]
+
+    # record or replay all the transfers, if requested
+    fixtures = None
+    if options.record is not None:
+        fixtures = archive.Recorder(options.record)
+    elif options.replay is not None:
+        fixtures = archive.Replayer(options.replay)
+    clients.use_archive(fixtures)
     try:
-        solution.execute()
+        if options.scheduler == 'dataflow':
+            solution.schedule(concurrency=options.concurrency, race=options.race, checkpoint=checkpoint)
+        else:
+            solution.execute(concurrency=options.concurrency, race=options.race, checkpoint=checkpoint)
     except ClientError as error:
         for message in error.messages:
             logger(depth=1).critical(message)
         sys.exit()
+    finally:
+        if fixtures is not None:
+            clients.use_archive(None)
+            fixtures.close()
 
     # if goal was specified show only goal state properties
     if rgp.goal_state is not None:
@@ -125,7 +198,52 @@ def main():
     if options.initial_state:
         initial_properties = [prop_value[0] for prop_value in options.initial_state]
         results = {prop: value for prop, value in results.iteritems() if prop not in initial_properties}
-    # print the results
+    show(results)
+
+
+def batch(options, solution):
+    scan_options = {
+        'initial_state': options.initial_state,
+        'scheduler': options.scheduler,
+        'concurrency': options.concurrency,
+        'race': options.race,
+    }
+    queue = None
+    try:
+        if options.queue is not None:
+            # the targets are scanned once, even across many runs
+            queue = JobQueue(options.queue, lease=options.lease)
+            if options.targets is not None:
+                logger(depth=1).info("%d new target(s) queued" % queue.add(batch_targets(options.targets)))
+            results = drain(queue, Batch(solution, **scan_options), processes=options.processes)
+        elif options.processes == 1:
+            # targets are read, scanned and reported one at a time, so that the whole list is never in memory
+            results = Batch(solution, **scan_options).run(batch_targets(options.targets or sys.stdin))
+        else:
+            scanner = ForkedBatch(solution, processes=options.processes or None, **scan_options)
+            results = scanner.run(batch_targets(options.targets or sys.stdin))
+        # results of the worker processes are reported by this one only, as soon as they are done
+        for result in results:
+            if options.output is not None:
+                json.dump(result.to_dict(), options.output, default=str)
+                options.output.write('\n')
+                options.output.flush()
+            else:
+                print "\nTarget: %s" % result.url
+                show(result.properties)
+                sys.stdout.flush()
+    except ValueError as error:
+        logger(depth=1).critical(error)
+        sys.exit(1)
+    if queue is not None:
+        logger(depth=1).info(
+            "Queue: %(done)d done, %(failed)d failed, %(pending)d pending, %(in progress)d in progress"
+            % queue.statistics()
+        )
+
+
+def show(results):
+    """Print the retrieved properties"""
     if results:
         print "\nRetrieved properties:"
         for index, prop_value in enumerate(results.iteritems(), start=1):